@@ -1,12 +1,12 @@
 #!/usr/bin/env python3
 
-from pwz_bench.generate import *
-from pwz_bench.utility import *
+from pwz_bench.generate.names import SUPPORTED_PARSERS, ParserEnum
 
 from pathlib import Path
-from typing import List
+from typing import Callable, Dict, List, Tuple
 
 import argparse
+import sys
 
 
 NONE = 'none'
@@ -18,19 +18,35 @@ DEFAULT_TGZ_FILE = THIS_DIR / 'Python-3.4.3.tgz'
 DEFAULT_GEN_DIR = THIS_DIR / 'gen'
 DEFAULT_BENCH = DEFAULT_GEN_DIR / 'pwz_bench'
 DEFAULT_PARSE = DEFAULT_GEN_DIR / 'pwz_parse'
+DEFAULT_SERVE = DEFAULT_GEN_DIR / 'pwz_serve'
+DEFAULT_INSTRUMENTED_GEN_DIR = THIS_DIR / 'gen-instrumented'
+DEFAULT_INSTRUMENTED_PARSE = DEFAULT_INSTRUMENTED_GEN_DIR / 'pwz_parse'
 DEFAULT_PY_DIR = THIS_DIR / 'pys'
 DEFAULT_LEX_DIR = THIS_DIR / 'lexes'
 DEFAULT_AST_DIR = THIS_DIR / 'parses'
 DEFAULT_BENCH_DIR = THIS_DIR / 'bench'
+DEFAULT_PIPELINE_DIR = THIS_DIR / 'pipeline'
+DEFAULT_LADDER_DIR = THIS_DIR / 'ladder'
+DEFAULT_FUZZ_DIR = THIS_DIR / 'fuzz'
+DEFAULT_SWEEP_DIR = THIS_DIR / 'sweep'
+DEFAULT_STRESS_DIR = THIS_DIR / 'stress'
+DEFAULT_GRAMMAR_FILE = THIS_DIR / 'pwz_bench' / 'utility' / 'transformed-python-3.4.grammar'
+DEFAULT_START_SYMBOLS = ['single_input', 'file_input', 'eval_input']
 DEFAULT_GRAPHS_DIR = THIS_DIR / 'graphs'
 DEFAULT_OUT_DIR = THIS_DIR / 'out'
 DEFAULT_RECURSIVE_CALLS_FILE = DEFAULT_GRAPHS_DIR / 'recursive-calls.csv'
 DEFAULT_COLLATED_RESULTS_FILE = DEFAULT_OUT_DIR / 'collated-results.csv'
 DEFAULT_CALCULATED_RESULTS_FILE = DEFAULT_OUT_DIR / 'calculated-results.csv'
+DEFAULT_CORRELATIONS_FILE = DEFAULT_OUT_DIR / 'feature-correlations.csv'
+DEFAULT_RULE_PROFILE_DIR = DEFAULT_OUT_DIR / 'rule-profiles'
 DEFAULT_RESULTS_PDF_FILE = DEFAULT_OUT_DIR / 'results.pdf'
 
 PARSER_CHOICES = list(SUPPORTED_PARSERS.keys()) + [NONE, ALL]
 
+TRANSFORM_HELP = ("the grammar transformation to apply, as a comma-separated list of options: 'left' for left-recursive "
+                  "lists, 'no-reduce' to keep alias rules, and 'inline=N' to inline synthesized rules of at most N "
+                  "symbols; defaults to 'default'")
+
 
 def process_parser_choices(choices: List[str]) -> List[ParserEnum]:
     if len(choices) == 0:
@@ -57,88 +73,272 @@ def strs_of_parsers(parsers: List[ParserEnum]) -> List[str]:
 
 
 def prepare(args):
+    from pwz_bench.utility.cli.prepare import extract_input_files
+
     extract_input_files(args.output_dir, args.tgz_filename, args.force_extract)
 
 
 def lex(args):
-    g = load_grammar(args.grammar_file, args.python_version)
+    from pwz_bench.utility.cli.lex import lex_py_files
+    from pwz_bench.utility.tokenize import TokenizerBackend, load_grammar, tokenize_file
+
     if args.filename is None:
         if args.input_dir is None or args.output_dir is None:
             raise RuntimeError("Must specify either a single file name "
                                "or else both the -I/--input-dir and -O/--output-dir options together.")
-        for py_path in Path(args.input_dir).resolve().glob('*.py'):
-            out_path = Path(args.output_dir).resolve() / py_path.with_suffix('.py.lex').name
-            print(f"Writing {out_path}... ", end='')
-            with open(out_path, 'w') as f:
-                for tok in tokenize_file(py_path, g):
-                    f.write(f"{tok}\n")
-            print(f"Done")
+        cache_dir = None if args.no_cache else args.cache_dir.resolve()
+        lex_py_files(Path(args.input_dir).resolve(), Path(args.output_dir).resolve(), args.grammar_file,
+                     args.python_version, args.jobs, cache_dir, TokenizerBackend(args.tokenizer))
     else:
-        tok_gen = tokenize_file(args.filename, g)
+        g = load_grammar(args.grammar_file, args.python_version)
+        tok_gen = tokenize_file(args.filename, g, backend=TokenizerBackend(args.tokenizer))
         for tok in tok_gen:
             print(tok)
 
 
+def lex_bench(args):
+    from pwz_bench.utility.cli.lex_bench import benchmark_lexing
+    from pwz_bench.utility.tokenize import TokenizerBackend, load_grammar
+
+    g = load_grammar(args.grammar_file, args.python_version)
+    out_file = args.output_file.resolve() if args.output_file is not None else None
+    benchmark_lexing(args.input_dir.resolve(), g, args.repeats, out_file, args.label, TokenizerBackend(args.tokenizer))
+
+
+def check_tokenizers(args):
+    from pwz_bench.utility.cli.compare_tokenizers import compare_tokenizers
+    from pwz_bench.utility.tokenize import load_grammar
+
+    g = load_grammar(args.grammar_file, args.python_version)
+    if not compare_tokenizers(args.input_dir.resolve(), g):
+        sys.exit(1)
+
+
+def check_incremental(args):
+    from pwz_bench.utility.cli.compare_incremental import compare_incremental_lexing
+    from pwz_bench.utility.tokenize import load_grammar
+
+    g = load_grammar(args.grammar_file, args.python_version)
+    if not compare_incremental_lexing(args.input_dir.resolve(), g, args.edits, args.seed):
+        sys.exit(1)
+
+
+def check_startup(args):
+    from pwz_bench.utility.cli.startup import check_startup_time
+
+    if not check_startup_time(THIS_FILE, args.runs, args.max_seconds):
+        sys.exit(1)
+
+
+def dedup(args):
+    from pwz_bench.utility.cli.dedup import dedup_lex_files, restore_lex_files
+
+    aliases_file = args.aliases_file.resolve() if args.aliases_file is not None else None
+    if args.restore:
+        restore_lex_files(args.input_dir.resolve(), aliases_file)
+    else:
+        dedup_lex_files(args.input_dir.resolve(), args.ignore_values, aliases_file)
+
+
+def ladder(args):
+    from pwz_bench.utility.cli.ladder import DEFAULT_LADDER_SIZES, build_ladder
+
+    sizes = args.sizes if args.sizes else DEFAULT_LADDER_SIZES
+    build_ladder(args.input_dir.resolve(), args.output_dir.resolve(), sizes, args.seed)
+
+
 def transform(args):
-    g = Grammar.build_from_file(args.filename)
+    from pwz_bench.utility.parse import Grammar, TransformOptions, pretty_print_rules
+
+    g = Grammar.build_from_file(args.filename, TransformOptions.from_spec(args.transform))
     pretty_print_rules(g.rules)
 
 
 def generate(args):
+    from pwz_bench.generate.generate import generate_parsers
+    from pwz_bench.utility.parse import TransformOptions
+
     parsers = process_parser_choices(args.parsers)
-    generate_parsers(parsers, args.output_dir.resolve(), args.filename, args.start_symbols)
+    generate_parsers(parsers, args.output_dir.resolve(), args.filename, args.start_symbols,
+                     TransformOptions.from_spec(args.transform), args.entry_symbol, args.instrumented)
 
 
 def parse(args):
+    from pwz_bench.utility.cli.parse import run_parsers
+
     timeout = args.timeout if args.timeout != -1 else None
+    memory_limit = args.memory_limit if args.memory_limit != -1 else None
     parsers = process_parser_choices(args.parsers)
     run_parsers(args.driver, THIS_DIR, args.input_dir.resolve(), args.output_dir.resolve(),
-                strs_of_parsers(parsers), timeout)
+                strs_of_parsers(parsers), timeout, args.jobs, memory_limit, args.binary)
+
+
+def pipeline(args):
+    from pwz_bench.utility.cli.pipeline import run_pipeline
+    from pwz_bench.utility.tokenize import load_grammar
+
+    g = load_grammar(args.grammar_file, args.python_version)
+    parsers = process_parser_choices(args.parsers)
+    run_pipeline(args.driver, THIS_DIR, args.input_dir.resolve(), args.output_dir.resolve(),
+                 strs_of_parsers(parsers), g, args.save_asts)
+
+
+def latency(args):
+    from pwz_bench.utility.cli.latency import measure_latencies
+
+    parsers = process_parser_choices(args.parsers)
+    lex_files = [lex_file.resolve() for lex_file in args.lex_files] if args.lex_files else None
+    measure_latencies(args.driver, THIS_DIR, args.input_dir.resolve(), args.output_dir.resolve(),
+                      strs_of_parsers(parsers), lex_files, args.startup_runs, args.warmup_parses, args.steady_parses)
+
+
+def perf_fuzz(args):
+    from pwz_bench.utility.cli.perf_fuzz import run_perf_fuzz
+
+    run_perf_fuzz(args.driver, args.input_dir.resolve(), args.output_dir.resolve(), args.parser,
+                  args.iterations, args.seed, args.keep, args.max_tokens, args.seed_files, args.repeats, args.timeout)
+
+
+def heatmap(args):
+    from pwz_bench.utility.cli.heatmap import CostMetric, HeatmapFormat, make_heatmap
+
+    lex_file = args.filename.resolve()
+    py_file = args.py_file_dir.resolve() / lex_file.with_suffix('').name
+    fmt = HeatmapFormat(args.format)
+    out_file = args.output_file
+    if out_file is None:
+        suffix = 'html' if fmt is HeatmapFormat.HTML else 'txt'
+        out_file = DEFAULT_OUT_DIR / 'heatmaps' / f'{lex_file.stem}-{args.parser}.{suffix}'
+    make_heatmap(args.driver, py_file, lex_file, args.parser, out_file, args.repeat, CostMetric(args.metric), fmt)
+
+
+def rule_profile(args):
+    from pwz_bench.utility.cli.common import get_sorted_files_and_lengths
+    from pwz_bench.utility.cli.rule_profile import profile_rules
+
+    if args.lex_files:
+        lex_files = [lex_file.resolve() for lex_file in args.lex_files]
+    else:
+        lex_files = [lex_file for lex_file, _ in get_sorted_files_and_lengths(args.input_dir.resolve(), '*.lex')]
+    out_file = args.output_file or DEFAULT_RULE_PROFILE_DIR / f'{args.parser}.csv'
+    profile_rules(args.driver, lex_files, args.parser, out_file)
+
+
+def ast_diff(args):
+    from pwz_bench.utility.cli.ast_diff import diff_asts
+
+    if not diff_asts(args.expected_file, args.actual_file):
+        sys.exit(1)
+
+
+def ast_stats(args):
+    from pwz_bench.utility.cli.ast_stats import write_ast_stats
+
+    if args.ast_files:
+        ast_files = [ast_file.resolve() for ast_file in args.ast_files]
+    else:
+        ast_files = sorted(args.input_dir.resolve().glob('*/*.ast'))
+    write_ast_stats(THIS_DIR, ast_files, args.output_file)
 
 
 def verify(args):
+    from pwz_bench.utility.cli.verify import verify_parses
+
     parsers = process_parser_choices(args.parsers)
-    verify_parses(THIS_DIR, args.input_dir, strs_of_parsers(parsers))
+    verify_parses(THIS_DIR, args.input_dir.resolve(), strs_of_parsers(parsers), args.jobs)
 
 
 def benchmark(args):
+    from pwz_bench.utility.cli.benchmark import run_benchmarks
+
     parsers = process_parser_choices(args.parsers)
+    status_file = args.status_file.resolve() if args.status_file is not None else None
     run_benchmarks(args.driver, THIS_DIR, args.input_dir.resolve(), args.output_dir.resolve(),
-                   strs_of_parsers(parsers), args.resume, args.quota_factor, args.max_quota)
+                   strs_of_parsers(parsers), args.resume, args.quota_factor, args.max_quota,
+                   status_file, args.report_interval)
+
+
+def sweep(args):
+    from pwz_bench.generate.generate import generate_parsers
+    from pwz_bench.utility.cli.sweep import DEFAULT_SWEEP_VARIANTS, run_sweep
+    from pwz_bench.utility.parse import TransformOptions
+
+    parsers = process_parser_choices(args.parsers)
+    variants = [TransformOptions.from_spec(spec) for spec in (args.transforms or DEFAULT_SWEEP_VARIANTS)]
+    start_symbols = args.start_symbols or DEFAULT_START_SYMBOLS
+
+    def generate_variant(output_dir: Path, options: TransformOptions):
+        # All of the parsers must be generated, since they are all compiled into the benchmarking executable.
+        generate_parsers(list(SUPPORTED_PARSERS.values()), output_dir, str(args.grammar_file.resolve()), start_symbols,
+                         options)
+
+    run_sweep(generate_variant, THIS_DIR, args.input_dir.resolve(), args.output_dir.resolve(), strs_of_parsers(parsers),
+              variants, args.quota_factor, args.max_quota)
+
+
+def stress(args):
+    from pwz_bench.generate.generate import generate_parsers
+    from pwz_bench.utility.cli.ladder import token_count_of_string
+    from pwz_bench.utility.cli.stress import DEFAULT_STRESS_SIZES, STRESS_GRAMMARS, run_stress
+
+    parsers = process_parser_choices(args.parsers)
+    sizes = [token_count_of_string(size) for size in args.sizes] if args.sizes else DEFAULT_STRESS_SIZES
+
+    def generate_grammar(output_dir: Path, grammar_file: Path, start_symbol: str):
+        # All of the parsers must be generated, since they are all compiled into the benchmarking executable.
+        generate_parsers(list(SUPPORTED_PARSERS.values()), output_dir, str(grammar_file), [start_symbol])
+
+    run_stress(generate_grammar, THIS_DIR, args.output_dir.resolve(), strs_of_parsers(parsers),
+               args.grammars or list(STRESS_GRAMMARS), sizes, args.seed, args.quota_factor, args.max_quota)
 
 
 def collate(args):
+    from pwz_bench.utility.cli.collate_benchmark_results import collate_benchmarking_results
+    from pwz_bench.utility.cli.dedup import load_aliases
+
     parsers = process_parser_choices(args.parsers)
+    aliases = load_aliases(args.aliases_file.resolve()) if args.aliases_file is not None else None
     collate_benchmarking_results(args.input_dir.resolve(), strs_of_parsers(parsers), args.overwrite,
-                                 args.output_file.resolve())
+                                 args.output_file.resolve(), aliases)
 
 
 def calculate(args):
+    from pwz_bench.utility.cli.calculate import calculate_means
+
     parsers = process_parser_choices(args.parsers)
     calculate_means(args.collated_results_file.resolve(), args.calculated_results_file.resolve(),
                     strs_of_parsers(parsers))
 
 
+def correlate(args):
+    from pwz_bench.utility.cli.correlate import correlate_features
+
+    parsers = process_parser_choices(args.parsers)
+    correlate_features(args.collated_results_file.resolve(), args.features_file.resolve(), args.output_file.resolve(),
+                       strs_of_parsers(parsers), args.histogram)
+
+
 def graphs(args):
+    from pwz_bench.utility.cli.graphs import generate_graphs_pdf_file
+
     generate_graphs_pdf_file(args.input_dir.resolve(), args.output_dir.resolve(), args.overwrite,
                              args.recursive_calls_file.resolve(), args.collated_results_file.resolve(),
                              args.calculated_results_file.resolve(), args.output_file.resolve())
 
 
-if __name__ == '__main__':
-    parser = argparse.ArgumentParser()
-    subparsers = parser.add_subparsers()
-
-    prepare_parser = subparsers.add_parser('prepare')
+def add_prepare_arguments(prepare_parser: argparse.ArgumentParser):
     prepare_parser.add_argument('-t', '--tgz-filename', type=Path, default=DEFAULT_TGZ_FILE,
                                 help="the .tgz file of Python source code to extract inputs from")
     prepare_parser.add_argument('-O', '--output-dir', '--py-file-dir', type=Path, default=DEFAULT_PY_DIR,
                                 help="the directory to move the extracted .py test files to")
     prepare_parser.add_argument('--force-extract', action='store_true',
                                 help="force the extraction to proceed even if the destination directory contains .py files")
-    prepare_parser.set_defaults(func=prepare)
 
-    lex_parser = subparsers.add_parser('lex')
+
+def add_lex_arguments(lex_parser: argparse.ArgumentParser):
+    from pwz_bench.utility.cli.lex_cache import DEFAULT_LEX_CACHE_DIR
+    from pwz_bench.utility.tokenize import TokenizerBackend
+
     lex_parser.add_argument('filename', nargs='?',
                             help="the Python file to lex")
     lex_parser.add_argument('-I', '--input-dir', '--py-file-dir',
@@ -149,14 +349,104 @@ if __name__ == '__main__':
                             help="the version of Python to use while lexing, as a string")
     lex_parser.add_argument('--grammar-file',
                             help="a Python grammar file to use while lexing")
-    lex_parser.set_defaults(func=lex)
-
-    transform_parser = subparsers.add_parser('transform')
+    lex_parser.add_argument('-j', '--jobs', type=int, default=1,
+                            help="the number of files to lex at once")
+    lex_parser.add_argument('--cache-dir', type=Path, default=DEFAULT_LEX_CACHE_DIR,
+                            help="the directory to cache lexes in, so that unchanged files are not lexed again")
+    lex_parser.add_argument('--no-cache', action='store_true',
+                            help="lex every file, neither reading nor writing the cache")
+    lex_parser.add_argument('--tokenizer', choices=[backend.value for backend in TokenizerBackend],
+                            default=TokenizerBackend.AUTO.value,
+                            help="the tokenizer to use; 'auto' uses the standard library's when it can tokenize for "
+                                 "the grammar")
+
+
+def add_lex_bench_arguments(lex_bench_parser: argparse.ArgumentParser):
+    from pwz_bench.utility.cli.lex_bench import DEFAULT_LEX_BENCH_REPEATS
+    from pwz_bench.utility.tokenize import TokenizerBackend
+
+    lex_bench_parser.add_argument('-I', '--input-dir', '--py-file-dir', type=Path, default=DEFAULT_PY_DIR,
+                                  help="the directory of .py files to tokenize")
+    lex_bench_parser.add_argument('-r', '--repeats', type=int, default=DEFAULT_LEX_BENCH_REPEATS,
+                                  help="the number of timed passes over the files, of which the fastest is kept")
+    lex_bench_parser.add_argument('-o', '--output-file', type=Path,
+                                  help="a CSV file to append the result to")
+    lex_bench_parser.add_argument('-l', '--label', default='',
+                                  help="a label for the result in the output file, such as a commit")
+    lex_bench_parser.add_argument('--python-version',
+                                  help="the version of Python to use while lexing, as a string")
+    lex_bench_parser.add_argument('--grammar-file',
+                                  help="a Python grammar file to use while lexing")
+    lex_bench_parser.add_argument('--tokenizer', choices=[backend.value for backend in TokenizerBackend],
+                                  default=TokenizerBackend.AUTO.value,
+                                  help="the tokenizer to measure")
+
+
+def add_check_tokenizers_arguments(check_tokenizers_parser: argparse.ArgumentParser):
+    check_tokenizers_parser.add_argument('-I', '--input-dir', '--py-file-dir', type=Path, default=DEFAULT_PY_DIR,
+                                         help="the directory of .py files to tokenize")
+    check_tokenizers_parser.add_argument('--python-version',
+                                         help="the version of Python to use while lexing, as a string")
+    check_tokenizers_parser.add_argument('--grammar-file',
+                                         help="a Python grammar file to use while lexing")
+
+
+def add_check_incremental_arguments(check_incremental_parser: argparse.ArgumentParser):
+    from pwz_bench.utility.cli.compare_incremental import (DEFAULT_INCREMENTAL_CHECK_EDITS,
+                                                           DEFAULT_INCREMENTAL_CHECK_SEED)
+
+    check_incremental_parser.add_argument('-I', '--input-dir', '--py-file-dir', type=Path, default=DEFAULT_PY_DIR,
+                                          help="the directory of .py files to edit")
+    check_incremental_parser.add_argument('-e', '--edits', type=int, default=DEFAULT_INCREMENTAL_CHECK_EDITS,
+                                          help="the number of random edits to make to each file")
+    check_incremental_parser.add_argument('-s', '--seed', type=int, default=DEFAULT_INCREMENTAL_CHECK_SEED,
+                                          help="the seed of the random edits")
+    check_incremental_parser.add_argument('--python-version',
+                                          help="the version of Python to use while lexing, as a string")
+    check_incremental_parser.add_argument('--grammar-file',
+                                          help="a Python grammar file to use while lexing")
+
+
+def add_check_startup_arguments(check_startup_parser: argparse.ArgumentParser):
+    from pwz_bench.utility.cli.startup import DEFAULT_MAX_STARTUP_SECONDS, DEFAULT_STARTUP_CHECK_RUNS
+
+    check_startup_parser.add_argument('-r', '--runs', type=int, default=DEFAULT_STARTUP_CHECK_RUNS,
+                                      help="the number of times to run each command, of which the fastest is kept")
+    check_startup_parser.add_argument('--max-seconds', type=float, default=DEFAULT_MAX_STARTUP_SECONDS,
+                                      help="the number of seconds within which each command must finish")
+
+
+def add_dedup_arguments(dedup_parser: argparse.ArgumentParser):
+    dedup_parser.add_argument('-I', '--input-dir', '--lex-file-dir', type=Path, default=DEFAULT_LEX_DIR,
+                              help="the directory of .lex files to remove duplicates from")
+    dedup_parser.add_argument('--aliases-file', type=Path,
+                              help="the file to record removed duplicates in; defaults to aliases.csv in the input directory")
+    dedup_parser.add_argument('--ignore-values', action='store_true',
+                              help="ignore the values of NAME, NUMBER, and STRING tokens when comparing token streams")
+    dedup_parser.add_argument('--restore', action='store_true',
+                              help="move previously removed duplicates back into the input directory")
+
+
+def add_ladder_arguments(ladder_parser: argparse.ArgumentParser):
+    ladder_parser.add_argument('-I', '--input-dir', '--lex-file-dir', type=Path, default=DEFAULT_LEX_DIR,
+                               help="the directory of .lex files to build the ladder from")
+    ladder_parser.add_argument('-O', '--output-dir', '--ladder-file-dir', type=Path, default=DEFAULT_LADDER_DIR,
+                               help="the directory to output the ladder's .lex files to")
+    ladder_parser.add_argument('-s', '--size', action='append', default=[], dest='sizes',
+                               help="the number of tokens in a rung of the ladder, e.g., 4000 or 4k; can be given more "
+                                    "than once or left out to use sizes doubling from 1k to 256k")
+    ladder_parser.add_argument('--seed', type=int,
+                               help="shuffle the .lex files with the given seed instead of using them in order")
+
+
+def add_transform_arguments(transform_parser: argparse.ArgumentParser):
     transform_parser.add_argument('filename',
                                   help="the grammar file to transform to a Menhir-compatible grammar")
-    transform_parser.set_defaults(func=transform)
+    transform_parser.add_argument('-t', '--transform', default='default',
+                                  help=TRANSFORM_HELP)
 
-    generate_parser = subparsers.add_parser('generate')
+
+def add_generate_arguments(generate_parser: argparse.ArgumentParser):
     generate_parser.add_argument('filename',
                                  help="the grammar file to build a parser generator from")
     generate_parser.add_argument('-p', '--parser', choices=PARSER_CHOICES, action='append', default=[], dest='parsers',
@@ -165,9 +455,17 @@ if __name__ == '__main__':
                                  help="the directory to write all generated files to")
     generate_parser.add_argument('-s', '--start-symbol', action='append', dest='start_symbols',
                                  help="specify a non-terminal as a start symbol; can be given more than once")
-    generate_parser.set_defaults(func=generate)
+    generate_parser.add_argument('-t', '--transform', default='default',
+                                 help=TRANSFORM_HELP)
+    generate_parser.add_argument('-e', '--entry-symbol',
+                                 help="the start symbol that the parsers are run from; defaults to file_input if it is "
+                                      "a start symbol, or else the first start symbol given")
+    generate_parser.add_argument('--instrumented', action='store_true',
+                                 help="compile the instrumentation hooks used by heatmap and rule-profile into the "
+                                      "parsers; the result should not be used for benchmarking")
+
 
-    parse_parser = subparsers.add_parser('parse')
+def add_parse_arguments(parse_parser: argparse.ArgumentParser):
     parse_parser.add_argument('driver', type=Path, default=DEFAULT_PARSE, nargs='?',
                               help="the compiled parsing executable")
     parse_parser.add_argument('-I', '--input-dir', '--lex-file-dir', type=Path, default=DEFAULT_LEX_DIR,
@@ -177,18 +475,151 @@ if __name__ == '__main__':
     parse_parser.add_argument('-p', '--parser', choices=PARSER_CHOICES, action='append', default=[], dest='parsers',
                               help="the parser to use; can be given more than once or left out to run all parsers")
     parse_parser.add_argument('-t', '--timeout', type=int,
-                              help="the number of seconds to wait before timing out a parse (and all subsequent parses "
-                                   "with the same parser); leave unspecified or give -1 for no timeout")
-    parse_parser.set_defaults(func=parse)
-
-    verify_parser = subparsers.add_parser('verify')
+                              help="the number of seconds to wait before timing out the parse of a file; leave "
+                                   "unspecified or give -1 for no timeout")
+    parse_parser.add_argument('-j', '--jobs', type=int, default=1,
+                              help="the number of files to parse at once")
+    parse_parser.add_argument('-m', '--memory-limit', type=int,
+                              help="the number of megabytes of memory each parse may use; leave unspecified or give -1 "
+                                   "for no limit")
+    parse_parser.add_argument('-b', '--binary', action='store_true',
+                              help="write the .ast files in the binary format, which is smaller and faster to load")
+
+
+def add_pipeline_arguments(pipeline_parser: argparse.ArgumentParser):
+    pipeline_parser.add_argument('driver', type=Path, default=DEFAULT_SERVE, nargs='?',
+                                 help="the compiled parser server executable")
+    pipeline_parser.add_argument('-I', '--input-dir', '--py-file-dir', type=Path, default=DEFAULT_PY_DIR,
+                                 help="the directory to read .py files from")
+    pipeline_parser.add_argument('-O', '--output-dir', '--pipeline-file-dir', type=Path, default=DEFAULT_PIPELINE_DIR,
+                                 help="the directory to output pipeline results to")
+    pipeline_parser.add_argument('-p', '--parser', choices=PARSER_CHOICES, action='append', default=[], dest='parsers',
+                                 help="the parser to use; can be given more than once or left out to run all parsers")
+    pipeline_parser.add_argument('--save-asts', action='store_true',
+                                 help="save the ASTs returned by each parser to a subdirectory of the output directory")
+    pipeline_parser.add_argument('--python-version',
+                                 help="the version of Python to use while lexing, as a string")
+    pipeline_parser.add_argument('--grammar-file',
+                                 help="a Python grammar file to use while lexing")
+
+
+def add_latency_arguments(latency_parser: argparse.ArgumentParser):
+    from pwz_bench.utility.cli.latency import DEFAULT_STARTUP_RUNS, DEFAULT_STEADY_PARSES, DEFAULT_WARMUP_PARSES
+
+    latency_parser.add_argument('driver', type=Path, default=DEFAULT_SERVE, nargs='?',
+                                help="the compiled parser server executable, next to which the server of each parser "
+                                     "alone is found")
+    latency_parser.add_argument('-I', '--input-dir', '--lex-file-dir', type=Path, default=DEFAULT_LEX_DIR,
+                                help="the directory to choose a .lex file from if none are given")
+    latency_parser.add_argument('-O', '--output-dir', '--pipeline-file-dir', type=Path, default=DEFAULT_PIPELINE_DIR,
+                                help="the directory to output latency results to")
+    latency_parser.add_argument('-f', '--lex-file', type=Path, action='append', default=[], dest='lex_files',
+                                help="a .lex file to parse; can be given more than once or left out to use the file "
+                                     "with the median number of tokens in the input directory")
+    latency_parser.add_argument('-p', '--parser', choices=PARSER_CHOICES, action='append', default=[], dest='parsers',
+                                help="the parser to measure; can be given more than once or left out to run all parsers")
+    latency_parser.add_argument('--startup-runs', type=int, default=DEFAULT_STARTUP_RUNS,
+                                help="the number of times to measure startup with no input")
+    latency_parser.add_argument('--warmup-parses', type=int, default=DEFAULT_WARMUP_PARSES,
+                                help="the number of parses to discard before measuring steady-state parses")
+    latency_parser.add_argument('--steady-parses', type=int, default=DEFAULT_STEADY_PARSES,
+                                help="the number of steady-state parses to measure")
+
+
+def add_perf_fuzz_arguments(fuzz_parser: argparse.ArgumentParser):
+    from pwz_bench.utility.cli.perf_fuzz import (DEFAULT_FUZZ_ITERATIONS, DEFAULT_FUZZ_KEEP, DEFAULT_FUZZ_MAX_TOKENS,
+                                             DEFAULT_FUZZ_SEED_FILES, DEFAULT_FUZZ_TIMEOUT)
+
+    fuzz_parser.add_argument('driver', type=Path, default=DEFAULT_SERVE, nargs='?',
+                             help="the compiled parser server executable")
+    fuzz_parser.add_argument('-I', '--input-dir', '--lex-file-dir', type=Path, default=DEFAULT_LEX_DIR,
+                             help="the directory of .lex files to start the search from")
+    fuzz_parser.add_argument('-O', '--output-dir', '--fuzz-file-dir', type=Path, default=DEFAULT_FUZZ_DIR,
+                             help="the directory to save the worst inputs found to")
+    fuzz_parser.add_argument('-p', '--parser', choices=list(SUPPORTED_PARSERS.keys()), required=True,
+                             help="the parser to search for worst-case inputs for")
+    fuzz_parser.add_argument('-n', '--iterations', type=int, default=DEFAULT_FUZZ_ITERATIONS,
+                             help="the number of mutants to try")
+    fuzz_parser.add_argument('--seed', type=int, default=0,
+                             help="the seed for the random number generator")
+    fuzz_parser.add_argument('--keep', type=int, default=DEFAULT_FUZZ_KEEP,
+                             help="the number of worst inputs to keep")
+    fuzz_parser.add_argument('--max-tokens', type=int, default=DEFAULT_FUZZ_MAX_TOKENS,
+                             help="the maximum number of tokens in an input")
+    fuzz_parser.add_argument('--seed-files', type=int, default=DEFAULT_FUZZ_SEED_FILES,
+                             help="the number of the smallest .lex files to start the search from")
+    fuzz_parser.add_argument('--repeats', type=int, default=3,
+                             help="the number of times to parse each input, taking the median time")
+    fuzz_parser.add_argument('--timeout', type=float, default=DEFAULT_FUZZ_TIMEOUT,
+                             help="the number of seconds after which a parse is considered to have blown up")
+
+
+def add_heatmap_arguments(heatmap_parser: argparse.ArgumentParser):
+    from pwz_bench.utility.cli.heatmap import CostMetric, HeatmapFormat
+
+    heatmap_parser.add_argument('filename', type=Path,
+                                help="the .lex file to attribute the parsing cost of")
+    heatmap_parser.add_argument('--driver', type=Path, default=DEFAULT_INSTRUMENTED_PARSE,
+                                help="the instrumented parsing executable (see generate --instrumented)")
+    heatmap_parser.add_argument('-P', '--py-file-dir', type=Path, default=DEFAULT_PY_DIR,
+                                help="the directory containing the .py file the .lex file was lexed from")
+    heatmap_parser.add_argument('-p', '--parser', choices=list(SUPPORTED_PARSERS.keys()), required=True,
+                                help="the parser to attribute the cost of")
+    heatmap_parser.add_argument('-r', '--repeat', type=int, default=1,
+                                help="the number of times to parse the file, averaging the cost of each token")
+    heatmap_parser.add_argument('-m', '--metric', choices=[metric.value for metric in CostMetric],
+                                default=CostMetric.TIME.value,
+                                help="whether to measure cost by time or by words allocated")
+    heatmap_parser.add_argument('-f', '--format', choices=[fmt.value for fmt in HeatmapFormat],
+                                default=HeatmapFormat.HTML.value,
+                                help="the format of the heatmap")
+    heatmap_parser.add_argument('-o', '--output-file', type=Path,
+                                help="the file to write the heatmap to")
+
+
+def add_rule_profile_arguments(rule_profile_parser: argparse.ArgumentParser):
+    from pwz_bench.utility.cli.rule_profile import LABELLED_PARSERS
+
+    rule_profile_parser.add_argument('--driver', type=Path, default=DEFAULT_INSTRUMENTED_PARSE,
+                                     help="the instrumented parsing executable (see generate --instrumented)")
+    rule_profile_parser.add_argument('-I', '--input-dir', '--lex-file-dir', type=Path, default=DEFAULT_LEX_DIR,
+                                     help="the directory of .lex files to profile")
+    rule_profile_parser.add_argument('-f', '--lex-file', type=Path, action='append', default=[], dest='lex_files',
+                                     help="a .lex file to profile instead of the whole directory (may be repeated)")
+    rule_profile_parser.add_argument('-p', '--parser', choices=LABELLED_PARSERS, required=True,
+                                     help="the parser to profile")
+    rule_profile_parser.add_argument('-o', '--output-file', type=Path,
+                                     help="the CSV file to write the profile to")
+
+
+def add_verify_arguments(verify_parser: argparse.ArgumentParser):
     verify_parser.add_argument('-I', '--input-dir', '--ast-file-dir', type=Path, default=DEFAULT_AST_DIR,
                                help="the directory to read parsed .ast files from")
     verify_parser.add_argument('-p', '--parser', choices=PARSER_CHOICES, action='append', default=[], dest='parsers',
                                help="the parser to verify; can be given more than once or left out to run all parsers")
-    verify_parser.set_defaults(func=verify)
+    verify_parser.add_argument('-j', '--jobs', type=int, default=1,
+                               help="the number of files to verify at once")
+
+
+def add_ast_diff_arguments(ast_diff_parser: argparse.ArgumentParser):
+    ast_diff_parser.add_argument('expected_file', type=Path,
+                                 help="the .ast file to treat as correct, such as Menhir's")
+    ast_diff_parser.add_argument('actual_file', type=Path,
+                                 help="the .ast file to compare against it")
+
+
+def add_ast_stats_arguments(ast_stats_parser: argparse.ArgumentParser):
+    ast_stats_parser.add_argument('-I', '--input-dir', '--ast-file-dir', type=Path, default=DEFAULT_AST_DIR,
+                                  help="the directory of parser subdirectories to read .ast files from")
+    ast_stats_parser.add_argument('-f', '--ast-file', type=Path, action='append', default=[], dest='ast_files',
+                                  help="an .ast file to measure instead of the whole directory (may be repeated)")
+    ast_stats_parser.add_argument('-o', '--output-file', type=Path, default=DEFAULT_AST_DIR / 'ast-stats.csv',
+                                  help="the CSV file to write the statistics to")
+
+
+def add_benchmark_arguments(bench_parser: argparse.ArgumentParser):
+    from pwz_bench.utility.cli.progress import DEFAULT_REPORT_INTERVAL, DEFAULT_STATUS_FILENAME
 
-    bench_parser = subparsers.add_parser('benchmark')
     bench_parser.add_argument('driver', type=Path, default=DEFAULT_BENCH, nargs='?',
                               help="the compiled benchmarking executable")
     bench_parser.add_argument('-I', '--input-dir', '--lex-file-dir', type=Path, default=DEFAULT_LEX_DIR,
@@ -203,9 +634,60 @@ if __name__ == '__main__':
                               help="the multiplier to use when increasing the quota")
     bench_parser.add_argument('--max-quota', type=int, default=None,
                               help="the maximum allowable quota; executions that go beyond this will be abandoned")
-    bench_parser.set_defaults(func=benchmark)
+    bench_parser.add_argument('--status-file', type=Path, default=None,
+                              help="the JSON file to continuously record progress and estimated completion times in; "
+                                   f"defaults to {DEFAULT_STATUS_FILENAME} in the output directory")
+    bench_parser.add_argument('--report-interval', type=float, default=DEFAULT_REPORT_INTERVAL,
+                              help="the minimum number of seconds between progress summaries printed to the console")
+
+
+def add_sweep_arguments(sweep_parser: argparse.ArgumentParser):
+    from pwz_bench.utility.cli.sweep import DEFAULT_SWEEP_VARIANTS
+
+    sweep_parser.add_argument('-g', '--grammar-file', type=Path, default=DEFAULT_GRAMMAR_FILE,
+                              help="the grammar file to build the parsers from")
+    sweep_parser.add_argument('-s', '--start-symbol', action='append', dest='start_symbols',
+                              help="a start symbol of the grammar; can be given more than once or left out to use "
+                                   "the start symbols of the Python grammar")
+    sweep_parser.add_argument('-t', '--transform', action='append', default=[], dest='transforms',
+                              help="a grammar transformation variant to benchmark (see `generate --help`); can be given "
+                                   f"more than once or left out to use: {' '.join(DEFAULT_SWEEP_VARIANTS)}")
+    sweep_parser.add_argument('-I', '--input-dir', '--lex-file-dir', type=Path, default=DEFAULT_LEX_DIR,
+                              help="the directory to read .lex files from")
+    sweep_parser.add_argument('-O', '--output-dir', '--sweep-dir', type=Path, default=DEFAULT_SWEEP_DIR,
+                              help="the directory to build and benchmark each variant in")
+    sweep_parser.add_argument('-p', '--parser', choices=PARSER_CHOICES, action='append', default=[], dest='parsers',
+                              help="the parser to benchmark; can be given more than once or left out to run all parsers")
+    sweep_parser.add_argument('-q', '--quota-factor', type=int, default=3,
+                              help="the factor by which to increase the quota during subsequent runs")
+    sweep_parser.add_argument('--max-quota', type=int, default=None,
+                              help="the maximum allowable quota; executions that go beyond this will be abandoned")
 
-    collate_parser = subparsers.add_parser('collate')
+
+def add_stress_arguments(stress_parser: argparse.ArgumentParser):
+    from pwz_bench.utility.cli.stress import STRESS_GRAMMARS
+
+    stress_parser.add_argument('-g', '--grammar', choices=list(STRESS_GRAMMARS), action='append', default=[],
+                               dest='grammars',
+                               help="the stress grammar to run; can be given more than once or left out to run all of "
+                                    "the stress grammars")
+    stress_parser.add_argument('-s', '--size', action='append', default=[], dest='sizes',
+                               help="the number of tokens (e.g., 512 or 2k) in an input; can be given more than once "
+                                    "or left out to use sizes doubling from 8 to 1024")
+    stress_parser.add_argument('--seed', type=int, default=0,
+                               help="the seed used for generating the inputs of grammars with randomized inputs")
+    stress_parser.add_argument('-O', '--output-dir', '--stress-dir', type=Path, default=DEFAULT_STRESS_DIR,
+                               help="the directory to build and benchmark each stress grammar in")
+    stress_parser.add_argument('-p', '--parser', choices=PARSER_CHOICES, action='append', default=[], dest='parsers',
+                               help="the parser to benchmark; can be given more than once or left out to run all "
+                                    "parsers")
+    stress_parser.add_argument('-q', '--quota-factor', type=int, default=3,
+                               help="the factor by which to increase the quota during subsequent runs")
+    stress_parser.add_argument('--max-quota', type=int, default=None,
+                               help="the maximum allowable quota; executions that go beyond this will be abandoned")
+
+
+def add_collate_arguments(collate_parser: argparse.ArgumentParser):
     collate_parser.add_argument('-I', '--input-dir', '--bench-file-dir', type=Path, default=DEFAULT_BENCH_DIR,
                                 help="the directory to retrieve completed benchmarking results from")
     collate_parser.add_argument('-O', '--output-file', '--collated-results-file', type=Path, default=DEFAULT_COLLATED_RESULTS_FILE,
@@ -214,18 +696,36 @@ if __name__ == '__main__':
                                 help="the parser to benchmark; can be given more than once or left out to run all parsers")
     collate_parser.add_argument('-o', '--overwrite', action='store_true',
                                 help="delete the existing output file if it already exists")
-    collate_parser.set_defaults(func=collate)
+    collate_parser.add_argument('--aliases-file', type=Path,
+                                help="an aliases file written by dedup; duplicates are given their representative's results")
+
 
-    calculate_parser = subparsers.add_parser('calculate')
+def add_calculate_arguments(calculate_parser: argparse.ArgumentParser):
     calculate_parser.add_argument('-c', '--collated-results-file', type=Path, default=DEFAULT_COLLATED_RESULTS_FILE,
                                   help="the name of the file containing collated results")
     calculate_parser.add_argument('-C', '--calculated-results-file', type=Path, default=DEFAULT_CALCULATED_RESULTS_FILE,
                                   help="the name of the file to write calculated results to")
     calculate_parser.add_argument('-p', '--parser', choices=PARSER_CHOICES, action='append', default=[], dest='parsers',
                                   help="the parser to benchmark; can be given more than once or left out to run all parsers")
-    calculate_parser.set_defaults(func=calculate)
 
-    graphs_parser = subparsers.add_parser('graphs')
+
+def add_correlate_arguments(correlate_parser: argparse.ArgumentParser):
+    from pwz_bench.utility.cli.lex import DEFAULT_FEATURES_FILENAME
+
+    correlate_parser.add_argument('--collated-results-file', type=Path, default=DEFAULT_COLLATED_RESULTS_FILE,
+                                  help="the file containing collated results")
+    correlate_parser.add_argument('--features-file', type=Path, default=DEFAULT_LEX_DIR / DEFAULT_FEATURES_FILENAME,
+                                  help="the feature index written while lexing")
+    correlate_parser.add_argument('-O', '--output-file', '--correlations-file', type=Path,
+                                  default=DEFAULT_CORRELATIONS_FILE,
+                                  help="the file to write the correlations to")
+    correlate_parser.add_argument('-p', '--parser', choices=PARSER_CHOICES, action='append', default=[], dest='parsers',
+                                  help="the parser to correlate; can be given more than once or left out to use all parsers")
+    correlate_parser.add_argument('--histogram', action='store_true',
+                                  help="also correlate the relative frequency of each kind of token")
+
+
+def add_graphs_arguments(graphs_parser: argparse.ArgumentParser):
     graphs_parser.add_argument('-I', '--input-dir', '--graphs-file-dir', type=Path, default=DEFAULT_GRAPHS_DIR,
                               help="the directory to find and place graphing-related files in")
     graphs_parser.add_argument('-O', '--output-dir', type=Path, default=DEFAULT_OUT_DIR,
@@ -240,7 +740,51 @@ if __name__ == '__main__':
                               help="delete the existing .tex file if it already exists")
     graphs_parser.add_argument('--output-file', type=Path, default=DEFAULT_RESULTS_PDF_FILE,
                                help="the name of the file to output the graphs to")
-    graphs_parser.set_defaults(func=graphs)
+
+
+# The commands, each with the function which runs it and the function which adds its arguments to its parser.
+COMMANDS: Dict[str, Tuple[Callable[[argparse.Namespace], None], Callable[[argparse.ArgumentParser], None]]] = {
+    'prepare': (prepare, add_prepare_arguments),
+    'lex': (lex, add_lex_arguments),
+    'lex-bench': (lex_bench, add_lex_bench_arguments),
+    'check-tokenizers': (check_tokenizers, add_check_tokenizers_arguments),
+    'check-incremental': (check_incremental, add_check_incremental_arguments),
+    'check-startup': (check_startup, add_check_startup_arguments),
+    'dedup': (dedup, add_dedup_arguments),
+    'ladder': (ladder, add_ladder_arguments),
+    'transform': (transform, add_transform_arguments),
+    'generate': (generate, add_generate_arguments),
+    'parse': (parse, add_parse_arguments),
+    'pipeline': (pipeline, add_pipeline_arguments),
+    'latency': (latency, add_latency_arguments),
+    'perf-fuzz': (perf_fuzz, add_perf_fuzz_arguments),
+    'heatmap': (heatmap, add_heatmap_arguments),
+    'rule-profile': (rule_profile, add_rule_profile_arguments),
+    'verify': (verify, add_verify_arguments),
+    'ast-diff': (ast_diff, add_ast_diff_arguments),
+    'ast-stats': (ast_stats, add_ast_stats_arguments),
+    'benchmark': (benchmark, add_benchmark_arguments),
+    'sweep': (sweep, add_sweep_arguments),
+    'stress': (stress, add_stress_arguments),
+    'collate': (collate, add_collate_arguments),
+    'calculate': (calculate, add_calculate_arguments),
+    'correlate': (correlate, add_correlate_arguments),
+    'graphs': (graphs, add_graphs_arguments),
+}
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser()
+    subparsers = parser.add_subparsers()
+    # The defaults and choices of a command's arguments come from the modules which run it, and importing every one of
+    # these modules (and parso with them) would take longer than many commands do. So the arguments are only added for
+    # the command being run, which is always the first argument.
+    command_name = sys.argv[1] if len(sys.argv) > 1 else None
+    for name, (func, add_arguments) in COMMANDS.items():
+        command_parser = subparsers.add_parser(name)
+        if name == command_name:
+            add_arguments(command_parser)
+        command_parser.set_defaults(func=func)
 
     parsed_args = parser.parse_args()
     parsed_args.func(parsed_args)
@@ -1,2 +1,3 @@
-from .generate import *
-from .names import *
+from pwz_bench.utility.lazy import lazy_star_imports
+
+__getattr__ = lazy_star_imports(__name__, ['.generate', '.names'])
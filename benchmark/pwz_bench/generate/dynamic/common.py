@@ -67,19 +67,73 @@ let string_token_assoc : (string * token) list =
     [ {string_token_assoc_elements}
     ]
 
+(* The tokens without parameters, keyed by the names they are written with in .lex files. *)
+let string_token_table : (string, token) Hashtbl.t = Hashtbl.of_alist_exn (module String) string_token_assoc
+
+(*
+ *  Only parameterized tokens are written with a space, as `NAME "param"`, so the space is found directly and the name
+ *  before it selects the constructor. The parameter is everything between the first and last quotation marks.
+ *)
+let parameterized_token_of_string (s : string) (space : int) : token =
+    let len = String.length s in
+    if len < space + 3 || not (Char.equal s.[space + 1] '"') || not (Char.equal s.[len - 1] '"')
+    then failwith ("Could not read parameterized token '" ^ s ^ "'.");
+    let param = String.sub s ~pos:(space + 2) ~len:(len - space - 3) in
+    match String.sub s ~pos:0 ~len:space with{parameterized_token_of_string_clauses}
+    | _ -> failwith ("Could not find parameterized token '" ^ s ^ "'.")
+
 let token_of_string (s : string) : token =
-    let pat_match (pat : string) : bool = Str.string_match (Str.regexp pat) s 0 in
-    let matched (s : string) : string = Str.matched_group 1 s in
-    if pat_match {token_of_string_patterns}
-    else try  List.Assoc.find_exn ~equal:String.equal string_token_assoc s
-         with Not_found -> failwith ("Could not find token '" ^ s ^ "' in string_token_assoc.")
+    match String.index s ' ' with
+    | Some space -> parameterized_token_of_string s space
+    | None       -> match Hashtbl.find string_token_table s with
+                    | Some t -> t
+                    | None   -> failwith ("Could not find token '" ^ s ^ "' in string_token_assoc.")
 
 let token_pair_of_string (s : string) : token_pair = token_pair_of_token (token_of_string s)
+
+(* The reader of binary .blex files. The format is described in pwz_bench/utility/tokenize/blex.py. *)
+let blex_magic : string = "PWZLEX\\000\\001"
+let no_parameter : int = 0xFFFFFFFF
+
+let u32_at (s : string) (pos : int) : int =
+    (Char.to_int s.[pos])
+    lor ((Char.to_int s.[pos + 1]) lsl 8)
+    lor ((Char.to_int s.[pos + 2]) lsl 16)
+    lor ((Char.to_int s.[pos + 3]) lsl 24)
+
+let token_of_tag (tag : tag) (param : string) : token =
+    match tag with
+    | {token_of_tag_clauses}
+    | _ -> failwith ("Could not find token with tag " ^ Int.to_string tag ^ ".")
+
+let tokens_of_blex (s : string) : token list =
+    let string_count = u32_at s 8 in
+    let token_count = u32_at s 12 in
+    let strings = Array.create ~len:string_count "" in
+    let pos = ref 16 in
+    for i = 0 to string_count - 1 do
+        let len = u32_at s !pos in
+        strings.(i) <- String.sub s ~pos:(!pos + 4) ~len;
+        pos := !pos + 4 + len
+    done;
+    let start = (!pos + 3) land (lnot 3) in
+    if String.length s <> start + 8 * token_count
+    then failwith "The binary lex file has the wrong length for its tokens.";
+    List.init token_count ~f:(fun i ->
+        let param = u32_at s (start + 8 * i + 4) in
+        token_of_tag (u32_at s (start + 8 * i)) (if param = no_parameter then "" else strings.(param)))
+
+(* Reads the tokens of a lex file, which may be either a .lex file of one token per line or a binary .blex file. *)
+let tokens_of_lex_file (filename : string) : token list =
+    let contents = In_channel.read_all filename in
+    if String.is_prefix contents ~prefix:blex_magic
+    then tokens_of_blex contents
+    else List.map (String.split_lines contents) ~f:token_of_string
 """
 
 
 def gen_pytokens_ml(desc: GrammarDescription) -> List[str]:
-    all_tokens = set(chain(desc.tokens.named, desc.tokens.nameless, map(lambda p: p[0], desc.tokens.typed)))
+    tags = desc.token_tags
     lines = PYTOKENS_ML.format(
         token_type_def='\n    | '.join(chain((f"{n}_" for n in chain(desc.tokens.named,
                                                                      desc.tokens.nameless)),
@@ -89,20 +143,22 @@ def gen_pytokens_ml(desc: GrammarDescription) -> List[str]:
                                                                 desc.tokens.nameless)),
                                                       map(lambda p: make_string_of_token(p[0], True),
                                                           desc.tokens.typed))),
-        token_pair_of_token_clauses='\n    | '.join(chain(map(lambda t: make_token_pair_of_token(t, False),
+        token_pair_of_token_clauses='\n    | '.join(chain(map(lambda t: make_token_pair_of_token(t, tags[t], False),
                                                               chain(desc.tokens.named,
                                                                     desc.tokens.nameless)),
-                                                          map(lambda p: make_token_pair_of_token(p[0], True),
+                                                          map(lambda p: make_token_pair_of_token(p[0], tags[p[0]],
+                                                                                                 True),
                                                               desc.tokens.typed))),
+        token_of_tag_clauses='\n    | '.join(chain(map(lambda t: make_token_of_tag(t, tags[t], False),
+                                                       chain(desc.tokens.named,
+                                                             desc.tokens.nameless)),
+                                                   map(lambda p: make_token_of_tag(p[0], tags[p[0]], True),
+                                                       desc.tokens.typed))),
         string_token_assoc_elements='\n    ; '.join(map(make_string_token_assoc,
                                                         chain(desc.tokens.named,
                                                               desc.tokens.nameless))),  # Typed tokens are not added.
-        token_of_string_patterns='\n    else if pat_match '.join(chain(
-            [fr'"^{token.name}$" then {token.name}_'
-             for token in AMORPHOUS_TOKENS
-             if token.name in all_tokens],
-            [fr'"^{token.name} \"\\(.*\\)\"$" then {token.name}_ (matched s)'
-             for token in PARAMETERIZED_TOKENS
-             if token.name in all_tokens]))
+        # A grammar may have no parameterized tokens, in which case the match has only its default case.
+        parameterized_token_of_string_clauses=''.join(f'\n    | "{token}" -> {token}_ param'
+                                                      for token, _ in desc.tokens.typed)
     ).split('\n')
     return lines
@@ -27,6 +27,9 @@ PYMEN_MLY_REST = """\
 /* Token Parsers */
 {token_parsers}
 
+/* Entry Point */
+{entry_point}: {entry_symbol} {{ $1 }}
+
 /* Main Grammar Parsers */
 {grammar_parsers}
 """
@@ -38,7 +41,9 @@ def gen_pymen_mly(desc: GrammarDescription) -> List[str]:
         token_definitions='\n'.join(chain((f"%token {tok}_" for tok in chain(desc.tokens.named,
                                                                              desc.tokens.nameless)),
                                           (f"%token <{ty}> {tok}_" for tok, ty in desc.tokens.typed))),
-        start_symbols='\n'.join(f"%start <Pyast.ast> {ss}" for ss in desc.start_symbols),
+        start_symbols='\n'.join(f"%start <Pyast.ast> {ss}" for ss in chain(desc.start_symbols, [ENTRY_POINT])),
+        entry_point=ENTRY_POINT,
+        entry_symbol=desc.entry_symbol,
         token_parsers='\n'.join(chain((f"{token}: {token}_ {{ tok \"{token}\" }}"
                                        for token in chain(desc.tokens.named,
                                                           desc.tokens.nameless)),
@@ -12,14 +12,18 @@ open Pytokens
 open Pwd_binary
 
 let rec {grammar_rules}
+
+let {entry_point} = {entry_symbol}
 """
 
 
 def gen_pwd_binary_pygram_ml(desc: GrammarDescription) -> List[str]:
     prefix = 'pwd_binary_rule_'
     lines = PWD_BINARY_PYGRAM_ML.format(
+        entry_point=f'{prefix}{ENTRY_POINT}',
+        entry_symbol=f'{prefix}{desc.entry_symbol}',
         grammar_rules='\n    and '.join(chain(
-            (f"{prefix}{token} = lazy (Tok {token_pair_of_token(token)})"
+            (f"{prefix}{token} = lazy (Tok {token_pair_of_token(token, desc.token_tags[token])})"
              for token in chain(desc.tokens.named,
                                 desc.tokens.nameless,
                                 map(lambda p: p[0], desc.tokens.typed))),
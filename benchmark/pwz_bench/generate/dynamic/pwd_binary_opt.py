@@ -12,6 +12,8 @@ open Pytokens
 open Pwd_binary_opt
 
 let rec {grammar_rules}
+
+let {entry_point} = {entry_symbol}
 """
 
 
@@ -21,8 +23,10 @@ NODE_FILLER = "nullable = Nullable_unvisited; listeners = []; key = false_token;
 def gen_pwd_binary_opt_pygram_ml(desc: GrammarDescription) -> List[str]:
     prefix = 'pwd_binary_opt_rule_'
     lines = PWD_BINARY_OPT_PYGRAM_ML.format(
+        entry_point=f'{prefix}{ENTRY_POINT}',
+        entry_symbol=f'{prefix}{desc.entry_symbol}',
         grammar_rules='\n    and '.join(chain(
-            (f"{prefix}{token} = make_token_node (fun c -> fst c == {TokenEnum[token].tag}) \"{token}\""
+            (f"{prefix}{token} = make_token_node (fun c -> fst c == {desc.token_tags[token]}) \"{token}\""
              for token in chain(desc.tokens.named,
                                 desc.tokens.nameless,
                                 map(lambda p: p[0], desc.tokens.typed))),
@@ -12,6 +12,8 @@ open Pytokens
 open Pwz_nary
 
 let rec {grammar_rules}
+
+let {entry_point} = {entry_symbol}
 """
 
 
@@ -21,8 +23,10 @@ M_BOT = 'm_bottom'
 def gen_pwz_nary_pygram_ml(desc: GrammarDescription) -> List[str]:
     prefix = 'pwz_nary_rule_'
     lines = PWZ_NARY_PYGRAM_ML.format(
+        entry_point=f'{prefix}{ENTRY_POINT}',
+        entry_symbol=f'{prefix}{desc.entry_symbol}',
         grammar_rules='\n    and '.join(chain(
-            (f"{prefix}{token} = {{ m = {M_BOT}; e' = Tok {token_pair_of_token(token)} }}"
+            (f"{prefix}{token} = {{ m = {M_BOT}; e' = Tok {token_pair_of_token(token, desc.token_tags[token])} }}"
              for token in chain(desc.tokens.named,
                                 desc.tokens.nameless,
                                 map(lambda p: p[0], desc.tokens.typed))),
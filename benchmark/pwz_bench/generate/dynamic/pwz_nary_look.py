@@ -13,6 +13,8 @@ open Pwz_nary_look
 
 let rec {grammar_rules}
 
+let {entry_point} = {entry_symbol}
+
 let tok_grammars = [ {tok_grammars} ]
 
 let () = compute_parents_from_roots [ {start_symbols} ]
@@ -28,8 +30,10 @@ def gen_pwz_nary_look_pygram_ml(desc: GrammarDescription) -> List[str]:
     prefix = 'pwz_nary_look_rule_'
     no_tokens = sum(map(len, (desc.tokens.named, desc.tokens.nameless, desc.tokens.typed)))
     lines = PWZ_NARY_LOOK_PYGRAM_ML.format(
+        entry_point=f'{prefix}{ENTRY_POINT}',
+        entry_symbol=f'{prefix}{desc.entry_symbol}',
         grammar_rules='\n    and '.join(chain(
-            (f"{prefix}{token} = {{ m = {M_BOT}; e' = Tok {token_pair_of_token(token)}; "
+            (f"{prefix}{token} = {{ m = {M_BOT}; e' = Tok {token_pair_of_token(token, desc.token_tags[token])}; "
              f"lookahead = Array.make {no_tokens} false; follow = Array.make {no_tokens} false; parents = []; }}"
              for token in chain(desc.tokens.named,
                                 desc.tokens.nameless,
@@ -5,31 +5,37 @@ from pwz_bench.utility import *
 
 from itertools import chain
 from pathlib import Path
-from typing import Dict, List
+from typing import List, Optional
 
 
-__all__ = ['SUPPORTED_PARSERS', 'generate_parsers']
+__all__ = ['generate_parsers']
 
 
 STATIC_FILES = Path(__file__).parent / 'static'
 
-SUPPORTED_PARSERS: Dict[str, ParserEnum] = {parser.value: parser for parser in list(ParserEnum)}
 
-
-def generate_parsers(parsers: List[ParserEnum], output_dir: Path, grammar_file: str, start_symbols: List[str]):
-    g = Grammar.build_from_file(grammar_file)
-    grammar_desc = GrammarDescription(g, start_symbols)
+def generate_parsers(parsers: List[ParserEnum], output_dir: Path, grammar_file: str, start_symbols: List[str],
+                     options: TransformOptions = DEFAULT_TRANSFORM_OPTIONS, entry_symbol: Optional[str] = None,
+                     instrumented: bool = False):
+    """
+    Generates the code of the parsers for a grammar in the output directory. If `instrumented` is set, the
+    instrumentation hooks of the parsers are compiled in, for attributing and counting their work; this build is only
+    for `heatmap` and `rule-profile`, and should not be used for benchmarking.
+    """
+    g = Grammar.build_from_file(grammar_file, options)
+    grammar_desc = GrammarDescription(g, start_symbols, entry_symbol)
     for generator in chain(*COMMON_GENERATORS.values()):
-        generate_file(generator, output_dir, grammar_desc)
+        generate_file(generator, output_dir, grammar_desc, instrumented=instrumented)
     for parser in parsers:
         for generator in PARSER_GENERATORS[parser]:
-            generate_file(generator, output_dir, grammar_desc, suffix=parser.value)
+            generate_file(generator, output_dir, grammar_desc, suffix=parser.value, instrumented=instrumented)
 
 
-def generate_file(generator: FileGenerator, destination_base: Path, grammar_desc: GrammarDescription, suffix: str = ''):
+def generate_file(generator: FileGenerator, destination_base: Path, grammar_desc: GrammarDescription, suffix: str = '',
+                  instrumented: bool = False):
     if isinstance(generator, DynamicFileGenerator):
         generator.generate(destination_base / suffix, grammar_desc)
     elif isinstance(generator, StaticFileGenerator):
-        generator.generate(STATIC_FILES / suffix, destination_base / suffix)
+        generator.generate(STATIC_FILES / suffix, destination_base / suffix, instrumented)
     else:
         raise RuntimeError(f"Unknown FileGenerator value encountered: {generator.__class__.__name__}.")
@@ -12,6 +12,7 @@ __all__ = ['COMMON_GENERATORS', 'PARSER_GENERATORS']
 COMMON_GENERATORS: Dict[CommonEnum, List[FileGenerator]] = {
     CommonEnum.FIRST: [
         StaticFileGenerator('benchmarking.ml'),
+        StaticFileGenerator('instrument.ml'),
         StaticFileGenerator('pyast.ml'),
         DynamicFileGenerator(gen_pytokens_ml, 'pytokens.ml'),
         StaticFileGenerator('interface.ml'),
@@ -19,10 +20,12 @@ COMMON_GENERATORS: Dict[CommonEnum, List[FileGenerator]] = {
     ],
     CommonEnum.LAST: [
         StaticFileGenerator('pwz_cli_common.ml'),
+        StaticFileGenerator('pwz_serve_common.ml'),
     ],
     CommonEnum.FINAL: [
         StaticFileGenerator('pwz_bench.ml'),
         StaticFileGenerator('pwz_parse.ml'),
+        StaticFileGenerator('pwz_serve.ml'),
     ],
     CommonEnum.SPECIAL: [
         StaticFileGenerator('Makefile'),
@@ -33,49 +36,59 @@ PARSER_GENERATORS: Dict[ParserEnum, List[FileGenerator]] = {
     ParserEnum.MENHIR: [
         DynamicFileGenerator(gen_pymen_mly, 'pymen.mly'),
         StaticFileGenerator('menhir_interface.ml'),
+        StaticFileGenerator('menhir_serve.ml'),
     ],
     ParserEnum.DYPGEN: [
         DynamicFileGenerator(gen_pydyp_dyp, 'pydyp.dyp'),
         StaticFileGenerator('dypgen_interface.ml'),
+        StaticFileGenerator('dypgen_serve.ml'),
     ],
     ParserEnum.PWZ_NARY: [
         StaticFileGenerator('pwz_nary.ml'),
         DynamicFileGenerator(gen_pwz_nary_pygram_ml, 'pwz_nary_pygram.ml'),
         StaticFileGenerator('pwz_nary_interface.ml'),
+        StaticFileGenerator('pwz_nary_serve.ml'),
     ],
     ParserEnum.PWZ_NARY_LIST: [
         StaticFileGenerator('pwz_nary_list.ml'),
         DynamicFileGenerator(gen_pwz_nary_list_pygram_ml, 'pwz_nary_list_pygram.ml'),
         StaticFileGenerator('pwz_nary_list_interface.ml'),
+        StaticFileGenerator('pwz_nary_list_serve.ml'),
     ],
     ParserEnum.PWZ_NARY_LOOK: [
         StaticFileGenerator('pwz_nary_look.ml'),
         DynamicFileGenerator(gen_pwz_nary_look_pygram_ml, 'pwz_nary_look_pygram.ml'),
         StaticFileGenerator('pwz_nary_look_interface.ml'),
+        StaticFileGenerator('pwz_nary_look_serve.ml'),
     ],
     ParserEnum.PWZ_BINARY: [
         StaticFileGenerator('pwz_binary.ml'),
         DynamicFileGenerator(gen_pwz_binary_pygram_ml, 'pwz_binary_pygram.ml'),
         StaticFileGenerator('pwz_binary_interface.ml'),
+        StaticFileGenerator('pwz_binary_serve.ml'),
     ],
     ParserEnum.PWD_BINARY: [
         StaticFileGenerator('pwd_binary.ml'),
         DynamicFileGenerator(gen_pwd_binary_pygram_ml, 'pwd_binary_pygram.ml'),
         StaticFileGenerator('pwd_binary_interface.ml'),
+        StaticFileGenerator('pwd_binary_serve.ml'),
     ],
     ParserEnum.PWD_BINARY_OPT: [
         StaticFileGenerator('pwd_binary_opt.ml'),
         DynamicFileGenerator(gen_pwd_binary_opt_pygram_ml, 'pwd_binary_opt_pygram.ml'),
         StaticFileGenerator('pwd_binary_opt_interface.ml'),
+        StaticFileGenerator('pwd_binary_opt_serve.ml'),
     ],
     ParserEnum.PWD_NARY: [
         StaticFileGenerator('pwd_nary.ml'),
         DynamicFileGenerator(gen_pwd_nary_pygram_ml, 'pwd_nary_pygram.ml'),
         StaticFileGenerator('pwd_nary_interface.ml'),
+        StaticFileGenerator('pwd_nary_serve.ml'),
     ],
     ParserEnum.PWD_NARY_OPT: [
         StaticFileGenerator('pwd_nary_opt.ml'),
         DynamicFileGenerator(gen_pwd_nary_opt_pygram_ml, 'pwd_nary_opt_pygram.ml'),
         StaticFileGenerator('pwd_nary_opt_interface.ml'),
+        StaticFileGenerator('pwd_nary_opt_serve.ml'),
     ],
 }
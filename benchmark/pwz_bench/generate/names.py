@@ -1,7 +1,8 @@
 from enum import Enum, unique
+from typing import Dict
 
 
-__all__ = ['ParserEnum', 'CommonEnum']
+__all__ = ['ParserEnum', 'SUPPORTED_PARSERS', 'CommonEnum']
 
 
 @unique
@@ -18,6 +19,9 @@ class ParserEnum(Enum):
     PWD_NARY_OPT = 'pwd_nary_opt'
 
 
+SUPPORTED_PARSERS: Dict[str, ParserEnum] = {parser.value: parser for parser in list(ParserEnum)}
+
+
 @unique
 class CommonEnum(Enum):
     FIRST = 'first'
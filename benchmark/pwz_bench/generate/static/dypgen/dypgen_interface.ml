@@ -8,7 +8,7 @@ module DypgenParserInterface = struct
     let lex (lexbuf : (tok list) ref) : tok =
       match !lexbuf with
       | []    -> failwith "dypgen lexbuf is empty but lexer called for new token!"
-      | t::ts -> lexbuf := ts; t in
+      | t::ts -> lexbuf := ts; (*INSTRUMENT Instrument.advance (); *) t in
     (lex, ref tokens)
 
   let parse (tokens : tok list) : res =
@@ -18,7 +18,7 @@ module DypgenParserInterface = struct
         (fun x -> x)                        (* library provides easy conversion capability that works.  *)
         (fun _ -> Lexing.dummy_pos)
         (fun _ -> Lexing.dummy_pos)
-        Pymen.file_input in
+        Pymen.entry_point in
     try  [start' (fun _ -> lexer lexbuf)]
     with Dyp.Syntax_error -> failwith "Invalid parse!"
 
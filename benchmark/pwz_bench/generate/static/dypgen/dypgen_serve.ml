@@ -0,0 +1,11 @@
+module Command = Core.Command
+
+open Interface
+
+(*
+ *  The parser server (see pwz_serve_common.ml), with only one parser linked in so that no other parser's grammar is
+ *  built when the program starts. The time it takes to start is then the cold start of this parser alone.
+ *)
+let parser : (module ParserInterface) = (module Dypgen_interface.DypgenParserInterface)
+
+let () = Command.run (Pwz_serve_common.command (Pwz_serve_common.only_parser "dypgen" parser))
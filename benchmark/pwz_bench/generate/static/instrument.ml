@@ -0,0 +1,114 @@
+(*
+ *  Attribution of parsing work to the positions of the tokens being parsed.
+ *
+ *  Each parser calls `step` (or `advance`, for parsers which consume their tokens strictly in order) as it begins
+ *  working on a token, and once more as it begins working on the end of the input. All of the work done from then until
+ *  the next call is charged to that position. Two measures of work are kept: the time elapsed, and the number of words
+ *  allocated on the minor heap. The latter is deterministic, so it does not need to be averaged over many parses.
+ *
+ *  The calls are instrumentation hooks, which are only compiled into the parsers of an instrumented build (made by
+ *  `generate --instrumented`), so the parsers that are benchmarked do not make them at all. Even then, attribution is
+ *  disabled unless a parse is started with `begin_parse`.
+ *)
+
+(* Whether the parsers were built with their instrumentation hooks. Only then do the parsers call this module. *)
+let hooks_compiled : bool = false (*INSTRUMENT || true *)
+
+let require_hooks () : unit =
+    if not hooks_compiled
+    then failwith "The parsers were built without instrumentation; generate them with `generate --instrumented`."
+
+let enabled : bool ref = ref false
+
+(* The position currently being charged, or -1 before the first token. *)
+let current : int ref = ref (-1)
+
+let seconds : (float array) ref = ref [||]
+let words : (float array) ref = ref [||]
+
+let last_time : float ref = ref 0.0
+let last_words : float ref = ref 0.0
+
+(* Prepare to attribute the work of parsing `n` tokens. Position `n` is the end of the input. *)
+let start (n : int) : unit =
+    seconds := Array.make (n + 1) 0.0;
+    words := Array.make (n + 1) 0.0
+
+let charge () : unit =
+    let now_time = Unix.gettimeofday () in
+    let now_words = Gc.minor_words () in
+    let p = !current in
+    if p >= 0 && p < Array.length !seconds then begin
+        !seconds.(p) <- !seconds.(p) +. (now_time -. !last_time);
+        !words.(p) <- !words.(p) +. (now_words -. !last_words)
+    end;
+    last_time := now_time;
+    last_words := now_words
+
+(* Begin attributing the work of a single parse. This may be done many times after `start`, and the costs accumulate. *)
+let begin_parse () : unit =
+    enabled := true;
+    current := -1;
+    last_time := Unix.gettimeofday ();
+    last_words := Gc.minor_words ()
+
+(* Stop attributing work, charging anything left over to the last position. *)
+let end_parse () : unit =
+    if !enabled then begin
+        charge ();
+        enabled := false
+    end
+
+(* Note that the parser has begun working on the token at position `p`. *)
+let step (p : int) : unit =
+    if !enabled then begin
+        charge ();
+        current := p
+    end
+
+(* Note that the parser has begun working on the token after the one it was working on. *)
+let advance () : unit =
+    if !enabled then begin
+        charge ();
+        current := !current + 1
+    end
+
+(*
+ *  Counting of the work done on behalf of each production label.
+ *
+ *  The parsers whose sequences carry the label of the production they came from call `count_derive` when they work
+ *  on a sequence on the way down (deriving it, or moving into its next child) and `count_rebuild` when they build a
+ *  sequence's result on the way up (completing it in the zipper, or compacting it). As with attribution, these are
+ *  only called in an instrumented build, and are disabled unless begun with `begin_counting`.
+ *)
+
+let counting : bool ref = ref false
+
+(* The number of derive and rebuild steps taken for each label. *)
+let label_counts : (string, int array) Hashtbl.t = Hashtbl.create 1024
+
+let begin_counting () : unit =
+    Hashtbl.reset label_counts;
+    counting := true
+
+let end_counting () : unit =
+    counting := false
+
+let count (i : int) (label : string) : unit =
+    match Hashtbl.find_opt label_counts label with
+    | Some counts -> counts.(i) <- counts.(i) + 1
+    | None        -> let counts = [| 0; 0 |] in
+                     counts.(i) <- 1;
+                     Hashtbl.add label_counts label counts
+
+let count_derive (label : string) : unit =
+    if !counting then count 0 label
+
+let count_rebuild (label : string) : unit =
+    if !counting then count 1 label
+
+(* Write one line for each label, giving the label and its derive and rebuild counts. *)
+let write_label_counts (filename : string) : unit =
+    let out = open_out filename in
+    Hashtbl.iter (fun label counts -> Printf.fprintf out "%s %d %d\n" label counts.(0) counts.(1)) label_counts;
+    close_out out
@@ -8,7 +8,7 @@ module MenhirParserInterface = struct
     let lex (lexbuf : (tok list) ref) : tok =
       match !lexbuf with
       | []    -> failwith "menhir lexbuf is empty but lexer called for new token!"
-      | t::ts -> lexbuf := ts; t in
+      | t::ts -> lexbuf := ts; (*INSTRUMENT Instrument.advance (); *) t in
     (lex, ref tokens)
 
   let parse (tokens : tok list) : res =
@@ -18,7 +18,7 @@ module MenhirParserInterface = struct
         (fun x -> x)
         (fun _ -> Lexing.dummy_pos)
         (fun _ -> Lexing.dummy_pos)
-        Pymen.file_input in
+        Pymen.entry_point in
     try  [start' (fun _ -> lexer lexbuf)]
     with Pymen.Error -> failwith "Invalid parse!"
 
@@ -166,7 +166,8 @@ let rec derive (g : grammar) (tok : tok) : grammar =
           | Nil              -> Nil
           | Eps _            -> Nil
           | Tok (t', _)      -> if t == t' then Eps (lazy [Pyast.Ast (l, [])]) else Nil
-          | Seq (l', g1, g2) -> if is_nullable g1
+          | Seq (l', g1, g2) -> (*INSTRUMENT Instrument.count_derive l'; *)
+                                if is_nullable g1
                                 then Alt (lazy (Seq (l', derive g1 tok, g2)),
                                           lazy (Seq (l', mk_eps_star g1, derive g2 tok)))
                                 else Seq (l', derive g1 tok, g2)
@@ -192,9 +193,12 @@ let rec make_compact (g : grammar) : grammar =
           | _ when is_empty g             -> Nil
           | _ when nullp g                -> let t = !nullp_t in Eps (lazy [t])
           (* Sequence compaction. *)
-          | Seq (l, g1, g2) when nullp g1 -> let t1 = !nullp_t in Red ((fun t2 -> Pyast.Ast (l, [t1; t2])), make_compact g2)
-          | Seq (l, g1, g2) when nullp g2 -> let t2 = !nullp_t in Red ((fun t1 -> Pyast.Ast (l, [t1; t2])), make_compact g1)
-          | Seq (l, g1, g2)               -> Seq (l, make_compact g1, make_compact g2)
+          | Seq (l, g1, g2) when nullp g1 -> (*INSTRUMENT Instrument.count_rebuild l; *)
+                                             let t1 = !nullp_t in Red ((fun t2 -> Pyast.Ast (l, [t1; t2])), make_compact g2)
+          | Seq (l, g1, g2) when nullp g2 -> (*INSTRUMENT Instrument.count_rebuild l; *)
+                                             let t2 = !nullp_t in Red ((fun t1 -> Pyast.Ast (l, [t1; t2])), make_compact g1)
+          | Seq (l, g1, g2)               -> (*INSTRUMENT Instrument.count_rebuild l; *)
+                                             Seq (l, make_compact g1, make_compact g2)
           (* Alternate compaction. *)
           | Alt (g1, g2) when is_empty g1 -> Lazy.force (make_compact g2)
           | Alt (g1, g2) when is_empty g2 -> Lazy.force (make_compact g1)
@@ -208,8 +212,10 @@ let rec make_compact (g : grammar) : grammar =
 let rec parse_compact (ts : tok list) (g : grammar) : Pyast.ast list =
   force_grammar g;
   match ts with
-  | []        -> parse_null g
-  | t :: ts'  -> parse_compact ts' (make_compact (derive g t))
+  | []        -> (*INSTRUMENT Instrument.advance (); *)
+                 parse_null g
+  | t :: ts'  -> (*INSTRUMENT Instrument.advance (); *)
+                 parse_compact ts' (make_compact (derive g t))
 
 let parse (ts : tok list) (g : grammar) : Pyast.ast list =
   List.iter (fun f -> f ()) [ clear_force_grammar_visited_cache
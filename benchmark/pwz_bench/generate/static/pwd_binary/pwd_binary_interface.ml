@@ -5,7 +5,7 @@ module PwdBinaryParserInterface = struct
   let process_tokens (tokens : Pytokens.token list) : tok list =
     List.map Pytokens.token_pair_of_token tokens
 
-  let parse (tokens : tok list) : res = Pwd_binary.parse tokens Pwd_binary_pygram.pwd_binary_rule_file_input
+  let parse (tokens : tok list) : res = Pwd_binary.parse tokens Pwd_binary_pygram.pwd_binary_rule_entry_point
 
   let process_result (result : res) : Pyast.ast =
     match result with
@@ -262,8 +262,10 @@ let rec derive l c =
 
 let rec parse' l s =
   match s with
-  | [] -> parse_tree l
-  | c :: s' -> parse' (derive l c) s'
+  | [] -> (*INSTRUMENT Instrument.advance (); *)
+          parse_tree l
+  | c :: s' -> (*INSTRUMENT Instrument.advance (); *)
+               parse' (derive l c) s'
 
 let parse l s =
   parse' l (List.map (fun (t, l) -> (t, l)) s)
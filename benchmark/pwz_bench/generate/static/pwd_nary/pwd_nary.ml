@@ -189,7 +189,8 @@ let rec derive (g : grammar) (tok : tok) : grammar =
           | Eps _        -> Nil
           | Tok (t', _)  -> if t == t' then Eps (lazy [Pyast.Ast (l, [])]) else Nil
           | Seq (l', []) -> Nil
-          | Seq (l', gs) -> Alt (derive_seq l' gs)
+          | Seq (l', gs) -> (*INSTRUMENT Instrument.count_derive l'; *)
+                            Alt (derive_seq l' gs)
           | Alt gs       -> Alt (List.map (fun g -> derive g tok) gs)
           | Red (f, g)   -> Red (f, derive g tok)) in
   memoize2 derive_cache derive' g tok
@@ -212,10 +213,14 @@ let rec make_compact (g : grammar) : grammar =
           | _ when is_empty g               -> Nil
           | _ when nullp g                  -> let t = !nullp_t in Eps (lazy [t])
           (* Sequence compaction. *)
-          | Seq (l, [g])                    -> Red ((fun t -> Pyast.Ast (l, [t])), make_compact g)
-          | Seq (l, [g1; g2]) when nullp g1 -> let t1 = !nullp_t in Red ((fun t -> Pyast.Ast (l, [t1; t])), make_compact g2)
-          | Seq (l, g :: gs) when nullp g   -> let t1 = !nullp_t in Red ((fun t -> match t with Pyast.Ast (l', ts) -> Pyast.Ast (l', t1 :: ts)), lazy (Seq (l, List.map make_compact gs)))
-          | Seq (l, gs)                     -> Seq (l, List.map make_compact gs)
+          | Seq (l, [g])                    -> (*INSTRUMENT Instrument.count_rebuild l; *)
+                                               Red ((fun t -> Pyast.Ast (l, [t])), make_compact g)
+          | Seq (l, [g1; g2]) when nullp g1 -> (*INSTRUMENT Instrument.count_rebuild l; *)
+                                               let t1 = !nullp_t in Red ((fun t -> Pyast.Ast (l, [t1; t])), make_compact g2)
+          | Seq (l, g :: gs) when nullp g   -> (*INSTRUMENT Instrument.count_rebuild l; *)
+                                               let t1 = !nullp_t in Red ((fun t -> match t with Pyast.Ast (l', ts) -> Pyast.Ast (l', t1 :: ts)), lazy (Seq (l, List.map make_compact gs)))
+          | Seq (l, gs)                     -> (*INSTRUMENT Instrument.count_rebuild l; *)
+                                               Seq (l, List.map make_compact gs)
           (* Alternate compaction. *)
           | Alt gs                          -> Alt (List.map make_compact (List.filter (fun g -> not (is_empty g)) gs))
           (* Reduction compaction. *)
@@ -227,8 +232,10 @@ let rec make_compact (g : grammar) : grammar =
 let rec parse_compact (ts : tok list) (g : grammar) : Pyast.ast list =
   force_grammar g;
   match ts with
-  | []       -> parse_null g
-  | t :: ts' -> parse_compact ts' (make_compact (derive g t))
+  | []       -> (*INSTRUMENT Instrument.advance (); *)
+                parse_null g
+  | t :: ts' -> (*INSTRUMENT Instrument.advance (); *)
+                parse_compact ts' (make_compact (derive g t))
 
 let parse (ts : tok list) (g : grammar) : Pyast.ast list =
   List.iter (fun f -> f ()) [ clear_force_grammar_visited_cache
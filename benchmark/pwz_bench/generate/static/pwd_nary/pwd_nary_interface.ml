@@ -5,7 +5,7 @@ module PwdNaryParserInterface = struct
   let process_tokens (tokens : Pytokens.token list) : tok list =
     List.map Pytokens.token_pair_of_token tokens
 
-  let parse (tokens : tok list) : res = Pwd_nary.parse tokens Pwd_nary_pygram.pwd_nary_rule_file_input
+  let parse (tokens : tok list) : res = Pwd_nary.parse tokens Pwd_nary_pygram.pwd_nary_rule_entry_point
 
   let process_result (result : res) : Pyast.ast =
     match result with
@@ -5,7 +5,7 @@ module PwdNaryOptParserInterface = struct
   let process_tokens (tokens : Pytokens.token list) : tok list =
     List.map Pytokens.token_pair_of_token tokens
 
-  let parse (tokens : tok list) : res = Pwd_nary_opt.parse Pwd_nary_opt_pygram.pwd_nary_opt_rule_file_input tokens
+  let parse (tokens : tok list) : res = Pwd_nary_opt.parse Pwd_nary_opt_pygram.pwd_nary_opt_rule_entry_point tokens
 
   let process_result (result : res) : Pyast.ast =
     match result with
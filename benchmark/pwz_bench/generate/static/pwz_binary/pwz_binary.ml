@@ -50,9 +50,11 @@ let derive (p : pos) ((t, s) : tok) ((e', m) : zipper) : unit =
 
   and d_d' (m : mem) (e' : exp') : unit =
     match e' with
-    | Eps (s)         -> d_u (Eps s) m
+    | Eps (s)         -> (*INSTRUMENT Instrument.count_rebuild s; *)
+                         d_u (Eps s) m
     | Tok (t', _)     -> if t == t' then worklist := (Eps s, m) :: !worklist
-    | Seq (s, e1, e2) -> d_d (SeqC1 (ref m, s, e2)) e1
+    | Seq (s, e1, e2) -> (*INSTRUMENT Instrument.count_derive s; *)
+                         d_d (SeqC1 (ref m, s, e2)) e1
     | Alt (e1, e2)    -> (match !e1 with Some e1' -> d_d (AltC1 m) e1' | None -> ());
                          (match !e2 with Some e2' -> d_d (AltC2 m) e2' | None -> ())
     | Red (f, e)      -> d_d (RedC (m, f)) e
@@ -66,12 +68,14 @@ let derive (p : pos) ((t, s) : tok) ((e', m) : zipper) : unit =
   and d_u' (e : exp) (c : cxt) : unit =
     match c with
     | TopC             -> tops := e :: !tops
-    | SeqC1 (m, s, e2) -> let m1 = { start_pos = !m.start_pos; parents = [AltC1 !m]; end_pos = p_bottom; result = e_bottom } in
+    | SeqC1 (m, s, e2) -> (*INSTRUMENT Instrument.count_derive s; *)
+                          let m1 = { start_pos = !m.start_pos; parents = [AltC1 !m]; end_pos = p_bottom; result = e_bottom } in
                           let m2 = { start_pos = !m.start_pos; parents = [AltC2 !m]; end_pos = p_bottom; result = e_bottom } in
                           let s2 = SeqC2 (m2, s, e) in
                           m := m1;
                           d_d s2 e2
-    | SeqC2 (m, s, e1) -> d_u (Seq (s, e1, e)) m
+    | SeqC2 (m, s, e1) -> (*INSTRUMENT Instrument.count_rebuild s; *)
+                          d_u (Seq (s, e1, e)) m
     | AltC1 m          -> if m.end_pos == p
                           then match m.result.e' with
                                | Alt (e1, e2) -> e1 := Some e
@@ -102,9 +106,11 @@ let parse (ts : tok list) (e : exp) : exp list =
     worklist := [];
     tops := [];
     match ts with
-    | []            -> List.iter (derive p t_eof) w;
+    | []            -> (*INSTRUMENT Instrument.step !p; *)
+                       List.iter (derive p t_eof) w;
                        List.map unwrap_top_exp !tops
-    | (t, s) :: ts' -> List.iter (derive p (t, s)) w;
+    | (t, s) :: ts' -> (*INSTRUMENT Instrument.step !p; *)
+                       List.iter (derive p (t, s)) w;
                        parse' (ref (!p + 1)) ts' in
   worklist := [init_zipper e];
   parse' (ref 0) ts
@@ -6,7 +6,7 @@ module PwzBinaryParserInterface = struct
     List.map Pytokens.token_pair_of_token tokens
 
   let parse (tokens : tok list) : res =
-    Pwz_binary.parse tokens Pwz_binary_pygram.pwz_binary_rule_file_input
+    Pwz_binary.parse tokens Pwz_binary_pygram.pwz_binary_rule_entry_point
 
   let process_result (result : res) : Pyast.ast =
     match (Pwz_binary.ast_list_of_exp_list result) with
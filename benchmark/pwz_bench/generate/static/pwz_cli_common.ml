@@ -1,5 +1,4 @@
 module Assoc = Core.List.Assoc
-module In_channel = Core.In_channel
 
 open Interface
 open Pytokens
@@ -36,7 +35,6 @@ let parser_of_string (s : string) : (module ParserInterface) =
     try  Assoc.find_exn ~equal:String.equal parsers_to_interfaces s
     with Not_found -> failwith ("Could not find parser with name '" ^ s ^ "'.")
 
-(* Extract the tokens from a .lex file generated with the pwz_bench.py utility. *)
+(* Extract the tokens from a .lex or .blex file generated with the pwz_bench.py utility. *)
 let token_list_from_file (filename : string) : token list =
-    let lines = In_channel.read_lines filename in
-    List.map token_of_string lines
+    tokens_of_lex_file filename
@@ -45,8 +45,10 @@ let derive (p : pos) ((t, s) : tok) ((e', m) : zipper) : unit =
   and d_d' (m : mem) (e' : exp') : unit =
     match e' with
     | Tok (t', _)      -> if t = t' then worklist := (Seq (s, []), m) :: !worklist
-    | Seq (s, [])      -> d_u (Seq (s, [])) m
-    | Seq (s, e :: es) -> let m' = { start_pos = m.start_pos; parents = [AltC m];
+    | Seq (s, [])      -> (*INSTRUMENT Instrument.count_rebuild s; *)
+                          d_u (Seq (s, [])) m
+    | Seq (s, e :: es) -> (*INSTRUMENT Instrument.count_derive s; *)
+                          let m' = { start_pos = m.start_pos; parents = [AltC m];
                                      end_pos = p_bottom; result = e_bottom } in
                           d_d (SeqC (m', s, [], es)) e
     | Alt (es)         -> List.iter (d_d (AltC m)) !es
@@ -60,8 +62,10 @@ let derive (p : pos) ((t, s) : tok) ((e', m) : zipper) : unit =
   and d_u' (e : exp) (c : cxt) : unit =
     match c with
     | TopC                           -> tops := e :: !tops
-    | SeqC (m, s, es, [])            -> d_u (Seq (s, List.rev (e :: es))) m
-    | SeqC (m, s, es_L, e_R :: es_R) -> d_d (SeqC (m, s, e :: es_L, es_R)) e_R
+    | SeqC (m, s, es, [])            -> (*INSTRUMENT Instrument.count_rebuild s; *)
+                                        d_u (Seq (s, List.rev (e :: es))) m
+    | SeqC (m, s, es_L, e_R :: es_R) -> (*INSTRUMENT Instrument.count_derive s; *)
+                                        d_d (SeqC (m, s, e :: es_L, es_R)) e_R
     | AltC (m)                       -> if p == m.end_pos
                                         then match m.result.e' with
                                              | Alt (es) -> es := e :: !es
@@ -86,9 +90,11 @@ let parse (ts : tok list) (e : exp) : exp list =
     worklist := [];
     tops := [];
     match ts with
-    | []            -> List.iter (derive p t_eof) w;
+    | []            -> (*INSTRUMENT Instrument.step !p; *)
+                       List.iter (derive p t_eof) w;
                        List.map unwrap_top_exp !tops
-    | (t, s) :: ts' -> List.iter (derive p (t, s)) w;
+    | (t, s) :: ts' -> (*INSTRUMENT Instrument.step !p; *)
+                       List.iter (derive p (t, s)) w;
                        parse' (ref (!p + 1)) ts' in
   worklist := [init_zipper e];
   parse' (ref 0) ts
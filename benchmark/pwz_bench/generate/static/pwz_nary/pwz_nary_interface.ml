@@ -6,7 +6,7 @@ module PwzNaryParserInterface = struct
     List.map Pytokens.token_pair_of_token tokens
 
   let parse (tokens : tok list) : res =
-    Pwz_nary.parse tokens Pwz_nary_pygram.pwz_nary_rule_file_input
+    Pwz_nary.parse tokens Pwz_nary_pygram.pwz_nary_rule_entry_point
 
   let process_result (result : res) : Pyast.ast =
     match (Pwz_nary.ast_list_of_exp_list result) with
@@ -41,8 +41,10 @@ let derive (p : pos) ((t, s) : tok) ((e', m) : zipper) : zipper list =
   and d_d' (m : mem) (e' : exp') : zipper list =
     match e' with
     | Tok (t', _)      -> if t = t' then [(Seq (s, []), m)] else []
-    | Seq (s, [])      -> d_u (Seq (s, [])) m
-    | Seq (s, e :: es) -> let m' = { start_pos = m.start_pos; parents = [AltC m];
+    | Seq (s, [])      -> (*INSTRUMENT Instrument.count_rebuild s; *)
+                          d_u (Seq (s, [])) m
+    | Seq (s, e :: es) -> (*INSTRUMENT Instrument.count_derive s; *)
+                          let m' = { start_pos = m.start_pos; parents = [AltC m];
                                      end_pos = p_bottom; result = e_bottom } in
                           d_d (SeqC (m', s, [], es)) e
     | Alt (es)         -> List.concat (List.map (d_d (AltC m)) !es)
@@ -56,8 +58,10 @@ let derive (p : pos) ((t, s) : tok) ((e', m) : zipper) : zipper list =
   and d_u' (e : exp) (c : cxt) : zipper list =
     match c with
     | TopC                           -> []
-    | SeqC (m, s, es, [])            -> d_u (Seq (s, List.rev (e :: es))) m
-    | SeqC (m, s, es_L, e_R :: es_R) -> d_d (SeqC (m, s, e :: es_L, es_R)) e_R
+    | SeqC (m, s, es, [])            -> (*INSTRUMENT Instrument.count_rebuild s; *)
+                                        d_u (Seq (s, List.rev (e :: es))) m
+    | SeqC (m, s, es_L, e_R :: es_R) -> (*INSTRUMENT Instrument.count_derive s; *)
+                                        d_d (SeqC (m, s, e :: es_L, es_R)) e_R
     | AltC (m)                       -> if p == m.end_pos
                                         then match m.result.e' with
                                              | Alt (es) -> es := e :: !es; []
@@ -79,8 +83,10 @@ let unwrap_top_zipper ((e', m) : zipper) : exp =
 let parse (ts : tok list) (e : exp) : exp list =
   let rec parse' (p : pos) (ts : tok list) (z : zipper) : zipper list =
     match ts with
-    | []       -> derive p t_eof z
-    | t :: ts' -> List.concat (List.map (parse' (ref (!p + 1)) ts') (derive p t z)) in
+    | []       -> (*INSTRUMENT Instrument.step !p; *)
+                  derive p t_eof z
+    | t :: ts' -> (*INSTRUMENT Instrument.step !p; *)
+                  List.concat (List.map (parse' (ref (!p + 1)) ts') (derive p t z)) in
   List.map unwrap_top_zipper (parse' (ref 0) ts (init_zipper e))
 
 let list_product (l1 : 'a list) (l2 : ('a list) list) : ('a list) list =
@@ -6,7 +6,7 @@ module PwzNaryListParserInterface = struct
     List.map Pytokens.token_pair_of_token tokens
 
   let parse (tokens : tok list) : res =
-    Pwz_nary_list.parse tokens Pwz_nary_list_pygram.pwz_nary_list_rule_file_input
+    Pwz_nary_list.parse tokens Pwz_nary_list_pygram.pwz_nary_list_rule_entry_point
 
   let process_result (result : res) : Pyast.ast =
     match (Pwz_nary_list.ast_list_of_exp_list result) with
@@ -6,7 +6,7 @@ module PwzNaryLookParserInterface = struct
     List.map Pytokens.token_pair_of_token tokens
 
   let parse (tokens : tok list) : res =
-    Pwz_nary_look.parse tokens Pwz_nary_look_pygram.pwz_nary_look_rule_file_input
+    Pwz_nary_look.parse tokens Pwz_nary_look_pygram.pwz_nary_look_rule_entry_point
 
   let process_result (result : res) : Pyast.ast =
     match (Pwz_nary_look.ast_list_of_exp_list result) with
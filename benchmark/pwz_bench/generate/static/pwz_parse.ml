@@ -15,20 +15,69 @@ let make_ast_from_file (filename : string) ((module Parser) : (module ParserInte
     let result = Parser.parse tokens in
     Parser.process_result result
 
-let print_ast (ast : ast) : unit =
-    print_endline (unindented_string_of_ast ast)
+let print_ast (binary : bool) (ast : ast) : unit =
+    if binary
+    then (set_binary_mode_out stdout true;
+          output_binary_ast stdout ast)
+    else (output_unindented_ast stdout ast;
+          output_char stdout '\n');
+    flush stdout
 
-let parse_file_with_parser (filename : string) (parser_name : string) : unit =
-    print_ast (make_ast_from_file filename (parser_of_string parser_name))
+let parse_file_with_parser (filename : string) (parser_name : string) (binary : bool) : unit =
+    print_ast binary (make_ast_from_file filename (parser_of_string parser_name))
+
+(*
+ *  Parse the file `repeats` times with attribution enabled (see instrument.ml) and write the average cost of each token
+ *  position to a file. Each line gives the seconds and the words allocated for one position, in the order of the
+ *  tokens. The final line is for the end of the input.
+ *)
+let attribute_costs_of_file (filename : string) ((module Parser) : (module ParserInterface)) (repeats : int)
+                            (costs_filename : string) : unit =
+    Instrument.require_hooks ();
+    let tokens = Parser.process_tokens (token_list_from_file filename) in
+    Instrument.start (List.length tokens);
+    for _i = 1 to repeats do
+        Instrument.begin_parse ();
+        ignore (Parser.parse tokens);
+        Instrument.end_parse ()
+    done;
+    let n = float_of_int repeats in
+    let out = open_out costs_filename in
+    Array.iteri (fun i s -> Printf.fprintf out "%.9f %.0f\n" (s /. n) (!Instrument.words.(i) /. n)) !Instrument.seconds;
+    close_out out
+
+(*
+ *  Parse the file with label counting enabled (see instrument.ml) and write the number of derive and rebuild steps
+ *  taken for each production label to a file.
+ *)
+let count_labels_of_file (filename : string) ((module Parser) : (module ParserInterface))
+                         (labels_filename : string) : unit =
+    Instrument.require_hooks ();
+    let tokens = Parser.process_tokens (token_list_from_file filename) in
+    Instrument.begin_counting ();
+    ignore (Parser.parse tokens);
+    Instrument.end_counting ();
+    Instrument.write_label_counts labels_filename
 
 let command : Command.t =
     Command.basic ~summary:"Parse a given Python .lex file with the specified parser." (
         let open Command.Param in
         both
-            (anon ("PARSER" %: string))
-            (anon ("FILENAME" %: string))
-        |> map ~f:(fun (parser, filename) ->
-            fun () -> parse_file_with_parser filename parser)
+            (both
+                (anon ("PARSER" %: string))
+                (anon ("FILENAME" %: string)))
+            (both
+                (both
+                    (flag "costs" (optional string) ~doc:"COSTS_FILENAME Instead of printing the AST, write the cost of each token position to a file.")
+                    (flag "repeat" (optional_with_default 1 int) ~doc:"N The number of parses to average the costs over (default 1)."))
+                (both
+                    (flag "labels" (optional string) ~doc:"LABELS_FILENAME Instead of printing the AST, write the work done for each production label to a file.")
+                    (flag "binary" no_arg ~doc:" Print the AST in the binary format instead of as text.")))
+        |> map ~f:(fun ((parser, filename), ((costs, repeats), (labels, binary))) ->
+            fun () -> match costs, labels with
+                | Some costs_filename, _     -> attribute_costs_of_file filename (parser_of_string parser) repeats costs_filename
+                | None, Some labels_filename -> count_labels_of_file filename (parser_of_string parser) labels_filename
+                | None, None                 -> parse_file_with_parser filename parser binary)
     )
 
 let () = Command.run command
@@ -0,0 +1,6 @@
+module Command = Core.Command
+
+open Pwz_cli_common
+
+(* The parser server (see pwz_serve_common.ml), with every parser linked in. *)
+let () = Command.run (Pwz_serve_common.command parser_of_string)
@@ -0,0 +1,68 @@
+module Command = Core.Command
+
+open Interface
+open Pyast
+open Pytokens
+
+(*
+ *  The parser server run by pwz_serve.ml, which keeps a single parser loaded and parses token streams as they arrive on
+ *  standard input, so that the cost of a whole pipeline (from source file to tree) can be measured without starting a
+ *  new process for each input. It is kept apart from the choice of parsers so that it can also be linked with a single
+ *  parser (see the `<parser>_serve.ml` files), which gives each parser's own startup cost.
+ *
+ *  Once the parser has been loaded, the line "READY" is written. Each request is then a sequence of token lines (in the
+ *  same format as a .lex file) terminated by an empty line. For each request, a status line is written: either
+ *  "OK <nanoseconds>", giving the time taken to decode the tokens, parse them, and build the AST, or else
+ *  "ERROR <message>". Successful parses are followed by the AST on a single line unless the -no-ast flag is given. The
+ *  program exits when standard input is closed.
+ *)
+
+(* Read the lines of the next request, or None if standard input has been closed. *)
+let read_request () : (string list) option =
+    let rec read_lines (acc : string list) : (string list) option =
+        match input_line stdin with
+        | ""                    -> Some (List.rev acc)
+        | line                  -> read_lines (line :: acc)
+        | exception End_of_file -> if acc = [] then None else Some (List.rev acc)
+    in
+    read_lines []
+
+let serve_request ((module Parser) : (module ParserInterface)) (print_ast : bool) (lines : string list) : unit =
+    try
+        let t_0 = Unix.gettimeofday () in
+        let tokens = Parser.process_tokens (List.map token_of_string lines) in
+        let result = Parser.parse tokens in
+        let ast = Parser.process_result result in
+        let t_1 = Unix.gettimeofday () in
+        Printf.printf "OK %.0f\n" ((t_1 -. t_0) *. 1e9);
+        if print_ast then (output_unindented_ast stdout ast; output_char stdout '\n');
+        flush stdout
+    with e ->
+        Printf.printf "ERROR %s\n%!" (String.escaped (Printexc.to_string e))
+
+let serve (parser : (module ParserInterface)) (print_ast : bool) : unit =
+    print_endline "READY";
+    flush stdout;
+    let rec loop () =
+        match read_request () with
+        | None       -> ()
+        | Some lines -> serve_request parser print_ast lines;
+                        loop ()
+    in
+    loop ()
+
+(* Look up a parser by name among only the one parser given. *)
+let only_parser (name : string) (parser : (module ParserInterface)) (s : string) : (module ParserInterface) =
+    if String.equal s name
+    then parser
+    else failwith ("This server was built with only the parser '" ^ name ^ "', not '" ^ s ^ "'.")
+
+let command (parser_of_string : string -> (module ParserInterface)) : Command.t =
+    Command.basic ~summary:"Parse token streams read from standard input with the specified parser." (
+        let open Command.Param in
+        both
+            (anon ("PARSER" %: string))
+            (flag "no-ast" no_arg ~doc:" Only report the time taken by each parse instead of also printing its AST.")
+        |> map ~f:(fun (parser, no_ast) ->
+            fun () -> serve (parser_of_string parser) (not no_ast))
+    )
@@ -9,10 +9,69 @@ let rec indented_string_of_ast (indent : string) (t : ast) : string =
 
 let string_of_ast (t : ast) : string = indented_string_of_ast "" t
 
-let rec unindented_string_of_ast (t : ast) : string =
+(*
+ *  The unindented form is produced piece by piece through `emit` rather than by concatenating strings, which would take
+ *  time and memory quadratic in the size of the tree.
+ *)
+let rec iter_unindented_ast (emit : string -> unit) (t : ast) : unit =
     match t with
-    | Ast (s, [])   -> "Seq (\"" ^ s ^ "\", [])"
-    | Ast (s, ts)   -> "Seq (\"" ^ s ^ "\", [ " ^ (String.concat "; " (List.map unindented_string_of_ast ts)) ^ " ])"
+    | Ast (s, [])      -> emit "Seq (\""; emit s; emit "\", [])"
+    | Ast (s, t :: ts) -> emit "Seq (\""; emit s; emit "\", [ ";
+                          iter_unindented_ast emit t;
+                          List.iter (fun t -> emit "; "; iter_unindented_ast emit t) ts;
+                          emit " ])"
+
+let unindented_string_of_ast (t : ast) : string =
+    let buf = Buffer.create 4096 in
+    iter_unindented_ast (Buffer.add_string buf) t;
+    Buffer.contents buf
+
+let output_unindented_ast (oc : out_channel) (t : ast) : unit =
+    iter_unindented_ast (output_string oc) t
+
+(*
+ *  The binary form of an AST, which is much smaller and much faster to load than the text. All integers are unsigned
+ *  32-bit little-endian values.
+ *
+ *      magic                   8 bytes: "PWZAST" 0x00 0x01
+ *      label count             u32
+ *      node count              u32
+ *      labels                  for each label, in order of id: its length in bytes (u32) and then its bytes
+ *      padding                 zero bytes up to a multiple of 4 bytes
+ *      nodes                   for each node, in preorder: its label id (u32) and its number of children (u32)
+ *
+ *  Labels are interned in order of first appearance in the preorder traversal.
+ *)
+let binary_ast_magic : string = "PWZAST\000\001"
+
+let output_u32 (oc : out_channel) (n : int) : unit =
+    output_byte oc (n land 0xff);
+    output_byte oc ((n lsr 8) land 0xff);
+    output_byte oc ((n lsr 16) land 0xff);
+    output_byte oc ((n lsr 24) land 0xff)
+
+let output_binary_ast (oc : out_channel) (t : ast) : unit =
+    let ids : (string, int) Hashtbl.t = Hashtbl.create 256 in
+    let labels : (string list) ref = ref [] in
+    let nodes : int ref = ref 0 in
+    let rec intern (Ast (s, ts) : ast) : unit =
+        incr nodes;
+        if not (Hashtbl.mem ids s)
+        then (Hashtbl.add ids s (Hashtbl.length ids);
+              labels := s :: !labels);
+        List.iter intern ts in
+    let rec output_node (Ast (s, ts) : ast) : unit =
+        output_u32 oc (Hashtbl.find ids s);
+        output_u32 oc (List.length ts);
+        List.iter output_node ts in
+    intern t;
+    output_string oc binary_ast_magic;
+    output_u32 oc (Hashtbl.length ids);
+    output_u32 oc !nodes;
+    let label_bytes = List.fold_left (fun n s -> output_u32 oc (String.length s); output_string oc s;
+                                                 n + 4 + String.length s) 0 (List.rev !labels) in
+    for _i = 1 to (4 - label_bytes mod 4) mod 4 do output_byte oc 0 done;
+    output_node t
 
 let rec flatten_binary_seqs' (n : int) (t : ast) : ast list =
     if n = 0
@@ -1,6 +1,3 @@
-from .cli import *
-from .parse import *
-from .tokenize import *
+from .lazy import lazy_star_imports
 
-from .file_generators import *
-from .grammar_description import *
+__getattr__ = lazy_star_imports(__name__, ['.cli', '.parse', '.tokenize', '.file_generators', '.grammar_description'])
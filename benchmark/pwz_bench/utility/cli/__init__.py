@@ -1,7 +1,8 @@
-from .benchmark import *
-from .calculate import *
-from .collate_benchmark_results import *
-from .graphs import *
-from .parse import *
-from .prepare import *
-from .verify import *
+from ..lazy import lazy_star_imports
+
+__getattr__ = lazy_star_imports(__name__, [
+    '.ast_diff', '.ast_stats', '.ast_table', '.benchmark', '.calculate', '.collate_benchmark_results',
+    '.compare_incremental', '.compare_tokenizers', '.correlate', '.dedup', '.graphs', '.heatmap', '.ladder', '.latency',
+    '.lex', '.lex_bench', '.lex_cache', '.parse', '.perf_fuzz', '.pipeline', '.prepare', '.progress', '.rule_profile',
+    '.startup', '.stress', '.sweep', '.verify',
+])
@@ -0,0 +1,285 @@
+from .ast_table import AstTable, is_binary_ast_file
+from .common import *
+
+from dataclasses import dataclass
+from enum import Enum
+from pathlib import Path
+from typing import BinaryIO, Iterator, List, Optional, Tuple
+
+
+__all__ = ['AstEvent', 'AstDifference', 'AstComparison', 'read_ast_events', 'compare_ast_files', 'describe_comparison',
+           'diff_asts']
+
+
+# The number of bytes read from an AST file at a time.
+CHUNK_SIZE = 1 << 20
+
+SEQ_OPEN = b'Seq ("'
+LABEL_END = b'", ['
+EMPTY_CLOSE = b'])'
+FIRST_CHILD = b' '
+NEXT_CHILD = b'; '
+LAST_CLOSE = b' ])'
+
+
+class AstEvent(Enum):
+    OPEN = 'open'
+    CLOSE = 'close'
+
+
+class _Buffer:
+    """
+    A window onto a binary file, which is refilled as it is consumed so that only a chunk of the file is in memory.
+    """
+    def __init__(self, f: BinaryIO, file: Path):
+        self.f = f
+        self.file = file
+        self.data = b''
+        self.pos = 0
+        self.offset = 0
+        self.eof = False
+
+    def _read_more(self):
+        chunk = self.f.read(CHUNK_SIZE)
+        if not chunk:
+            self.eof = True
+        self.offset += self.pos
+        self.data = self.data[self.pos:] + chunk
+        self.pos = 0
+
+    def _fill(self, n: int):
+        while len(self.data) - self.pos < n and not self.eof:
+            self._read_more()
+
+    def error(self, expected: str) -> RuntimeError:
+        found = self.data[self.pos:self.pos + 20]
+        return RuntimeError(f"Malformed AST in {self.file} at byte {self.offset + self.pos}: expected {expected}, but "
+                            f"found {found!r}.")
+
+    def peek(self, s: bytes) -> bool:
+        self._fill(len(s))
+        return self.data.startswith(s, self.pos)
+
+    def expect(self, s: bytes):
+        if not self.peek(s):
+            raise self.error(repr(s))
+        self.pos += len(s)
+
+    def read_until(self, s: bytes) -> bytes:
+        start = self.pos
+        while True:
+            i = self.data.find(s, start)
+            if i >= 0:
+                result = self.data[self.pos:i]
+                self.pos = i
+                return result
+            if self.eof:
+                raise self.error(repr(s))
+            # Only the end of the data needs to be searched again, since the rest is known not to match. Reading more
+            # moves the unconsumed data to the front of the buffer.
+            start = max(0, len(self.data) - len(s) + 1 - self.pos)
+            self._read_more()
+
+    def skip_whitespace(self) -> bool:
+        """
+        Skips any whitespace, returning whether there is anything after it.
+        """
+        while True:
+            self._fill(1)
+            if self.pos >= len(self.data):
+                return False
+            if not self.data[self.pos:self.pos + 1].isspace():
+                return True
+            self.pos += 1
+
+
+def read_ast_events(file: Path) -> Iterator[Tuple[AstEvent, Optional[str]]]:
+    """
+    Reads the trees in an .ast file as a stream of events: an OPEN event (with the tree's label) at the start of each
+    tree, and a CLOSE event (with no label) at its end. Both the text and binary formats are read.
+    """
+    if is_binary_ast_file(file):
+        return _read_binary_ast_events(file)
+    return _read_text_ast_events(file)
+
+
+def _read_binary_ast_events(file: Path) -> Iterator[Tuple[AstEvent, Optional[str]]]:
+    with AstTable(file) as table:
+        # The number of children yet to be read of each open node.
+        remaining: List[int] = []
+        for node in range(len(table)):
+            yield AstEvent.OPEN, table.label(node)
+            remaining.append(table.child_count(node))
+            while remaining and remaining[-1] == 0:
+                remaining.pop()
+                yield AstEvent.CLOSE, None
+                if remaining:
+                    remaining[-1] -= 1
+
+
+def _read_text_ast_events(file: Path) -> Iterator[Tuple[AstEvent, Optional[str]]]:
+    """
+    A text .ast file holds zero or more trees, one per line, in the format printed by `unindented_string_of_ast`:
+
+        Seq ("label", [])
+        Seq ("label", [ child; child; ... ])
+
+    Labels are not escaped when they are printed, so a label is taken to end at the first `", [` after it begins. The
+    file is read in chunks and no tree is built, so arbitrarily large files can be read in constant memory (other than
+    the depth of the trees).
+    """
+    with open(file, 'rb') as f:
+        buf = _Buffer(f, file)
+        while buf.skip_whitespace():
+            depth = 0
+            while True:
+                buf.expect(SEQ_OPEN)
+                label = buf.read_until(LABEL_END)
+                buf.expect(LABEL_END)
+                yield AstEvent.OPEN, label.decode(errors='replace')
+                if buf.peek(EMPTY_CLOSE):
+                    buf.expect(EMPTY_CLOSE)
+                    yield AstEvent.CLOSE, None
+                    while depth > 0 and not buf.peek(NEXT_CHILD):
+                        buf.expect(LAST_CLOSE)
+                        depth -= 1
+                        yield AstEvent.CLOSE, None
+                    if depth == 0:
+                        break
+                    buf.expect(NEXT_CHILD)
+                else:
+                    buf.expect(FIRST_CHILD)
+                    depth += 1
+
+
+class _CountedEvents:
+    """
+    Wraps a stream of AST events, counting the nodes and top-level trees that have been read from it.
+    """
+    def __init__(self, file: Path):
+        self.events = read_ast_events(file)
+        self.nodes = 0
+        self.trees = 0
+        self.depth = 0
+
+    def next(self) -> Optional[Tuple[AstEvent, Optional[str]]]:
+        event = next(self.events, None)
+        if event is not None:
+            if event[0] is AstEvent.OPEN:
+                if self.depth == 0:
+                    self.trees += 1
+                self.nodes += 1
+                self.depth += 1
+            else:
+                self.depth -= 1
+        return event
+
+    def skip_subtree(self) -> int:
+        """
+        Having just read the OPEN event of a tree, reads the rest of the tree and returns its number of nodes.
+        """
+        start_nodes = self.nodes
+        target_depth = self.depth - 1
+        while self.depth > target_depth:
+            self.next()
+        return self.nodes - start_nodes + 1
+
+    def drain(self):
+        while self.next() is not None:
+            pass
+
+
+@dataclass
+class AstDifference:
+    # The labels of the nodes from the root to the parent of the first divergence, each with the index of the node
+    # among its siblings (or among the trees of the file, for a root).
+    path: List[Tuple[str, int]]
+    # The index among its siblings of the first child at which the trees diverge.
+    index: int
+    # The labels of the diverging subtrees, or None if there is no subtree at that position on that side.
+    expected_label: Optional[str]
+    actual_label: Optional[str]
+    # The number of nodes in each diverging subtree.
+    expected_size: int
+    actual_size: int
+
+    def path_string(self) -> str:
+        return ' > '.join(f'{label}[{index}]' for label, index in self.path) or '(top level)'
+
+
+@dataclass
+class AstComparison:
+    expected_trees: int = 0
+    actual_trees: int = 0
+    expected_nodes: int = 0
+    actual_nodes: int = 0
+    difference: Optional[AstDifference] = None
+
+    @property
+    def equal(self) -> bool:
+        return self.difference is None
+
+
+def compare_ast_files(expected_file: Path, actual_file: Path) -> AstComparison:
+    """
+    Compares the trees of two .ast files structurally, streaming both files at once. The first position at which they
+    diverge is reported along with the sizes of the diverging subtrees. Both files are read to the end, so that the
+    total numbers of nodes and trees are known.
+    """
+    expected = _CountedEvents(expected_file)
+    actual = _CountedEvents(actual_file)
+    # The labels of the common ancestors of the current position, with their indices and their numbers of children
+    # seen so far. The bottom of the stack stands for the file, whose children are its trees.
+    stack: List[List] = [['', 0, 0]]
+    difference: Optional[AstDifference] = None
+    while True:
+        e = expected.next()
+        a = actual.next()
+        if e is None and a is None:
+            break
+        if e is not None and a is not None and e == a:
+            if e[0] is AstEvent.OPEN:
+                stack.append([e[1], stack[-1][2], 0])
+            else:
+                stack.pop()
+                stack[-1][2] += 1
+            continue
+        e_label = e[1] if e is not None and e[0] is AstEvent.OPEN else None
+        a_label = a[1] if a is not None and a[0] is AstEvent.OPEN else None
+        difference = AstDifference(
+            path=[(label, index) for label, index, _ in stack[1:]],
+            index=stack[-1][2],
+            expected_label=e_label,
+            actual_label=a_label,
+            expected_size=expected.skip_subtree() if e_label is not None else 0,
+            actual_size=actual.skip_subtree() if a_label is not None else 0,
+        )
+        break
+    expected.drain()
+    actual.drain()
+    return AstComparison(expected.trees, actual.trees, expected.nodes, actual.nodes, difference)
+
+
+def describe_comparison(comparison: AstComparison) -> List[str]:
+    lines = [f"Trees: {comparison.expected_trees} expected, {comparison.actual_trees} actual.",
+             f"Nodes: {comparison.expected_nodes} expected, {comparison.actual_nodes} actual."]
+    d = comparison.difference
+    if d is None:
+        lines.append("The trees are identical.")
+    else:
+        lines.append(f"First divergence under: {d.path_string()}")
+        lines.append(f"  at child {d.index}: expected {d.expected_label or '(nothing)'} ({d.expected_size} nodes), "
+                     f"found {d.actual_label or '(nothing)'} ({d.actual_size} nodes).")
+    return lines
+
+
+def diff_asts(expected_file: Path, actual_file: Path) -> bool:
+    """
+    Compares two .ast files and prints a description of their first difference. Returns whether they are identical.
+    """
+    print(f"Comparing {actual_file} against {expected_file}...")
+    comparison = compare_ast_files(expected_file, actual_file)
+    for line in describe_comparison(comparison):
+        print(line)
+    print(GREEN_CHECK if comparison.equal else RED_X)
+    return comparison.equal
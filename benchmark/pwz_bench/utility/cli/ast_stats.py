@@ -0,0 +1,109 @@
+from .ast_diff import AstEvent, read_ast_events
+from .ast_table import AstTable, is_binary_ast_file
+from .common import *
+
+from csv import DictWriter
+from dataclasses import dataclass
+from pathlib import Path
+from typing import List, Set
+
+
+__all__ = ['AstStats', 'measure_ast_file', 'write_ast_stats']
+
+
+# These constants are for titling the columns in the output CSV.
+FORMAT = 'Format'
+BYTES = 'Bytes'
+TREES = 'Trees'
+NODES = 'Nodes'
+DEPTH = 'Depth'
+LABELS = 'Labels'
+MAX_CHILDREN = 'Max Children'
+BYTES_PER_NODE = 'Bytes/Node'
+
+
+@dataclass
+class AstStats:
+    binary: bool
+    size: int
+    trees: int
+    nodes: int
+    depth: int
+    labels: int
+    max_children: int
+
+
+def _measure_table(file: Path) -> AstStats:
+    with AstTable(file) as table:
+        child_counts = table.child_counts
+        max_children = max(child_counts, default=0)
+        del child_counts
+        return AstStats(True, file.stat().st_size, 1 if len(table) else 0, len(table), table.depth(),
+                        len(table.labels), max_children)
+
+
+def _measure_events(file: Path) -> AstStats:
+    trees = nodes = depth = max_depth = max_children = 0
+    labels: Set[str] = set()
+    # The number of children seen so far of each open node.
+    children: List[int] = []
+    for event, label in read_ast_events(file):
+        if event is AstEvent.OPEN:
+            if children:
+                children[-1] += 1
+            else:
+                trees += 1
+            children.append(0)
+            nodes += 1
+            labels.add(label)
+            max_depth = max(max_depth, len(children))
+        else:
+            max_children = max(max_children, children.pop())
+    return AstStats(False, file.stat().st_size, trees, nodes, max_depth, len(labels), max_children)
+
+
+def measure_ast_file(file: Path) -> AstStats:
+    """
+    Measures the shape of the trees in an .ast file. Binary files are measured from their node tables, and text files
+    are streamed.
+    """
+    if is_binary_ast_file(file):
+        return _measure_table(file)
+    return _measure_events(file)
+
+
+def write_ast_stats(base_dir: Path, ast_files: List[Path], out_file: Path):
+    """
+    Measures each .ast file and writes the results to the output CSV, one row per file.
+    """
+    print(f"Measuring {len(ast_files)} .ast files...")
+    max_filename_length = find_longest_filename_length(ast_files)
+    out_file.parent.mkdir(parents=True, exist_ok=True)
+    with open(out_file, mode='w', newline='') as out_csv:
+        out_writer = DictWriter(out_csv, [FILENAME, FORMAT, BYTES, TREES, NODES, DEPTH, LABELS, MAX_CHILDREN,
+                                          BYTES_PER_NODE])
+        out_writer.writeheader()
+        for ast_file in ast_files:
+            print(f"  {ast_file.name:{max_filename_length}} ", end='', flush=True)
+            try:
+                stats = measure_ast_file(ast_file)
+            except RuntimeError as e:
+                print(f"{RED_X} {e}")
+                continue
+            try:
+                filename = ast_file.relative_to(base_dir)
+            except ValueError:
+                filename = ast_file
+            out_writer.writerow({
+                FILENAME: filename,
+                FORMAT: 'binary' if stats.binary else 'text',
+                BYTES: stats.size,
+                TREES: stats.trees,
+                NODES: stats.nodes,
+                DEPTH: stats.depth,
+                LABELS: stats.labels,
+                MAX_CHILDREN: stats.max_children,
+                BYTES_PER_NODE: f'{stats.size / stats.nodes if stats.nodes else 0.0:.2f}',
+            })
+            print(f"{GREEN_CHECK} ({stats.nodes} nodes, depth {stats.depth})")
+    print(f"{GREEN_CHECK} AST statistics written to {out_file}.")
@@ -0,0 +1,133 @@
+from array import array
+from mmap import ACCESS_READ, mmap
+from pathlib import Path
+from struct import Struct
+from typing import List, Optional, Sequence
+
+import sys
+
+
+__all__ = ['BINARY_AST_MAGIC', 'AstTable', 'is_binary_ast_file']
+
+
+# The first bytes of every binary .ast file. The format is described with `output_binary_ast` in pyast.ml.
+BINARY_AST_MAGIC = b'PWZAST\x00\x01'
+_U32 = Struct('<I')
+_HEADER = Struct('<8sII')
+
+
+def is_binary_ast_file(file: Path) -> bool:
+    with open(file, 'rb') as f:
+        return f.read(len(BINARY_AST_MAGIC)) == BINARY_AST_MAGIC
+
+
+class AstTable:
+    """
+    A binary .ast file loaded as tables of nodes. The nodes are numbered in preorder, so that the root is node 0 and
+    the children of a node follow it in order, each followed by its own descendants.
+
+    The file is mapped into memory, and on little-endian machines the node tables are views directly onto the mapping,
+    so loading a file takes time only in the number of distinct labels. Use the table as a context manager (or call
+    `close`) to release the mapping.
+    """
+    def __init__(self, file: Path):
+        self.file = file
+        with open(file, 'rb') as f:
+            self._mmap = mmap(f.fileno(), 0, access=ACCESS_READ)
+        try:
+            magic, label_count, node_count = _HEADER.unpack_from(self._mmap, 0)
+            if magic != BINARY_AST_MAGIC:
+                raise RuntimeError(f"Not a binary AST file: {file}.")
+            offset = _HEADER.size
+            self.labels: List[str] = []
+            for _ in range(label_count):
+                length, = _U32.unpack_from(self._mmap, offset)
+                offset += _U32.size
+                self.labels.append(self._mmap[offset:offset + length].decode(errors='replace'))
+                offset += length
+            offset += -offset % _U32.size
+            end = offset + 8 * node_count
+            if end != len(self._mmap):
+                raise RuntimeError(f"Binary AST file {file} should be {end} bytes long, but is {len(self._mmap)}.")
+            nodes = memoryview(self._mmap)[offset:end]
+            if sys.byteorder == 'little':
+                self._nodes: Sequence[int] = nodes.cast('I')
+            else:
+                swapped = array('I', nodes.tobytes())
+                swapped.byteswap()
+                nodes.release()
+                self._nodes = swapped
+        except Exception:
+            self._mmap.close()
+            raise
+        self._sizes: Optional[array] = None
+
+    def close(self):
+        if isinstance(self._nodes, memoryview):
+            self._nodes.release()
+        self._mmap.close()
+
+    def __enter__(self) -> 'AstTable':
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
+
+    def __len__(self) -> int:
+        return len(self._nodes) // 2
+
+    @property
+    def label_ids(self) -> Sequence[int]:
+        """
+        The label id of each node.
+        """
+        return self._nodes[0::2]
+
+    @property
+    def child_counts(self) -> Sequence[int]:
+        """
+        The number of children of each node.
+        """
+        return self._nodes[1::2]
+
+    def label(self, node: int) -> str:
+        return self.labels[self._nodes[2 * node]]
+
+    def child_count(self, node: int) -> int:
+        return self._nodes[2 * node + 1]
+
+    @property
+    def subtree_sizes(self) -> array:
+        """
+        The number of nodes in the subtree rooted at each node, computed on first use.
+        """
+        if self._sizes is None:
+            child_counts = self.child_counts
+            sizes = array('I', bytes(4 * len(self)))
+            # Each entry is a node whose subtree is unfinished, with the number of its children yet to finish.
+            stack: List[List[int]] = []
+            for node in range(len(self)):
+                stack.append([node, child_counts[node]])
+                while stack and stack[-1][1] == 0:
+                    finished, _ = stack.pop()
+                    sizes[finished] = node - finished + 1
+                    if stack:
+                        stack[-1][1] -= 1
+            self._sizes = sizes
+        return self._sizes
+
+    def depth(self) -> int:
+        """
+        The number of nodes on the longest path from the root to a leaf.
+        """
+        child_counts = self.child_counts
+        remaining: List[int] = []
+        deepest = 0
+        for node in range(len(self)):
+            remaining.append(child_counts[node])
+            deepest = max(deepest, len(remaining))
+            while remaining and remaining[-1] == 0:
+                remaining.pop()
+                if remaining:
+                    remaining[-1] -= 1
+        return deepest
@@ -1,4 +1,6 @@
 from .common import *
+from .lex import token_file_of_lex_file
+from .progress import *
 
 from csv import DictReader, DictWriter
 from dataclasses import dataclass, field
@@ -6,6 +8,7 @@ from math import ceil as round_up
 from pathlib import Path
 from re import finditer, match
 from subprocess import TimeoutExpired, run
+from time import time
 from typing import Any, Dict, Generator, Iterable, Iterator, List, Match, Optional, Tuple
 
 import heapq
@@ -16,7 +19,6 @@ __all__ = ['run_benchmarks']
 
 FILENAME = 'Filename'
 TOKENS = 'Tokens'
-QUOTA = 'Quota'
 TPR = 'Time/Run'
 CONF = '95ci'
 
@@ -84,12 +86,18 @@ class ExecutionHeap(Iterable[Execution]):
 
 
 def run_benchmarks(driver: Path, base_dir: Path, lex_file_dir: Path, bench_file_dir: Path, parsers: List[str],
-                   should_resume: bool = False, quota_factor: int = 3, max_quota: Optional[int] = None):
+                   should_resume: bool = False, quota_factor: int = 3, max_quota: Optional[int] = None,
+                   status_file: Optional[Path] = None, report_interval: float = DEFAULT_REPORT_INTERVAL):
     print(f"Benchmarking all .lex files in {lex_file_dir}...")
     lex_file_tups = get_sorted_files_and_lengths(lex_file_dir, '*.lex')
     max_filename_length = find_longest_filename_length(map(lambda t: t[0], lex_file_tups))
     lex_file_lengths = {lex_file: no_tokens for (lex_file, no_tokens) in lex_file_tups}
 
+    if status_file is None:
+        status_file = bench_file_dir / DEFAULT_STATUS_FILENAME
+    print(f"Progress and estimated completion times will be recorded in {status_file}...")
+    progress = BenchmarkProgress(parsers, lex_file_lengths, status_file, report_interval)
+
     heap = ExecutionHeap()
 
     for parser in parsers:
@@ -138,8 +146,10 @@ def run_benchmarks(driver: Path, base_dir: Path, lex_file_dir: Path, bench_file_
             if should_resume:
                 write_out(f"Resuming from previous progress saved in {res_file}...")
                 write_out(f"New results will be appended to {res_file}...")
+                progress.load_previous_results(parser, res_file, lex_file_dir)
             else:
                 write_out(f"Saving results for each input to {res_file}...")
+            progress.start_parser(parser)
 
             # Initialize a buffer to be used for managing consecutive incomplete benchmarks.
             buffer = ExecutionHeap()
@@ -175,17 +185,20 @@ def run_benchmarks(driver: Path, base_dir: Path, lex_file_dir: Path, bench_file_
                             CONF: '',
                         }
                         write_res(row_dict)
+                        progress.record_attempt(parser, lex_file, 0.0, AttemptOutcome.ABANDONED)
                         continue
                     timeout = round_up(quota * TIMEOUT_MULTIPLIER)
                     write_out(f"Benchmarking {lex_file.name:{max_filename_length}} -> {parser} -> quota: {quota} -> "
                               f"timeout: {timeout} -> {str(short_file) + '...':{max_short_length}} ", end='')
 
+                    t_0 = time()
                     try:
                         result = run([driver, '+time', '-ascii', '-stabilize-gc', '-width', '1000',
                                       '-parser', parser,
-                                      '-input', lex_file,
+                                      '-input', token_file_of_lex_file(lex_file),
                                       '-quota', str(quota)],
                                      capture_output=True, timeout=timeout)
+                        d_t = time() - t_0
                         if result.returncode == 0:
                             output = result.stdout.decode('utf-8')
                             try:
@@ -204,19 +217,24 @@ def run_benchmarks(driver: Path, base_dir: Path, lex_file_dir: Path, bench_file_
                                 }
                                 write_res(row_dict)
                                 write_out(f"{GREEN_CHECK} ({TPR}: {tpr} | {CONF}: {ci})")
+                                progress.record_attempt(parser, lex_file, d_t, AttemptOutcome.COMPLETE)
                                 flush_buffer_to_queue(multiply_quota=1.1)
                             except InsufficientQuota:
                                 write_out(WHITE_QUESTION)
+                                progress.record_attempt(parser, lex_file, d_t, AttemptOutcome.INCOMPLETE)
                                 buffer.push(execution)
                             except Exception as e:
                                 write_dest(dest_file, output)
                                 write_err(short_file, e.args[0] if len(e.args) > 0 else None)
                                 write_out(RED_X)
+                                progress.record_attempt(parser, lex_file, d_t, AttemptOutcome.ERROR)
                         else:
                             write_err(short_file, "Non-zero return code.")
                             write_out(RED_X)
+                            progress.record_attempt(parser, lex_file, d_t, AttemptOutcome.ERROR)
                     except TimeoutExpired:
                         write_out(RED_QUESTION)
+                        progress.record_attempt(parser, lex_file, time() - t_0, AttemptOutcome.INCOMPLETE)
                         buffer.push(execution)
 
                     # Test whether we need to empty the buffer and requeue all remaining executions.
@@ -257,6 +275,7 @@ def run_benchmarks(driver: Path, base_dir: Path, lex_file_dir: Path, bench_file_
                 process_queue(max_buffer_size=0)
 
             write_out(f"Benchmarking for {parser} complete.")
+            progress.finish_parser(parser)
     print(f"Benchmarking done.")
 
 
@@ -18,7 +18,7 @@ TPR_SIGFIG_RE = re_compile(r'(\d+\.0*[1-9]\d{2})\d*')
 
 
 def collate_benchmarking_results(bench_file_dir: Path, parsers: List[str], overwrite: bool = False,
-                                 out_file: Optional[Path] = None):
+                                 out_file: Optional[Path] = None, aliases: Optional[Dict[str, str]] = None):
     if out_file is None:
         out_file = bench_file_dir / DEFAULT_OUT_FILENAME
     print(f"Collating benchmarking results and outputting results in {out_file}...")
@@ -42,6 +42,12 @@ def collate_benchmarking_results(bench_file_dir: Path, parsers: List[str], overw
                     toks[filename] = int(row[TOKENS])
                 tpr = float_of_raw_tpr(row[TPR])
                 tprs[filename][parser] = tpr
+    # Give each duplicate removed by deduplication the results of the representative that was benchmarked instead.
+    if aliases is not None:
+        for alias, representative in aliases.items():
+            if representative in toks:
+                toks[alias] = toks[representative]
+                tprs[alias] = dict(tprs[representative])
     # Remove parsers which had no results files.
     parsers = [parser for parser in parsers if parser not in missing_parsers]
     with open(out_file, mode='w', newline='') as out_csv:
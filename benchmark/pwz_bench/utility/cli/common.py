@@ -1,13 +1,17 @@
+from json import load as load_json
 from operator import itemgetter
+from os import environ, getpid
 from pathlib import Path
-from subprocess import run
-from typing import Iterator, List, Tuple
+from subprocess import STDOUT, run
+from typing import Dict, Iterator, List, Optional, Tuple
 
 
 __all__ = [
     'GREEN_CHECK', 'RED_X', 'WHITE_QUESTION', 'RED_QUESTION',
-    'FILENAME', 'TOKENS', 'SPT', 'TPR',
-    'get_sorted_files_and_lengths', 'count_lines_in_file', 'find_longest_filename_length'
+    'FILENAME', 'TOKENS', 'SPT', 'TPR', 'QUOTA',
+    'LEX_MANIFEST_FILENAME', 'load_lex_manifest', 'lex_manifest_entry',
+    'get_sorted_files_and_lengths', 'count_lines_in_file', 'find_longest_filename_length', 'build_generated_parsers',
+    'temp_file_of',
 ]
 
 
@@ -21,17 +25,63 @@ FILENAME = 'Filename'
 TOKENS = 'Tokens'
 SPT = 'Sec/Tok'
 TPR = 'Time/Run'
+QUOTA = 'Quota'
+
+# The name of the manifest written by `lex` in the lex file directory, describing each .lex file.
+LEX_MANIFEST_FILENAME = 'lex-manifest.json'
+# The number of bytes read from a file at a time while counting its lines.
+CHUNK_SIZE = 1 << 20
+
+
+def load_lex_manifest(file_dir: Path) -> Dict[str, Dict]:
+    """
+    Reads the manifest of the .lex files in a directory, returning a dictionary mapping the name of each file to its
+    entry, or an empty dictionary if the directory has no manifest.
+    """
+    manifest_file = file_dir / LEX_MANIFEST_FILENAME
+    if not manifest_file.is_file():
+        return {}
+    with open(manifest_file) as f:
+        return load_json(f)
+
+
+def lex_manifest_entry(manifest: Dict[str, Dict], file: Path) -> Optional[Dict]:
+    """
+    Finds the manifest entry of a file, or None if there is none or the file has changed since the entry was written.
+    """
+    entry = manifest.get(file.name)
+    if entry is None:
+        return None
+    stat = file.stat()
+    if entry['size'] != stat.st_size or entry['mtime_ns'] != stat.st_mtime_ns:
+        return None
+    return entry
 
 
 def get_sorted_files_and_lengths(file_dir: Path, pattern='*') -> List[Tuple[Path, int]]:
-    return sorted(map(lambda p: (p, count_lines_in_file(p)), file_dir.glob(pattern)), key=itemgetter(1, 0))
+    """
+    Finds the files in the directory matching the pattern along with their numbers of lines (which is the number of
+    tokens, for .lex files), sorted from shortest to longest. The lengths are taken from the directory's lex manifest
+    where possible, and only the files missing from it (or changed since it was written) are counted.
+    """
+    manifest = load_lex_manifest(file_dir)
+
+    def length(file: Path) -> int:
+        entry = lex_manifest_entry(manifest, file)
+        return entry['tokens'] if entry is not None else count_lines_in_file(file)
+
+    return sorted(map(lambda p: (p, length(p)), file_dir.glob(pattern)), key=itemgetter(1, 0))
 
 
 def count_lines_in_file(file: Path) -> int:
     if not file.is_file():
         raise RuntimeError(f"File does not exist: {file}.")
-    res = run(['wc', '-l', file], capture_output=True)
-    return int(res.stdout.strip().partition(b' ')[0])
+    # Like `wc -l`, this counts newlines, but without starting a process for every file.
+    lines = 0
+    with open(file, 'rb') as f:
+        for chunk in iter(lambda: f.read(CHUNK_SIZE), b''):
+            lines += chunk.count(b'\n')
+    return lines
 
 
 def find_longest_filename_length(files: Iterator[Path], basenames_only: bool=True) -> int:
@@ -39,3 +89,27 @@ def find_longest_filename_length(files: Iterator[Path], basenames_only: bool=Tru
     for file in files:
         length = max(length, len(file.name if basenames_only else str(file)))
     return length
+
+
+def build_generated_parsers(gen_dir: Path, log_file: Path) -> bool:
+    """
+    Runs the parser generators and builds the benchmarking executable for code generated in a directory other than the
+    main one, logging the output of the build. Returns whether the build succeeded.
+    """
+    # The top-level Makefile exports the locations of the main executables, which must not be used here.
+    env = {key: val for key, val in environ.items() if key not in ('BENCH_OUT', 'PARSE_OUT', 'SERVE_OUT')}
+    with open(log_file, 'w') as log:
+        for target in ('generate', 'bench'):
+            result = run(['make', '-C', str(gen_dir), target], stdout=log, stderr=STDOUT, env=env)
+            if result.returncode != 0:
+                print(f"{RED_X} Building in {gen_dir} failed at `make {target}`; see {log_file}.")
+                return False
+    return True
+
+
+def temp_file_of(file: Path) -> Path:
+    """
+    The name to write a file under before renaming it into place, so that a partially written file is never seen. The
+    name is unique to the process, so that several processes may write the same file at once.
+    """
+    return file.with_name(f'.{file.name}.{getpid()}.tmp')
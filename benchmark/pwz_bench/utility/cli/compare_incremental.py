@@ -0,0 +1,148 @@
+from .common import *
+
+from ..tokenize import *
+
+from parso.grammar import PythonGrammar
+from pathlib import Path
+from random import Random
+from typing import List, Optional, Tuple
+
+
+__all__ = ['DEFAULT_INCREMENTAL_CHECK_EDITS', 'DEFAULT_INCREMENTAL_CHECK_SEED', 'compare_incremental_lexing']
+
+
+# Default number of random edits made to each file.
+DEFAULT_INCREMENTAL_CHECK_EDITS = 20
+# Default seed of the random edits.
+DEFAULT_INCREMENTAL_CHECK_SEED = 0
+
+# The texts the random edits insert, which open and close blocks, brackets, strings, and comments and change the
+# indentation, as well as simply adding text or deleting it.
+EDIT_TEXTS = ['', 'x', ' ', '    ', '\n', '\n\n', '(', ')', ']', '"', "'''", '"""doc\n', '#', '\\\n', 'if y:\n    ',
+              'else:\n', 'def f():\n    pass\n', 'class C:\n  a\n', 'foo = bar(1,\n']
+# The numbers of lines after the first which the random edits span, with repeats for a higher chance.
+EDIT_LINE_SPANS = [0, 0, 0, 1, 3]
+
+
+def _line_length(lines: List[str], line: int) -> int:
+    return len(lines[line - 1].rstrip('\n')) if line <= len(lines) else 0
+
+
+def _random_edit(lines: List[str], rng: Random) -> TextEdit:
+    start_line = rng.randint(1, max(len(lines), 1))
+    start_column = rng.randint(0, _line_length(lines, start_line))
+    end_line = min(max(len(lines), 1), start_line + rng.choice(EDIT_LINE_SPANS))
+    if end_line == start_line:
+        end_column = rng.randint(start_column, _line_length(lines, end_line))
+    else:
+        end_column = rng.randint(0, _line_length(lines, end_line))
+    return TextEdit((start_line, start_column), (end_line, end_column), rng.choice(EDIT_TEXTS))
+
+
+def _edited_text(lines: List[str], edit: TextEdit) -> str:
+    """
+    Applies an edit to the lines of a text directly, to give the text the incremental lexer should end up with.
+    """
+    (start_line, start_column), (end_line, end_column) = edit.start, edit.end
+    start_text = lines[start_line - 1] if start_line <= len(lines) else ''
+    end_text = lines[end_line - 1] if end_line <= len(lines) else ''
+    return (''.join(lines[:start_line - 1]) + start_text[:start_column] + edit.text + end_text[end_column:]
+            + ''.join(lines[end_line:]))
+
+
+def _positioned_token_strings(lexer: IncrementalLexer) -> List[Tuple[str, Position]]:
+    return [(str(tok), pos) for tok, pos in zip(lexer.tokens, lexer.positions)]
+
+
+def _lex(text: str, grammar: PythonGrammar, suppress_error_tokens: bool) -> Optional[IncrementalLexer]:
+    try:
+        return IncrementalLexer(text, grammar, suppress_error_tokens)
+    except RuntimeError:
+        return None
+
+
+def _describe_divergence(expected: List[Tuple[str, Position]], actual: List[Tuple[str, Position]]) -> str:
+    index = next((i for i, (e, a) in enumerate(zip(expected, actual)) if e != a), min(len(expected), len(actual)))
+    expected_token: Optional[Tuple[str, Position]] = expected[index] if index < len(expected) else None
+    actual_token: Optional[Tuple[str, Position]] = actual[index] if index < len(actual) else None
+    return (f"token {index} differs: tokenizing anew gives {expected_token or '(nothing)'}, the incremental lexer "
+            f"gives {actual_token or '(nothing)'}")
+
+
+def _check_edit(lexer: IncrementalLexer, edit: TextEdit, grammar: PythonGrammar) -> Optional[str]:
+    """
+    Applies an edit to the lexer, returning a description of how its result differs from tokenizing the edited text
+    anew, or None if it does not.
+    """
+    old_text = lexer.text
+    old_tokens = _positioned_token_strings(lexer)
+    new_text = _edited_text(lexer.lines, edit)
+    expected = _lex(new_text, grammar, lexer.suppress_error_tokens)
+    try:
+        change = lexer.apply_edit(edit)
+    except RuntimeError as e:
+        if expected is not None:
+            return f"the edit failed ({e}), but the edited text tokenizes"
+        if lexer.text != old_text or _positioned_token_strings(lexer) != old_tokens:
+            return "the edit failed, but the text or tokens were changed"
+        return None
+    if expected is None:
+        return "the edit succeeded, but the edited text does not tokenize"
+    if lexer.text != new_text:
+        return "the text differs from the edited text"
+    expected_tokens = _positioned_token_strings(expected)
+    actual_tokens = _positioned_token_strings(lexer)
+    if expected_tokens != actual_tokens:
+        return _describe_divergence(expected_tokens, actual_tokens)
+    if expected.error_dedents != lexer.error_dedents:
+        return f"the error dedents differ: {expected.error_dedents} anew, {lexer.error_dedents} incrementally"
+    shifted_tail = [(s, (line + change.line_delta, column)) for s, (line, column) in old_tokens[change.old_end:]]
+    if old_tokens[:change.start] != actual_tokens[:change.start] or shifted_tail != actual_tokens[change.new_end:]:
+        return f"the tokens outside of the reported change were changed: {change}"
+    return None
+
+
+def compare_incremental_lexing(py_file_dir: Path, grammar: PythonGrammar,
+                               edits: int = DEFAULT_INCREMENTAL_CHECK_EDITS,
+                               seed: int = DEFAULT_INCREMENTAL_CHECK_SEED) -> bool:
+    """
+    Makes random edits to every .py file in the directory with an `IncrementalLexer`, both with error tokens suppressed
+    and without, checking after each edit that the tokens, their positions, and the error dedents are the same as
+    tokenizing the edited text anew gives (or that the edit failed because the edited text does not tokenize), and that
+    the reported change covers every token which changed. The edits build on each other, and are chosen by a random
+    generator seeded with `seed` and the name of the file, so a failure can be reproduced. The first failure in each
+    file is reported. Returns whether every edit passed.
+    """
+    py_files = sorted(py_file_dir.glob('*.py'))
+    print(f"Checking the incremental lexer with {edits} random edits to each of {len(py_files)} .py files in "
+          f"{py_file_dir}...")
+    max_filename_length = find_longest_filename_length(py_files)
+    failures = 0
+    for py_file in py_files:
+        print(f"  {py_file.name:{max_filename_length}} ", end='', flush=True)
+        text = py_file.read_text()
+        failure: Optional[str] = None
+        for suppress_error_tokens in (True, False):
+            lexer = _lex(text, grammar, suppress_error_tokens)
+            if lexer is None:
+                continue
+            rng = Random(f'{seed}:{py_file.name}:{suppress_error_tokens}')
+            for i in range(edits):
+                edit = _random_edit(lexer.lines, rng)
+                failure = _check_edit(lexer, edit, grammar)
+                if failure is not None:
+                    mode = 'suppressed' if suppress_error_tokens else 'kept'
+                    failure = f"edit {i + 1} ({edit}, error tokens {mode}): {failure}"
+                    break
+            if failure is not None:
+                break
+        if failure is not None:
+            failures += 1
+            print(f"{RED_X} {failure}")
+        else:
+            print(GREEN_CHECK)
+    if failures:
+        print(f"{RED_X} {failures} of {len(py_files)} files were tokenized differently after an edit.")
+    else:
+        print(f"{GREEN_CHECK} The incremental lexer agreed after every edit.")
+    return failures == 0
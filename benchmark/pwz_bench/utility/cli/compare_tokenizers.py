@@ -0,0 +1,63 @@
+from .common import *
+
+from ..tokenize import *
+
+from parso.grammar import PythonGrammar
+from pathlib import Path
+from typing import List, Optional, Tuple, Union
+
+
+__all__ = ['compare_tokenizers']
+
+
+def _positioned_token_strings(py_file: Path, grammar: PythonGrammar,
+                              backend: TokenizerBackend) -> Union[List[Tuple[str, Position]], str]:
+    """
+    Tokenizes a file with the given backend, returning the string of each token with its position, or else the error
+    the tokenizer raised.
+    """
+    try:
+        return [(str(tok), pos) for tok, pos in tokenize_file_with_positions(str(py_file), grammar, backend=backend)]
+    except RuntimeError as e:
+        return f"error: {e}"
+
+
+def _describe_divergence(expected: List[Tuple[str, Position]], actual: List[Tuple[str, Position]]) -> str:
+    index = next((i for i, (e, a) in enumerate(zip(expected, actual)) if e != a), min(len(expected), len(actual)))
+    expected_token: Optional[Tuple[str, Position]] = expected[index] if index < len(expected) else None
+    actual_token: Optional[Tuple[str, Position]] = actual[index] if index < len(actual) else None
+    return (f"token {index} differs: parso gives {expected_token or '(nothing)'}, the standard library gives "
+            f"{actual_token or '(nothing)'}")
+
+
+def compare_tokenizers(py_file_dir: Path, grammar: PythonGrammar) -> bool:
+    """
+    Tokenizes every .py file in the directory with both the parso and the standard library backends, checking that they
+    give the same tokens at the same positions (or both fail). The first divergence in each file is reported. Returns
+    whether every file agreed.
+    """
+    py_files = sorted(py_file_dir.glob('*.py'))
+    print(f"Comparing the parso and standard library tokenizers on {len(py_files)} .py files in {py_file_dir}...")
+    max_filename_length = find_longest_filename_length(py_files)
+    mismatches = 0
+    for py_file in py_files:
+        print(f"  {py_file.name:{max_filename_length}} ", end='', flush=True)
+        expected = _positioned_token_strings(py_file, grammar, TokenizerBackend.PARSO)
+        actual = _positioned_token_strings(py_file, grammar, TokenizerBackend.STDLIB)
+        if isinstance(expected, str) or isinstance(actual, str):
+            if isinstance(expected, str) and isinstance(actual, str):
+                print(f"{GREEN_CHECK} (both fail)")
+            else:
+                mismatches += 1
+                print(f"{RED_X} parso: {expected if isinstance(expected, str) else 'ok'}; "
+                      f"standard library: {actual if isinstance(actual, str) else 'ok'}")
+        elif expected == actual:
+            print(f"{GREEN_CHECK} ({len(expected)} tokens)")
+        else:
+            mismatches += 1
+            print(f"{RED_X} {_describe_divergence(expected, actual)}")
+    if mismatches:
+        print(f"{RED_X} {mismatches} of {len(py_files)} files were tokenized differently.")
+    else:
+        print(f"{GREEN_CHECK} The tokenizers agree on every file.")
+    return mismatches == 0
@@ -0,0 +1,120 @@
+from .common import *
+from .lex import load_features_index
+
+from ..tokenize import FileFeatures
+
+from csv import DictReader, DictWriter
+from math import isnan as is_nan, sqrt
+from pathlib import Path
+from typing import Callable, Dict, List, Optional, Tuple
+
+
+__all__ = ['correlate_features', 'spearman_correlation']
+
+
+FEATURE = 'Feature'
+SAMPLES = 'Samples'
+
+# The scalar features to correlate, with functions to extract them.
+SCALAR_FEATURES: List[Tuple[str, Callable[[FileFeatures], float]]] = [
+    ('tokens', lambda f: f.tokens),
+    ('max_bracket_depth', lambda f: f.max_bracket_depth),
+    ('max_indent_depth', lambda f: f.max_indent_depth),
+    ('longest_line', lambda f: f.longest_line),
+    ('statements', lambda f: f.statements),
+    ('tokens_per_statement', lambda f: f.tokens_per_statement),
+    ('distinct_tokens', lambda f: f.distinct_tokens),
+]
+
+
+def correlate_features(collated_results_file: Path, features_file: Path, out_file: Path, parsers: List[str],
+                       include_histogram: bool = False):
+    """
+    Computes the Spearman rank correlation between each feature of the inputs and each parser's time per token. A
+    rank correlation is used because neither the features nor the timings are expected to be normally distributed, and
+    only a monotonic relationship is being looked for.
+
+    If `include_histogram` is true, the relative frequency of each kind of token is also correlated.
+    """
+    print(f"Correlating input features with time per token and outputting results in {out_file}...")
+    features = load_features_index(features_file)
+    parser_columns = {parser: f'{parser} {SPT}' for parser in parsers}
+    timings: Dict[str, Dict[str, float]] = {parser: {} for parser in parsers}
+    with open(collated_results_file, mode='r', newline='') as res_csv:
+        for row in DictReader(res_csv):
+            filename = row[FILENAME]
+            if filename not in features:
+                continue
+            for parser in parsers:
+                spt = float(row.get(parser_columns[parser]) or 'nan')
+                if not is_nan(spt):
+                    timings[parser][filename] = spt
+    extractors = list(SCALAR_FEATURES)
+    if include_histogram:
+        kinds = sorted({kind for f in features.values() for kind in f.histogram})
+        extractors.extend((f'frequency of {kind}', _make_frequency_extractor(kind)) for kind in kinds)
+    with open(out_file, mode='w', newline='') as out_csv:
+        fields = [FEATURE, *parsers, SAMPLES]
+        out_writer = DictWriter(out_csv, fields)
+        out_writer.writeheader()
+        max_name_length = max(len(name) for name, _ in extractors)
+        print(f"{'':{max_name_length}} " + ' '.join(f'{parser:>14}' for parser in parsers))
+        for name, extract in extractors:
+            row = {FEATURE: name}
+            samples = 0
+            cells = []
+            for parser in parsers:
+                filenames = sorted(timings[parser])
+                rho = spearman_correlation([extract(features[filename]) for filename in filenames],
+                                           [timings[parser][filename] for filename in filenames])
+                samples = max(samples, len(filenames))
+                row[parser] = 'nan' if rho is None else f'{rho:.4f}'
+                cells.append(f'{row[parser]:>14}')
+            row[SAMPLES] = samples
+            out_writer.writerow(row)
+            print(f"{name:{max_name_length}} " + ' '.join(cells))
+    print(f"Correlation complete.")
+
+
+def _make_frequency_extractor(kind: str) -> Callable[[FileFeatures], float]:
+    return lambda f: f.histogram.get(kind, 0) / f.tokens if f.tokens else 0.0
+
+
+def spearman_correlation(xs: List[float], ys: List[float]) -> Optional[float]:
+    """
+    Computes Spearman's rank correlation coefficient of the paired values, with tied values given their average rank.
+    Returns None if there are fewer than two pairs or either list of values is constant.
+    """
+    if len(xs) != len(ys):
+        raise RuntimeError(f"Cannot correlate lists of different lengths: {len(xs)} and {len(ys)}.")
+    if len(xs) < 2:
+        return None
+    return _pearson_correlation(_ranks(xs), _ranks(ys))
+
+
+def _ranks(values: List[float]) -> List[float]:
+    order = sorted(range(len(values)), key=lambda i: values[i])
+    ranks = [0.0] * len(values)
+    i = 0
+    while i < len(order):
+        j = i
+        while j + 1 < len(order) and values[order[j + 1]] == values[order[i]]:
+            j += 1
+        # Ranks are 1-based, and tied values share the average of the ranks they span.
+        average_rank = (i + j) / 2 + 1
+        for k in range(i, j + 1):
+            ranks[order[k]] = average_rank
+        i = j + 1
+    return ranks
+
+
+def _pearson_correlation(xs: List[float], ys: List[float]) -> Optional[float]:
+    n = len(xs)
+    mean_x = sum(xs) / n
+    mean_y = sum(ys) / n
+    cov_xy = sum((x - mean_x) * (y - mean_y) for x, y in zip(xs, ys))
+    var_x = sum((x - mean_x) ** 2 for x in xs)
+    var_y = sum((y - mean_y) ** 2 for y in ys)
+    if var_x == 0 or var_y == 0:
+        return None
+    return cov_xy / sqrt(var_x * var_y)
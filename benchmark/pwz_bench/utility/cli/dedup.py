@@ -0,0 +1,130 @@
+from .common import *
+
+from .lex import blex_file_of_lex_file, pos_file_of_lex_file
+
+from csv import DictReader, DictWriter
+from hashlib import sha256
+from pathlib import Path
+from re import compile as re_compile
+from typing import Dict, List, Optional
+
+
+__all__ = ['DEFAULT_ALIASES_FILENAME', 'DEFAULT_DUPLICATES_DIRNAME', 'REPRESENTATIVE',
+           'dedup_lex_files', 'restore_lex_files', 'load_aliases']
+
+
+# Default name of the file recording which .lex files were removed as duplicates, placed in the lex file directory.
+DEFAULT_ALIASES_FILENAME = 'aliases.csv'
+# Default name of the subdirectory of the lex file directory that duplicates are moved into.
+DEFAULT_DUPLICATES_DIRNAME = 'duplicates'
+# These constants are for titling the columns in the aliases CSV.
+REPRESENTATIVE = 'Representative'
+HASH = 'Hash'
+
+FIELDS = [FILENAME, REPRESENTATIVE, HASH]
+
+# Matches the parameter of a parameterized token, e.g., the `"foo"` in `NAME "foo"`.
+TOKEN_PARAM_RE = re_compile(rb' ".*"$')
+
+
+def dedup_lex_files(lex_file_dir: Path, ignore_values: bool = False, aliases_file: Optional[Path] = None):
+    """
+    Removes duplicate token streams from the .lex files in the directory. Each .lex file is hashed, and one
+    representative is kept for each hash. The other files are moved into a subdirectory (so they are no longer picked
+    up by the other commands) along with their .blex and .pos files, and recorded in the aliases file, so that
+    benchmarking results can be re-expanded later.
+
+    The entries of the moved files are left in the lex manifest and the feature index on purpose. The manifest is only
+    consulted for the files in the directory, while the collated results still give each duplicate a row, which
+    `correlate` matches with its features. The entries also match the files again once they are restored.
+
+    If `ignore_values` is true, the parameters of NAME, NUMBER, and STRING tokens are ignored while hashing, so token
+    streams which differ only in their identifiers or literals are also treated as duplicates.
+    """
+    if aliases_file is None:
+        aliases_file = lex_file_dir / DEFAULT_ALIASES_FILENAME
+    dup_dir = lex_file_dir / DEFAULT_DUPLICATES_DIRNAME
+    print(f"Removing duplicate token streams from {lex_file_dir}...")
+    # Aliases found by a previous run are kept, so running this more than once is safe.
+    rows = _read_aliases_file(aliases_file)
+    aliases = {row[FILENAME]: row[REPRESENTATIVE] for row in rows}
+    hashes = {row[REPRESENTATIVE]: row[HASH] for row in rows}
+    representatives: Dict[str, str] = {}
+    lex_files = sorted(lex_file_dir.glob('*.lex'))
+    manifest = load_lex_manifest(lex_file_dir) if not ignore_values else {}
+    for lex_file in lex_files:
+        entry = lex_manifest_entry(manifest, lex_file)
+        digest = entry['sha256'] if entry is not None else hash_lex_file(lex_file, ignore_values)
+        hashes[lex_file.name] = digest
+        if digest not in representatives:
+            representatives[digest] = lex_file.name
+            continue
+        representative = representatives[digest]
+        dup_dir.mkdir(exist_ok=True)
+        _move_lex_file(lex_file, dup_dir)
+        aliases[lex_file.name] = representative
+        # Anything which was previously an alias of this file now becomes an alias of its representative.
+        for alias, target in aliases.items():
+            if target == lex_file.name:
+                aliases[alias] = representative
+    with open(aliases_file, mode='w', newline='') as aliases_csv:
+        writer = DictWriter(aliases_csv, FIELDS)
+        writer.writeheader()
+        for alias, representative in sorted(aliases.items(), key=lambda t: (t[1], t[0])):
+            writer.writerow({FILENAME: alias, REPRESENTATIVE: representative, HASH: hashes[representative]})
+    print(f"Kept {len(representatives)} of {len(lex_files)} .lex files; {len(aliases)} duplicates in total are "
+          f"recorded in {aliases_file}.")
+
+
+def _move_lex_file(lex_file: Path, to_dir: Path):
+    """
+    Moves a .lex file into another directory along with its .blex and .pos files, if it has them. Their times are kept,
+    so the .blex file is still used in place of the .lex file, and the lex manifest still matches, once they are moved.
+    """
+    for file in (pos_file_of_lex_file(lex_file), lex_file, blex_file_of_lex_file(lex_file)):
+        if file.is_file():
+            file.replace(to_dir / file.name)
+
+
+def restore_lex_files(lex_file_dir: Path, aliases_file: Optional[Path] = None):
+    """
+    Undoes `dedup_lex_files` by moving the duplicates back into the lex file directory and removing the aliases file.
+    """
+    if aliases_file is None:
+        aliases_file = lex_file_dir / DEFAULT_ALIASES_FILENAME
+    dup_dir = lex_file_dir / DEFAULT_DUPLICATES_DIRNAME
+    print(f"Restoring duplicate token streams to {lex_file_dir}...")
+    if dup_dir.is_dir():
+        for lex_file in dup_dir.glob('*.lex'):
+            _move_lex_file(lex_file, lex_file_dir)
+        dup_dir.rmdir()
+    if aliases_file.is_file():
+        aliases_file.unlink()
+    print(f"Restoration complete.")
+
+
+def load_aliases(aliases_file: Path) -> Dict[str, str]:
+    """
+    Reads an aliases file, returning a dictionary mapping the name of each removed .lex file to the name of the .lex
+    file which was kept in its place.
+    """
+    if not aliases_file.is_file():
+        raise RuntimeError(f"Aliases file does not exist: {aliases_file}.")
+    return {row[FILENAME]: row[REPRESENTATIVE] for row in _read_aliases_file(aliases_file)}
+
+
+def _read_aliases_file(aliases_file: Path) -> List[Dict[str, str]]:
+    if not aliases_file.is_file():
+        return []
+    with open(aliases_file, mode='r', newline='') as aliases_csv:
+        return list(DictReader(aliases_csv))
+
+
+def hash_lex_file(lex_file: Path, ignore_values: bool = False) -> str:
+    digest = sha256()
+    with open(lex_file, 'rb') as f:
+        for line in f:
+            if ignore_values:
+                line = TOKEN_PARAM_RE.sub(b'', line.rstrip(b'\n')) + b'\n'
+            digest.update(line)
+    return digest.hexdigest()
@@ -0,0 +1,132 @@
+from .common import *
+from .lex import load_positions, pos_file_of_lex_file
+
+from enum import Enum
+from html import escape
+from pathlib import Path
+from subprocess import run
+from tempfile import TemporaryDirectory
+from typing import Dict, List, Tuple
+
+
+__all__ = ['CostMetric', 'HeatmapFormat', 'attribute_costs', 'make_heatmap']
+
+
+class CostMetric(Enum):
+    TIME = 'time'
+    WORDS = 'words'
+
+
+class HeatmapFormat(Enum):
+    HTML = 'html'
+    TEXT = 'text'
+
+
+# The number of most expensive lines to list when a heatmap is made.
+TOP_LINES = 10
+TEXT_BAR_WIDTH = 20
+
+HTML_TEMPLATE = """\
+<!DOCTYPE html>
+<html>
+<head>
+<meta charset="utf-8">
+<title>{title}</title>
+<style>
+body {{ font-family: sans-serif; }}
+table {{ border-collapse: collapse; }}
+td {{ padding: 0 0.5em; white-space: pre; }}
+td.num {{ text-align: right; color: #666; }}
+td.code {{ font-family: monospace; }}
+</style>
+</head>
+<body>
+<h1>{title}</h1>
+<p>{summary}</p>
+<table>
+{rows}
+</table>
+</body>
+</html>
+"""
+
+
+def attribute_costs(driver: Path, lex_file: Path, parser: str, repeats: int = 1) -> List[Tuple[float, float]]:
+    """
+    Runs the parsing executable in attribution mode, returning the average (seconds, words allocated) charged to each
+    token position of the .lex file. There is one more entry than there are tokens, for the end of the input.
+    """
+    with TemporaryDirectory() as temp_dir:
+        costs_file = Path(temp_dir) / 'costs.txt'
+        result = run([driver, parser, lex_file, '-costs', costs_file, '-repeat', str(repeats)], capture_output=True)
+        if result.returncode != 0:
+            raise RuntimeError(f"Attributing the costs of {lex_file} with {parser} failed: "
+                               f"{result.stderr.decode(errors='replace').strip()}")
+        with open(costs_file) as f:
+            return [(float(seconds), float(words)) for seconds, words in (entry.split() for entry in f)]
+
+
+def _costs_by_line(positions: List[Tuple[int, int]], costs: List[Tuple[float, float]],
+                   metric: CostMetric) -> Dict[int, float]:
+    if len(costs) != len(positions) + 1:
+        raise RuntimeError(f"Found costs for {len(costs)} positions, but expected {len(positions) + 1}.")
+    index = 0 if metric is CostMetric.TIME else 1
+    by_line: Dict[int, float] = {}
+    # The end of the input is charged to the line of the last token.
+    for (line, _), cost in zip(positions + positions[-1:], costs):
+        by_line[line] = by_line.get(line, 0.0) + cost[index]
+    return by_line
+
+
+def make_heatmap(driver: Path, py_file: Path, lex_file: Path, parser: str, out_file: Path, repeats: int = 1,
+                 metric: CostMetric = CostMetric.TIME, fmt: HeatmapFormat = HeatmapFormat.HTML):
+    """
+    Renders the original source of a .lex file as a heatmap of the cost of parsing each line with the given parser. The
+    cost of each token is charged to the line on which the token starts.
+    """
+    print(f"Attributing the cost of parsing {lex_file.name} with {parser} to the lines of {py_file}...")
+    positions = load_positions(pos_file_of_lex_file(lex_file))
+    costs = attribute_costs(driver, lex_file, parser, repeats)
+    by_line = _costs_by_line(positions, costs, metric)
+    source_lines = py_file.read_text().splitlines()
+    total = sum(by_line.values())
+    max_cost = max(by_line.values(), default=0.0)
+    unit = 'sec' if metric is CostMetric.TIME else 'words'
+    out_file.parent.mkdir(parents=True, exist_ok=True)
+    if fmt is HeatmapFormat.HTML:
+        out_file.write_text(_render_html(py_file, parser, source_lines, by_line, total, max_cost, unit))
+    else:
+        out_file.write_text(_render_text(source_lines, by_line, total, max_cost))
+    print("The most expensive lines are:")
+    for line, cost in sorted(by_line.items(), key=lambda item: item[1], reverse=True)[:TOP_LINES]:
+        code = source_lines[line - 1].strip() if line <= len(source_lines) else ''
+        print(f"  {line:>6}  {_percent(cost, total):>6.2f}%  {code[:60]}")
+    print(f"{GREEN_CHECK} Heatmap written to {out_file}.")
+
+
+def _percent(cost: float, total: float) -> float:
+    return 100 * cost / total if total else 0.0
+
+
+def _render_html(py_file: Path, parser: str, source_lines: List[str], by_line: Dict[int, float], total: float,
+                 max_cost: float, unit: str) -> str:
+    rows = []
+    for line, code in enumerate(source_lines, start=1):
+        cost = by_line.get(line, 0.0)
+        alpha = cost / max_cost if max_cost else 0.0
+        rows.append(f'<tr style="background-color: rgba(255, 0, 0, {alpha:.3f})">'
+                    f'<td class="num">{line}</td>'
+                    f'<td class="num">{_percent(cost, total):.2f}%</td>'
+                    f'<td class="code">{escape(code)}</td></tr>')
+    return HTML_TEMPLATE.format(title=escape(f"{py_file.name} parsed with {parser}"),
+                                summary=escape(f"Total cost: {total:.6g} {unit}."),
+                                rows='\n'.join(rows))
+
+
+def _render_text(source_lines: List[str], by_line: Dict[int, float], total: float, max_cost: float) -> str:
+    lines = []
+    for line, code in enumerate(source_lines, start=1):
+        cost = by_line.get(line, 0.0)
+        bar = '#' * round(TEXT_BAR_WIDTH * cost / max_cost) if max_cost else ''
+        lines.append(f"{line:>6} {_percent(cost, total):>6.2f}% {bar:<{TEXT_BAR_WIDTH}} | {code}")
+    return '\n'.join(lines) + '\n'
@@ -0,0 +1,162 @@
+from .common import *
+
+from ..tokenize import TokenEnum
+
+from csv import DictWriter
+from pathlib import Path
+from random import Random
+from typing import Iterator, List, Optional, Tuple
+
+
+__all__ = ['DEFAULT_LADDER_SIZES', 'token_count_of_string', 'build_ladder']
+
+
+# The default rungs of the ladder, doubling from one thousand to a quarter of a million tokens.
+DEFAULT_LADDER_SIZES = [f'{2 ** i}k' for i in range(9)]
+# The name of the file listing the rungs of the ladder, placed in the output directory.
+LADDER_MANIFEST_FILENAME = 'ladder.csv'
+# These constants are for titling the columns in the ladder manifest.
+TARGET = 'Target'
+SOURCES = 'Sources'
+
+FIELDS = [FILENAME, TARGET, TOKENS, SOURCES]
+
+NEWLINE = TokenEnum.NEWLINE.name
+INDENT = TokenEnum.INDENT.name
+DEDENT = TokenEnum.DEDENT.name
+ENDMARKER = TokenEnum.ENDMARKER.name
+AT = TokenEnum.AT.name
+# A statement boundary is not safe to cut at if it is followed by one of these, because they continue the preceding
+# statement (or block).
+CONTINUATIONS = {INDENT, DEDENT, TokenEnum.ELIF.name, TokenEnum.ELSE.name, TokenEnum.EXCEPT.name,
+                 TokenEnum.FINALLY.name}
+
+SUFFIXES = {'k': 1_000, 'm': 1_000_000}
+
+
+def token_count_of_string(s: str) -> int:
+    """
+    Converts a token count such as `4000`, `4k`, or `1m` to an integer.
+    """
+    multiplier = SUFFIXES.get(s[-1:].lower())
+    try:
+        count = int(s[:-1]) * multiplier if multiplier is not None else int(s)
+    except ValueError:
+        raise RuntimeError(f"Invalid token count: {s}.")
+    if count <= 1:
+        raise RuntimeError(f"Token count must be greater than 1: {s}.")
+    return count
+
+
+def build_ladder(lex_file_dir: Path, out_dir: Path, sizes: List[str], seed: Optional[int] = None):
+    """
+    Builds a "ladder" of inputs of increasing size by concatenating the token streams of real files from the corpus.
+    Each rung of the ladder is a prefix of the next, so the rungs differ only in their size.
+
+    Files are joined at the top level, where each file's stream is at an indentation depth of zero. The ENDMARKER of
+    each file is dropped and a single one is appended to the end of each rung. To come as close as possible to the
+    target sizes, the last file used in a rung may be cut short, but only at the boundary between two top-level
+    statements (see `_safe_segments`). The result is a sequence of top-level statements, which is a valid `file_input`.
+
+    The files are used in order of their names, or else in a random order determined by the `seed`. If the corpus is
+    exhausted before the largest rung is complete, the files are reused from the start.
+    """
+    targets = sorted((token_count_of_string(size), size) for size in sizes)
+    lex_files = sorted(lex_file_dir.glob('*.lex'))
+    if not lex_files:
+        raise RuntimeError(f"No .lex files found in {lex_file_dir}.")
+    if seed is not None:
+        Random(seed).shuffle(lex_files)
+    out_dir.mkdir(parents=True, exist_ok=True)
+    manifest_file = out_dir / LADDER_MANIFEST_FILENAME
+    print(f"Building a ladder of {len(targets)} inputs from the .lex files in {lex_file_dir}...")
+    segments = _cycle_segments(lex_files)
+    stream: List[str] = []
+    sources: List[Path] = []
+    pending, pending_source = next(segments)
+    with open(manifest_file, mode='w', newline='') as manifest_csv:
+        writer = DictWriter(manifest_csv, FIELDS)
+        writer.writeheader()
+        for target, label in targets:
+            # One token is reserved for the final ENDMARKER.
+            while len(stream) + len(pending) <= target - 1:
+                stream.extend(pending)
+                if not sources or sources[-1] != pending_source:
+                    sources.append(pending_source)
+                pending, pending_source = next(segments)
+            if not stream:
+                print(f"Skipping {label}: the first top-level statement is longer than {target} tokens.")
+                continue
+            out_file = out_dir / f'ladder-{label}.lex'
+            print(f"Writing {out_file.name} ({len(stream) + 1} of {target} tokens from {len(sources)} files)...")
+            with open(out_file, 'w') as f:
+                for token in stream:
+                    f.write(f"{token}\n")
+                f.write(f"{ENDMARKER}\n")
+            writer.writerow({FILENAME: out_file.name, TARGET: target, TOKENS: len(stream) + 1, SOURCES: len(sources)})
+    print(f"Ladder complete. A summary of the rungs is in {manifest_file}.")
+
+
+def _cycle_segments(lex_files: List[Path]) -> Iterator[Tuple[List[str], Path]]:
+    """
+    Yields the safe segments of each file in turn, starting over when all the files have been used.
+    """
+    while True:
+        found = False
+        for lex_file in lex_files:
+            for segment in _safe_segments(lex_file):
+                found = True
+                yield segment, lex_file
+        if not found:
+            raise RuntimeError(f"None of the .lex files contain any complete top-level statements.")
+        print(f"All .lex files have been used; starting over from the first file.")
+
+
+def _safe_segments(lex_file: Path) -> Iterator[List[str]]:
+    """
+    Splits a file's token stream (without its ENDMARKER) into segments that can be concatenated with those of any other
+    file. A segment ends at a top-level statement boundary which is safe to cut at, meaning:
+
+      * the indentation depth is zero, and the last token was a NEWLINE or DEDENT;
+      * the next token does not continue the preceding statement (e.g., an ELSE or a DEDENT); and
+      * the line just ended was not a decorator, which must stay with the definition after it.
+
+    Files whose indentation is unbalanced are skipped entirely.
+    """
+    with open(lex_file) as f:
+        tokens = [line.rstrip('\n') for line in f]
+    if tokens and tokens[-1] == ENDMARKER:
+        tokens.pop()
+    if ENDMARKER in tokens:
+        print(f"Skipping {lex_file.name}: unexpected ENDMARKER before the end of the stream.")
+        return
+    segments: List[List[str]] = []
+    depth = 0
+    start = 0
+    line_start = 0
+    for i, token in enumerate(tokens):
+        if token not in (NEWLINE, INDENT, DEDENT):
+            continue
+        if token == INDENT:
+            depth += 1
+        elif token == DEDENT:
+            depth -= 1
+            if depth < 0:
+                print(f"Skipping {lex_file.name}: unbalanced indentation.")
+                return
+        # Each of these tokens ends a logical line, so the next line starts after it.
+        ended_line_start = line_start
+        line_start = i + 1
+        if depth != 0 or token == INDENT:
+            continue
+        if token == NEWLINE and tokens[ended_line_start] == AT:
+            continue
+        next_token = tokens[i + 1] if i + 1 < len(tokens) else None
+        if next_token in CONTINUATIONS:
+            continue
+        segments.append(tokens[start:i + 1])
+        start = i + 1
+    if depth != 0 or start != len(tokens):
+        print(f"Skipping {lex_file.name}: the stream does not end at a top-level statement boundary.")
+        return
+    yield from segments
@@ -0,0 +1,126 @@
+from .common import *
+from .pipeline import ParserServer
+
+from csv import DictWriter
+from pathlib import Path
+from statistics import median
+from time import perf_counter
+from typing import List, Optional, Tuple
+
+
+__all__ = ['DEFAULT_STARTUP_RUNS', 'DEFAULT_WARMUP_PARSES', 'DEFAULT_STEADY_PARSES', 'single_parser_server',
+           'measure_latencies']
+
+
+# Default number of times each parser server is started with no input.
+DEFAULT_STARTUP_RUNS = 5
+# Default number of parses performed (and discarded) to warm up a parser server before measuring steady-state parses.
+DEFAULT_WARMUP_PARSES = 5
+# Default number of steady-state parses measured for each input.
+DEFAULT_STEADY_PARSES = 20
+# The name of the results file, placed in the output directory.
+LATENCY_RESULTS_FILENAME = 'latency-results.csv'
+# These constants are for titling the columns in the output CSV.
+PARSER = 'Parser'
+STARTUP = 'Startup'
+FIRST_LATENCY = 'First Latency'
+FIRST_PARSE = 'First Parse'
+STEADY_LATENCY = 'Steady Latency'
+STEADY_PARSE = 'Steady Parse'
+
+FIELDS = [PARSER, FILENAME, TOKENS, STARTUP, FIRST_LATENCY, FIRST_PARSE, STEADY_LATENCY, STEADY_PARSE]
+
+
+def single_parser_server(driver: Path, parser: str) -> Path:
+    """
+    The parser server built alongside the `pwz_serve` executable at `driver` with only the given parser linked in.
+    """
+    server = driver.with_name(f'{driver.name}_{parser}')
+    if not server.is_file():
+        raise RuntimeError(f"The parser server {server} does not exist; build it with `make serve-each` in "
+                           f"{driver.parent}.")
+    return server
+
+
+def measure_latencies(driver: Path, base_dir: Path, lex_file_dir: Path, out_dir: Path, parsers: List[str],
+                      lex_files: Optional[List[Path]] = None, startup_runs: int = DEFAULT_STARTUP_RUNS,
+                      warmup_parses: int = DEFAULT_WARMUP_PARSES, steady_parses: int = DEFAULT_STEADY_PARSES):
+    """
+    Measures the latency of each parser in three separate phases. Each parser is run with its own server, which is
+    built next to the `pwz_serve` executable at `driver` with only that parser linked in (see `single_parser_server`),
+    so that no other parser's grammar is initialized when it starts.
+
+      * Startup: the time from starting the server to its exit when it is given no input. This covers executing the
+        program and initializing the parser's generated grammar, such as the lookahead computation of pwz_nary_look.
+      * First parse: the first parse performed by a freshly started server.
+      * Steady state: the median of repeated parses of the same input after the server has been warmed up.
+
+    Each parse is reported both as the round-trip latency seen by the caller and as the time the server itself spent
+    parsing. If no .lex files are given, the file with the median number of tokens in the lex file directory is used.
+    """
+    if lex_files is None:
+        lex_file_tups = get_sorted_files_and_lengths(lex_file_dir, '*.lex')
+        if not lex_file_tups:
+            raise RuntimeError(f"No .lex files found in {lex_file_dir}.")
+        lex_files = [lex_file_tups[len(lex_file_tups) // 2][0]]
+    inputs = [(lex_file, lex_file.read_text().splitlines()) for lex_file in lex_files]
+    out_dir.mkdir(parents=True, exist_ok=True)
+    res_file = out_dir / LATENCY_RESULTS_FILENAME
+    print(f"Measuring startup, first-parse, and steady-state latencies and outputting results to {res_file}...")
+    with open(res_file, mode='w', newline='') as res_csv:
+        res_writer = DictWriter(res_csv, FIELDS)
+        res_writer.writeheader()
+        for parser in parsers:
+            server = single_parser_server(driver, parser)
+            startup = median(_measure_startup(server, parser) for _ in range(startup_runs))
+            print(f"{parser}: startup {startup:.4f} sec")
+            for lex_file, lines in inputs:
+                short_file = lex_file.relative_to(base_dir) if base_dir in lex_file.parents else lex_file
+                first_latency, first_parse = _measure_first_parse(server, parser, lines)
+                steady_latency, steady_parse = _measure_steady_state(server, parser, lines, warmup_parses,
+                                                                     steady_parses)
+                res_writer.writerow({
+                    PARSER: parser,
+                    FILENAME: short_file,
+                    TOKENS: len(lines),
+                    STARTUP: f'{startup:.6f}',
+                    FIRST_LATENCY: f'{first_latency:.6f}',
+                    FIRST_PARSE: f'{first_parse:.6f}',
+                    STEADY_LATENCY: f'{steady_latency:.6f}',
+                    STEADY_PARSE: f'{steady_parse:.6f}',
+                })
+                res_csv.flush()
+                print(f"{parser}: {lex_file.name} ({len(lines)} tok) | first parse {first_latency:.4f} sec "
+                      f"({first_parse:.4f} sec parsing) | steady state {steady_latency:.4f} sec "
+                      f"({steady_parse:.4f} sec parsing)")
+    print(f"Latency measurement done.")
+
+
+def _measure_startup(driver: Path, parser: str) -> float:
+    t_0 = perf_counter()
+    server = ParserServer(driver, parser, print_ast=False)
+    server.close()
+    return perf_counter() - t_0
+
+
+def _timed_parse(server: ParserServer, lines: List[str]) -> Tuple[float, float]:
+    t_0 = perf_counter()
+    response = server.parse(lines)
+    d_t = perf_counter() - t_0
+    if not response.ok:
+        raise RuntimeError(f"Parse with {server.parser} failed: {response.error}")
+    return d_t, response.parse_ns / 1_000_000_000
+
+
+def _measure_first_parse(driver: Path, parser: str, lines: List[str]) -> Tuple[float, float]:
+    with ParserServer(driver, parser, print_ast=False) as server:
+        return _timed_parse(server, lines)
+
+
+def _measure_steady_state(driver: Path, parser: str, lines: List[str], warmup_parses: int,
+                          steady_parses: int) -> Tuple[float, float]:
+    with ParserServer(driver, parser, print_ast=False) as server:
+        for _ in range(warmup_parses):
+            _timed_parse(server, lines)
+        samples = [_timed_parse(server, lines) for _ in range(max(steady_parses, 1))]
+    return median(s[0] for s in samples), median(s[1] for s in samples)
@@ -0,0 +1,230 @@
+from .common import *
+
+from .lex_cache import LexCache
+
+from ..tokenize import *
+
+from concurrent.futures import ProcessPoolExecutor
+from contextlib import ExitStack
+from dataclasses import asdict
+from hashlib import sha256
+from json import dump as dump_json, load as load_json
+from parso.grammar import PythonGrammar
+from pathlib import Path
+from typing import Dict, List, Optional, TextIO, Tuple
+
+
+__all__ = ['DEFAULT_FEATURES_FILENAME', 'lex_py_files', 'load_features_index', 'pos_file_of_lex_file',
+           'blex_file_of_lex_file', 'token_file_of_lex_file', 'load_positions']
+
+
+# Default name of the feature index written alongside the .lex files.
+DEFAULT_FEATURES_FILENAME = 'features.json'
+# The suffix of the side files recording the source position of each token, which replaces the .lex suffix.
+POSITIONS_SUFFIX = '.pos'
+# The number of tokens whose lines are written to the .lex and .pos files at a time.
+WRITE_BATCH_SIZE = 1 << 12
+# The number of bytes of a .lex file read at a time when it is hashed for the manifest.
+READ_CHUNK_SIZE = 1 << 20
+
+
+# The settings of the lexing worker in this process, given when the worker starts.
+_worker_grammar_args: Tuple[Optional[str], Optional[str]] = (None, None)
+_worker_cache: Optional[LexCache] = None
+_worker_backend: TokenizerBackend = TokenizerBackend.AUTO
+# The grammar used by the lexing worker in this process, loaded once on the worker's first cache miss.
+_worker_grammar: Optional[PythonGrammar] = None
+
+
+def _init_worker(grammar_file: Optional[str], python_version: Optional[str], cache: Optional[LexCache],
+                 backend: TokenizerBackend):
+    global _worker_grammar_args, _worker_cache, _worker_backend
+    _worker_grammar_args = (grammar_file, python_version)
+    _worker_cache = cache
+    _worker_backend = backend
+
+
+def _manifest_entry(py_path: Path, lex_file: Path, features: Dict) -> Dict:
+    h = sha256()
+    tokens = 0
+    with open(lex_file, 'rb') as f:
+        for chunk in iter(lambda: f.read(READ_CHUNK_SIZE), b''):
+            h.update(chunk)
+            tokens += chunk.count(b'\n')
+    stat = lex_file.stat()
+    return {
+        'source': str(py_path),
+        'tokens': tokens,
+        # This is the same digest `dedup` computes for a file, so it can be reused there.
+        'sha256': h.hexdigest(),
+        'size': stat.st_size,
+        'mtime_ns': stat.st_mtime_ns,
+        'features': features,
+    }
+
+
+def _write_batch(tokens: List[Token], pos_lines: List[str], collector: FeatureCollector, lex_file: TextIO,
+                 pos_file: TextIO):
+    collector.add_all(tokens)
+    lex_file.write(''.join([f"{tok}\n" for tok in tokens]))
+    pos_file.write(''.join(pos_lines))
+    tokens.clear()
+    pos_lines.clear()
+
+
+def _lex_file(files: Tuple[Path, Path]) -> Tuple[Dict, bool]:
+    """
+    Lexes a single .py file into a .lex file, a .blex file, and a .pos file, returning the file's manifest entry and
+    whether it was found in the cache. The files are written under temporary names and then renamed into place,
+    so an interrupted run never leaves a partial file behind. The .blex file is written after the .lex file, since it
+    is only used while it is at least as new.
+
+    The tokens are streamed from the .py file to the output files, which are written in batches of `WRITE_BATCH_SIZE`
+    tokens, so the memory used does not grow with the size of the file.
+    """
+    global _worker_grammar
+    py_path, out_path = files
+    pos_path = pos_file_of_lex_file(out_path)
+    blex_path = blex_file_of_lex_file(out_path)
+    key = None
+    if _worker_cache is not None:
+        key = _worker_cache.key(py_path)
+        features = _worker_cache.get(key, out_path, blex_path, pos_path)
+        if features is not None:
+            return _manifest_entry(py_path, out_path, features), True
+    if _worker_grammar is None:
+        _worker_grammar = load_grammar(*_worker_grammar_args)
+    temp_out_path = temp_file_of(out_path)
+    temp_blex_path = temp_file_of(blex_path)
+    temp_pos_path = temp_file_of(pos_path)
+    collector = FeatureCollector()
+    try:
+        # The .blex file is finished as the writer is closed, which must come after the .lex file is closed.
+        with BlexWriter(temp_blex_path) as bw, open(temp_out_path, 'w') as f, open(temp_pos_path, 'w') as pf:
+            tokens: List[Token] = []
+            pos_lines: List[str] = []
+            for tok, (line, column) in tokenize_file_with_positions(py_path, _worker_grammar,
+                                                                          backend=_worker_backend):
+                bw.write(tok)
+                tokens.append(tok)
+                pos_lines.append(f"{line} {column}\n")
+                if len(tokens) >= WRITE_BATCH_SIZE:
+                    _write_batch(tokens, pos_lines, collector, f, pf)
+            _write_batch(tokens, pos_lines, collector, f, pf)
+        temp_pos_path.replace(pos_path)
+        temp_out_path.replace(out_path)
+        temp_blex_path.replace(blex_path)
+    finally:
+        for temp_path in (temp_out_path, temp_blex_path, temp_pos_path):
+            if temp_path.exists():
+                temp_path.unlink()
+    features = asdict(collector.features())
+    if _worker_cache is not None:
+        _worker_cache.put(key, out_path, blex_path, pos_path, features)
+    return _manifest_entry(py_path, out_path, features), False
+
+
+def lex_py_files(py_file_dir: Path, lex_file_dir: Path, grammar_file: Optional[str] = None,
+                 python_version: Optional[str] = None, jobs: int = 1, cache_dir: Optional[Path] = None,
+                 backend: TokenizerBackend = TokenizerBackend.AUTO):
+    """
+    Lexes every .py file in the directory into a .lex file. The structural features of each token stream are computed
+    along the way and saved to an index in the lex file directory. The position in the .py file of each token is written
+    to a .pos file alongside each .lex file, with one "line column" pair on each line.
+
+    A manifest is also written to the lex file directory, recording the source, number of tokens, digest, and features
+    of each .lex file, so that later commands need not read every file to find its length.
+
+    The files are spread over `jobs` worker processes, each of which loads the grammar (from `grammar_file`, or else for
+    `python_version`) once when it starts, or else lexed in this process if there is only one job. Progress is reported
+    in the order of the files regardless of the order in which they finish, so the output does not depend on the number
+    of jobs.
+
+    If a cache directory is given, a file whose source, grammar, and tokenizer are unchanged since it was last lexed
+    (into any directory) is copied from the cache instead of being lexed again.
+
+    The tokenizer backend is meant only to affect the speed of lexing, since both backends give the same tokens. The
+    standard library's backend depends on the running interpreter, though, so the cache is kept apart for each backend
+    and each version of Python.
+    """
+    if grammar_file is not None and python_version is not None:
+        raise RuntimeError("Cannot specify both a grammar file and a Python version for lexing.")
+    if jobs > 1:
+        print(f"Lexing up to {jobs} files at a time...")
+    cache = None
+    if cache_dir is not None:
+        print(f"Reusing unchanged lexes cached in {cache_dir}...")
+        cache = LexCache(cache_dir, grammar_file, python_version, backend)
+    files = [(py_path, lex_file_dir / py_path.with_suffix('.py.lex').name)
+             for py_path in sorted(py_file_dir.glob('*.py'))]
+    manifest: Dict[str, Dict] = {}
+    cached_count = 0
+    worker_args = (grammar_file, python_version, cache, backend)
+    with ExitStack() as stack:
+        if jobs > 1:
+            executor = stack.enter_context(ProcessPoolExecutor(max_workers=jobs, initializer=_init_worker,
+                                                               initargs=worker_args))
+            results = executor.map(_lex_file, files)
+        else:
+            # A single job is run in this process, which saves starting a worker and sending it every result.
+            _init_worker(*worker_args)
+            results = map(_lex_file, files)
+        for (_, out_path), (entry, cached) in zip(files, results):
+            print(f"Writing {out_path}... {'Cached' if cached else 'Done'}")
+            manifest[out_path.name] = entry
+            cached_count += cached
+    if cache is not None:
+        print(f"{cached_count} of {len(files)} files were reused from the cache.")
+    features_file = lex_file_dir / DEFAULT_FEATURES_FILENAME
+    _write_json(features_file, {name: entry['features'] for name, entry in manifest.items()})
+    print(f"Features of each token stream have been recorded in {features_file}.")
+    manifest_file = lex_file_dir / LEX_MANIFEST_FILENAME
+    _write_json(manifest_file, manifest)
+    print(f"The manifest of the .lex files has been recorded in {manifest_file}.")
+
+
+def _write_json(file: Path, obj: Dict):
+    temp_file = temp_file_of(file)
+    with open(temp_file, 'w') as f:
+        dump_json(obj, f, indent=1, sort_keys=True)
+    temp_file.replace(file)
+
+
+def load_features_index(features_file: Path) -> Dict[str, FileFeatures]:
+    """
+    Reads a feature index written by `lex_py_files`, returning a dictionary mapping the names of .lex files to their
+    features.
+    """
+    if not features_file.is_file():
+        raise RuntimeError(f"Feature index does not exist: {features_file}.")
+    with open(features_file) as f:
+        return {filename: FileFeatures(**features) for filename, features in load_json(f).items()}
+
+
+def pos_file_of_lex_file(lex_file: Path) -> Path:
+    return lex_file.with_suffix(POSITIONS_SUFFIX)
+
+
+def blex_file_of_lex_file(lex_file: Path) -> Path:
+    return lex_file.with_suffix(BLEX_SUFFIX)
+
+
+def token_file_of_lex_file(lex_file: Path) -> Path:
+    """
+    The file the parsers should read the tokens of a .lex file from: its .blex file, if there is one at least as new as
+    the .lex file, or else the .lex file itself.
+    """
+    blex_file = blex_file_of_lex_file(lex_file)
+    if blex_file.is_file() and blex_file.stat().st_mtime_ns >= lex_file.stat().st_mtime_ns:
+        return blex_file
+    return lex_file
+
+
+def load_positions(pos_file: Path) -> List[Position]:
+    """
+    Reads the positions written to a .pos file by `lex_py_files`.
+    """
+    if not pos_file.is_file():
+        raise RuntimeError(f"Position file does not exist: {pos_file}.")
+    with open(pos_file) as f:
+        return [(int(line), int(column)) for line, column in (entry.split() for entry in f)]
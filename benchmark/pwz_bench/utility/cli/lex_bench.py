@@ -0,0 +1,112 @@
+from .common import *
+
+from ..tokenize import *
+
+from csv import DictWriter
+from dataclasses import dataclass
+from parso.grammar import PythonGrammar
+from pathlib import Path
+from time import perf_counter
+from typing import List, Optional
+
+import tracemalloc
+
+
+__all__ = ['DEFAULT_LEX_BENCH_REPEATS', 'LexBenchResult', 'benchmark_lexing']
+
+
+# Default number of timed passes over the .py files, of which the fastest is kept.
+DEFAULT_LEX_BENCH_REPEATS = 3
+# These constants are for titling the columns in the output CSV.
+LABEL = 'Label'
+TOKENIZER = 'Tokenizer'
+FILES = 'Files'
+SECONDS = 'Seconds'
+TOK_PER_SEC = 'Tok/Sec'
+PEAK_MB = 'Peak MB'
+BYTES_PER_TOKEN = 'Bytes/Tok'
+
+FIELDS = [LABEL, TOKENIZER, FILES, TOKENS, SECONDS, TOK_PER_SEC, PEAK_MB, BYTES_PER_TOKEN]
+
+
+@dataclass
+class LexBenchResult:
+    files: int
+    tokens: int
+    seconds: float
+    peak_bytes: int
+
+    @property
+    def tokens_per_second(self) -> float:
+        return self.tokens / self.seconds if self.seconds else 0.0
+
+    @property
+    def bytes_per_token(self) -> float:
+        return self.peak_bytes / self.tokens if self.tokens else 0.0
+
+
+def _tokenize_all(py_files: List[Path], grammar: PythonGrammar, backend: TokenizerBackend) -> List[List[Token]]:
+    return [list(tokenize_file(str(py_file), grammar, backend=backend)) for py_file in py_files]
+
+
+def benchmark_lexing(py_file_dir: Path, grammar: PythonGrammar, repeats: int = DEFAULT_LEX_BENCH_REPEATS,
+                     out_file: Optional[Path] = None, label: str = '',
+                     backend: TokenizerBackend = TokenizerBackend.AUTO) -> LexBenchResult:
+    """
+    Measures the throughput and peak memory of the tokenizer over every .py file in the directory, without writing any
+    output. The throughput is taken from the fastest of `repeats` passes over the files. The peak memory is measured in
+    a separate pass (since tracing allocations slows everything down) in which the tokens of every file are kept, so it
+    reflects the size of the token objects themselves. Files which fail to tokenize are skipped.
+
+    If an output file is given, the result is appended to it as a row of a CSV, labelled with `label` and the tokenizer
+    backend, so that runs before and after a change (or with each backend) can be compared.
+    """
+    backend = resolve_tokenizer_backend(grammar, backend)
+    print(f"Benchmarking the {backend.value} tokenizer on the .py files in {py_file_dir}...")
+    py_files: List[Path] = []
+    for py_file in sorted(py_file_dir.glob('*.py')):
+        try:
+            list(tokenize_file(str(py_file), grammar, backend=backend))
+        except RuntimeError:
+            print(f"  {RED_X} Skipping {py_file.name}, which does not tokenize.")
+            continue
+        py_files.append(py_file)
+    best_seconds = None
+    tokens = 0
+    for i in range(repeats):
+        t_0 = perf_counter()
+        token_lists = _tokenize_all(py_files, grammar, backend)
+        d_t = perf_counter() - t_0
+        tokens = sum(map(len, token_lists))
+        del token_lists
+        print(f"  Pass {i + 1} of {repeats}: {tokens} tokens in {d_t:.3f} sec")
+        best_seconds = d_t if best_seconds is None else min(best_seconds, d_t)
+    tracemalloc.start()
+    try:
+        token_lists = _tokenize_all(py_files, grammar, backend)
+        _, peak_bytes = tracemalloc.get_traced_memory()
+        del token_lists
+    finally:
+        tracemalloc.stop()
+    result = LexBenchResult(len(py_files), tokens, best_seconds or 0.0, peak_bytes)
+    print(f"{GREEN_CHECK} {result.files} files, {result.tokens} tokens: {result.tokens_per_second:.0f} tok/sec, "
+          f"peak {result.peak_bytes / (1 << 20):.1f} MB ({result.bytes_per_token:.1f} bytes/tok)")
+    if out_file is not None:
+        write_header = not out_file.is_file()
+        out_file.parent.mkdir(parents=True, exist_ok=True)
+        with open(out_file, mode='a', newline='') as out_csv:
+            out_writer = DictWriter(out_csv, FIELDS)
+            if write_header:
+                out_writer.writeheader()
+            out_writer.writerow({
+                LABEL: label,
+                TOKENIZER: backend.value,
+                FILES: result.files,
+                TOKENS: result.tokens,
+                SECONDS: f'{result.seconds:.6f}',
+                TOK_PER_SEC: f'{result.tokens_per_second:.1f}',
+                PEAK_MB: f'{result.peak_bytes / (1 << 20):.2f}',
+                BYTES_PER_TOKEN: f'{result.bytes_per_token:.2f}',
+            })
+        print(f"The result has been appended to {out_file}.")
+    return result
@@ -0,0 +1,110 @@
+from .common import *
+
+from ..tokenize.tokenize import (DEFAULT_GRAMMAR_PATH, USER_CACHE_DIR, TokenizerBackend, load_grammar,
+                                 resolve_tokenizer_backend)
+
+from hashlib import blake2b
+from json import dump as dump_json, load as load_json
+from pathlib import Path
+from shutil import copyfile
+from typing import Dict, Optional
+
+import parso
+import sys
+
+
+__all__ = ['DEFAULT_LEX_CACHE_DIR', 'LexCache']
+
+
+# The directory lexes are cached in unless another is given.
+DEFAULT_LEX_CACHE_DIR = USER_CACHE_DIR / 'lex'
+# Bump this whenever the format of the cached files changes in a way the tokenizer sources do not reflect.
+CACHE_FORMAT_VERSION = 3
+
+# The names of the files making up a cache entry.
+LEX_ENTRY = 'lex'
+BLEX_ENTRY = 'blex'
+POS_ENTRY = 'pos'
+FEATURES_ENTRY = 'features.json'
+
+_TOKENIZE_DIR = Path(__file__).resolve().parent.parent / 'tokenize'
+
+
+def _copy_into_place(source: Path, dest: Path):
+    temp_dest = temp_file_of(dest)
+    try:
+        copyfile(source, temp_dest)
+        temp_dest.replace(dest)
+    finally:
+        if temp_dest.exists():
+            temp_dest.unlink()
+
+
+class LexCache:
+    """
+    A content-addressed cache of lexed files. Each entry is keyed by a digest of the source bytes, the grammar (or
+    Python version) used to tokenize them, and the version of the tokenizer: the sources of this project's tokenize
+    package, the installed version of parso, the tokenizer backend (with `auto` resolved to the one it picks), and the
+    version of the running interpreter, whose `tokenize` module the standard library's backend uses. Any change to one
+    of these gives a new key, so an entry is never stale and entries are never invalidated; the cache directory can
+    simply be deleted to reclaim its space.
+
+    Entries are written under temporary names and renamed into place, so the cache may be shared by many processes
+    (and by several corpora) at once.
+    """
+    def __init__(self, cache_dir: Path, grammar_file: Optional[str] = None, python_version: Optional[str] = None,
+                 backend: TokenizerBackend = TokenizerBackend.AUTO):
+        self.cache_dir = cache_dir
+        backend = resolve_tokenizer_backend(load_grammar(grammar_file, python_version), backend)
+        h = blake2b(digest_size=16)
+        h.update(f'format {CACHE_FORMAT_VERSION}\n'.encode())
+        h.update(f'parso {parso.__version__}\n'.encode())
+        h.update(f'backend {backend.value}\n'.encode())
+        h.update(f'python {sys.version_info[:3]} {sys.implementation.cache_tag}\n'.encode())
+        for source in sorted(_TOKENIZE_DIR.glob('*.py')):
+            h.update(source.name.encode())
+            h.update(source.read_bytes())
+        if python_version is not None:
+            h.update(f'version {python_version}\n'.encode())
+        else:
+            h.update(Path(grammar_file if grammar_file is not None else DEFAULT_GRAMMAR_PATH).read_bytes())
+        # The digest of everything but the source, which is shared by every entry made with these settings.
+        self.configuration = h.hexdigest()
+
+    def key(self, py_file: Path) -> str:
+        h = blake2b(digest_size=16)
+        h.update(self.configuration.encode())
+        h.update(py_file.read_bytes())
+        return h.hexdigest()
+
+    def _entry_dir(self, key: str) -> Path:
+        return self.cache_dir / key[:2] / key
+
+    def get(self, key: str, lex_file: Path, blex_file: Path, pos_file: Path) -> Optional[Dict]:
+        """
+        Copies a cached lex into place, returning its features, or returns None if there is no entry for the key.
+        """
+        entry_dir = self._entry_dir(key)
+        features_file = entry_dir / FEATURES_ENTRY
+        # The features are written last, so an entry is complete if they exist.
+        if not features_file.is_file():
+            return None
+        with open(features_file) as f:
+            features = load_json(f)
+        _copy_into_place(entry_dir / POS_ENTRY, pos_file)
+        _copy_into_place(entry_dir / LEX_ENTRY, lex_file)
+        # The .blex file is only used while it is at least as new as the .lex file, so it is copied second.
+        _copy_into_place(entry_dir / BLEX_ENTRY, blex_file)
+        return features
+
+    def put(self, key: str, lex_file: Path, blex_file: Path, pos_file: Path, features: Dict):
+        entry_dir = self._entry_dir(key)
+        entry_dir.mkdir(parents=True, exist_ok=True)
+        _copy_into_place(lex_file, entry_dir / LEX_ENTRY)
+        _copy_into_place(blex_file, entry_dir / BLEX_ENTRY)
+        _copy_into_place(pos_file, entry_dir / POS_ENTRY)
+        features_file = entry_dir / FEATURES_ENTRY
+        temp_features_file = temp_file_of(features_file)
+        with open(temp_features_file, 'w') as f:
+            dump_json(features, f, indent=1, sort_keys=True)
+        temp_features_file.replace(features_file)
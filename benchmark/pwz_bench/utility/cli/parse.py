@@ -1,55 +1,116 @@
 from .common import *
+from .lex import token_file_of_lex_file
 
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass
+from enum import Enum
+from functools import partial
 from pathlib import Path
 from subprocess import TimeoutExpired, run
 from time import time
-from typing import List, Optional
+from typing import List, Optional, Tuple
 
+import resource
 
-__all__ = ['run_parsers']
+
+__all__ = ['ParseStatus', 'ParseOutcome', 'parse_file', 'run_parsers']
+
+
+class ParseStatus(Enum):
+    SUCCESS = 'success'
+    ERROR = 'error'
+    TIMEOUT = 'timeout'
+    OUT_OF_MEMORY = 'out of memory'
+
+
+@dataclass
+class ParseOutcome:
+    status: ParseStatus
+    seconds: float
+
+
+def _limit_memory(memory_limit: int):
+    limit = memory_limit * 1024 * 1024
+    resource.setrlimit(resource.RLIMIT_AS, (limit, limit))
+
+
+def parse_file(driver: Path, parser: str, timeout: Optional[int], memory_limit: Optional[int], binary: bool,
+               files: Tuple[Path, Path]) -> ParseOutcome:
+    """
+    Parses a single .lex file with the given parser, writing the AST to the output file if the parse succeeds. The
+    parse is killed if it takes longer than `timeout` seconds, and its address space is capped at `memory_limit`
+    megabytes. The AST is written in the binary format if `binary` is set. It is written here rather than returned so
+    that it is never copied between processes.
+    """
+    lex_file, out_file = files
+    # Any AST left by an earlier run is removed, so that a failed parse cannot be mistaken for a successful one.
+    if out_file.exists():
+        out_file.unlink()
+    preexec_fn = partial(_limit_memory, memory_limit) if memory_limit is not None else None
+    t_0 = time()
+    try:
+        args = [driver, parser, token_file_of_lex_file(lex_file)] + (['-binary'] if binary else [])
+        result = run(args, capture_output=True, timeout=timeout, preexec_fn=preexec_fn)
+    except TimeoutExpired:
+        return ParseOutcome(ParseStatus.TIMEOUT, time() - t_0)
+    d_t = time() - t_0
+    if result.returncode == 0:
+        out_file.write_bytes(result.stdout)
+        return ParseOutcome(ParseStatus.SUCCESS, d_t)
+    if b'Out_of_memory' in result.stderr:
+        return ParseOutcome(ParseStatus.OUT_OF_MEMORY, d_t)
+    return ParseOutcome(ParseStatus.ERROR, d_t)
 
 
 def run_parsers(driver: Path, base_dir: Path, lex_file_dir: Path, ast_file_dir: Path, parsers: List[str],
-                timeout: Optional[int]):
+                timeout: Optional[int], jobs: int = 1, memory_limit: Optional[int] = None, binary: bool = False):
+    """
+    Parses every .lex file with each parser, writing the ASTs to a subdirectory of the AST directory for each parser.
+
+    Up to `jobs` files are parsed at once. A file which times out or runs out of memory is recorded as such and the
+    remaining files are still parsed. Results are reported and recorded in the order of the files (shortest first)
+    regardless of the order in which the parses finish, so the output files do not depend on the number of jobs.
+    """
     print(f"Parsing all .lex files in {lex_file_dir} and outputting ASTs to parser subdirectories in {ast_file_dir}...")
+    if jobs > 1:
+        print(f"Parsing up to {jobs} files at a time...")
     lex_file_tups = get_sorted_files_and_lengths(lex_file_dir, '*.lex')
     max_filename_length = find_longest_filename_length(map(lambda t: t[0], lex_file_tups))
-    for parser in parsers:
-        output_file_path = ast_file_dir / f'{parser}-parse-output.txt'
-        with open(output_file_path, 'w') as output_file:
-            def write(*args, **kwargs):
-                print(*args, flush=True, **kwargs)
-                print(*args, file=output_file, flush=True, **kwargs)
-            out_dir = ast_file_dir / parser
-            out_dir.mkdir(parents=True, exist_ok=True)
-            write(f"Outputting {parser} parses to {out_dir}/*.ast...")
-            write(f"All output will be recorded in {output_file_path}...")
-            err_file = ast_file_dir / f'{parser}-parse-errors.txt'
-            err_file.write_text('')
-            write(f"Names of error-producing files will be recorded in {err_file}...")
-            try:
-                for lex_file, tokens in lex_file_tups:
-                    out_file = out_dir / lex_file.with_suffix('.ast').name
+    with ProcessPoolExecutor(max_workers=jobs) as executor:
+        for parser in parsers:
+            output_file_path = ast_file_dir / f'{parser}-parse-output.txt'
+            with open(output_file_path, 'w') as output_file:
+                def write(*args, **kwargs):
+                    print(*args, flush=True, **kwargs)
+                    print(*args, file=output_file, flush=True, **kwargs)
+                out_dir = ast_file_dir / parser
+                out_dir.mkdir(parents=True, exist_ok=True)
+                write(f"Outputting {parser} parses to {out_dir}/*.ast...")
+                write(f"All output will be recorded in {output_file_path}...")
+                err_file = ast_file_dir / f'{parser}-parse-errors.txt'
+                err_file.write_text('')
+                write(f"Names of error-producing files will be recorded in {err_file}...")
+                timeout_file = ast_file_dir / f'{parser}-parse-timeouts.txt'
+                timeout_file.write_text('')
+                write(f"Names of files which time out or run out of memory will be recorded in {timeout_file}...")
+                files = [(lex_file, out_dir / lex_file.with_suffix('.ast').name) for lex_file, _ in lex_file_tups]
+                outcomes = executor.map(partial(parse_file, driver, parser, timeout, memory_limit, binary), files)
+                for (lex_file, tokens), (_, out_file), outcome in zip(lex_file_tups, files, outcomes):
                     short_file = out_file.relative_to(base_dir)
                     relative_base_length = len(str(short_file.parent))
                     max_short_length = relative_base_length + 1 + max_filename_length + 3
                     write(f"Parsing {lex_file.name:{max_filename_length}} -> {parser} "
                           f"-> {str(short_file) + '...':{max_short_length}} ", end='')
-                    t_0 = time()
-                    result = run([driver, parser, lex_file], capture_output=True, timeout=timeout)
-                    t_1 = time()
-                    d_t = t_1 - t_0
-                    if result.returncode == 0:
-                        out_file.touch()
-                        out_file.write_bytes(result.stdout)
+                    if outcome.status is ParseStatus.SUCCESS:
+                        d_t = outcome.seconds
                         write(f"{GREEN_CHECK} ({tokens} tok | {d_t:.4f} sec | {tokens / d_t:.4f} tok/sec)")
-                    else:
+                    elif outcome.status is ParseStatus.ERROR:
                         with open(err_file, 'a') as ef:
                             ef.write(f"{short_file}\n")
                         write(RED_X)
-            except TimeoutExpired:
-                write(f"timed out.")
-                write(f"Stopping further parsing with {parser} due to expected timeouts in remaining parses.")
-            else:
+                    else:
+                        with open(timeout_file, 'a') as tf:
+                            tf.write(f"{short_file} ({outcome.status.value})\n")
+                        write(f"{RED_X} ({outcome.status.value})")
                 write(f"Parsing with {parser} complete.")
     print(f"Parsing done.")
@@ -0,0 +1,293 @@
+from .common import *
+from .pipeline import ParserServer
+
+from ..tokenize import TokenEnum
+
+from csv import DictWriter
+from dataclasses import dataclass, field
+from pathlib import Path
+from random import Random
+from statistics import median
+from subprocess import TimeoutExpired
+from typing import Callable, Dict, List, Optional, Tuple
+
+
+__all__ = ['Mutant', 'MUTATIONS', 'DEFAULT_FUZZ_ITERATIONS', 'DEFAULT_FUZZ_KEEP', 'DEFAULT_FUZZ_MAX_TOKENS',
+           'DEFAULT_FUZZ_SEED_FILES', 'DEFAULT_FUZZ_TIMEOUT', 'run_perf_fuzz']
+
+
+# Default number of mutants to try.
+DEFAULT_FUZZ_ITERATIONS = 1000
+# Default number of the worst inputs to keep (and to mutate further).
+DEFAULT_FUZZ_KEEP = 20
+# Default maximum number of tokens in a mutant. Larger mutants are discarded.
+DEFAULT_FUZZ_MAX_TOKENS = 2000
+# Default number of (smallest) .lex files to start the search from.
+DEFAULT_FUZZ_SEED_FILES = 20
+# Default number of seconds a single parse may take before the input is considered to have blown up.
+DEFAULT_FUZZ_TIMEOUT = 10.0
+# The parser whose acceptance decides whether a mutant is valid. Menhir is generated directly from the grammar, so it
+# accepts exactly the token streams that the grammar does.
+ORACLE_PARSER = 'menhir'
+# These constants are for titling the columns in the output CSV.
+RANK = 'Rank'
+SCORE = 'Sec/Tok'
+PARSE_TIME = 'Parse'
+ORIGIN = 'Origin'
+MUTATIONS_APPLIED = 'Mutations'
+
+FIELDS = [RANK, FILENAME, TOKENS, SCORE, PARSE_TIME, ORIGIN, MUTATIONS_APPLIED]
+
+NAME = TokenEnum.NAME.name
+NUMBER = TokenEnum.NUMBER.name
+STRING = TokenEnum.STRING.name
+NEWLINE = TokenEnum.NEWLINE.name
+INDENT = TokenEnum.INDENT.name
+DEDENT = TokenEnum.DEDENT.name
+L_PAR = TokenEnum.L_PAR.name
+R_PAR = TokenEnum.R_PAR.name
+ATOMS = {NAME, NUMBER, STRING}
+# Atoms that follow one of these tokens are names in a declaration (e.g., `def f`) rather than expressions.
+NON_EXPRESSION_PREDECESSORS = {TokenEnum.DEF.name, TokenEnum.CLASS.name, TokenEnum.IMPORT.name, TokenEnum.FROM.name,
+                               TokenEnum.AS.name, TokenEnum.DOT.name, TokenEnum.GLOBAL.name, TokenEnum.NONLOCAL.name}
+BINARY_OPERATORS = [TokenEnum.PLUS.name, TokenEnum.DASH.name, TokenEnum.STAR.name, TokenEnum.SLASH.name,
+                    TokenEnum.PER.name, TokenEnum.PIPE.name, TokenEnum.AMPERSAND.name, TokenEnum.CARET.name,
+                    TokenEnum.STAR_STAR.name, TokenEnum.LT_LT.name]
+OPENING_BRACKETS = {TokenEnum.L_PAR.name: TokenEnum.R_PAR.name,
+                    TokenEnum.L_SQR.name: TokenEnum.R_SQR.name,
+                    TokenEnum.L_BRC.name: TokenEnum.R_BRC.name}
+
+TokenStrings = List[str]
+Mutation = Callable[[TokenStrings, Random], Optional[TokenStrings]]
+
+
+@dataclass
+class Mutant:
+    tokens: TokenStrings
+    origin: str
+    mutations: List[str] = field(default_factory=list)
+    # The median number of seconds taken to parse the mutant, or None if it timed out.
+    parse_seconds: Optional[float] = None
+
+    @property
+    def score(self) -> float:
+        if self.parse_seconds is None:
+            return float('inf')
+        return self.parse_seconds / len(self.tokens)
+
+
+def _kind(token_string: str) -> str:
+    return token_string.partition(' ')[0]
+
+
+def _atom_indices(tokens: TokenStrings) -> List[int]:
+    return [i for i, t in enumerate(tokens)
+            if _kind(t) in ATOMS and (i == 0 or _kind(tokens[i - 1]) not in NON_EXPRESSION_PREDECESSORS)]
+
+
+def _mutate_parenthesize(tokens: TokenStrings, rng: Random) -> Optional[TokenStrings]:
+    """Wraps an atom in several layers of parentheses."""
+    atoms = _atom_indices(tokens)
+    if not atoms:
+        return None
+    i = rng.choice(atoms)
+    depth = rng.randint(1, 8)
+    return tokens[:i] + [L_PAR] * depth + [tokens[i]] + [R_PAR] * depth + tokens[i + 1:]
+
+
+def _mutate_binop_chain(tokens: TokenStrings, rng: Random) -> Optional[TokenStrings]:
+    """Extends an atom into a long chain of binary operations."""
+    atoms = _atom_indices(tokens)
+    if not atoms:
+        return None
+    i = rng.choice(atoms)
+    chain: TokenStrings = []
+    for _ in range(rng.randint(2, 16)):
+        chain.extend((rng.choice(BINARY_OPERATORS), tokens[i]))
+    return tokens[:i + 1] + chain + tokens[i + 1:]
+
+
+def _mutate_conditional(tokens: TokenStrings, rng: Random) -> Optional[TokenStrings]:
+    """Replaces an atom with a conditional expression built from it."""
+    atoms = _atom_indices(tokens)
+    if not atoms:
+        return None
+    i = rng.choice(atoms)
+    atom = tokens[i]
+    return tokens[:i] + [atom, TokenEnum.IF.name, atom, TokenEnum.ELSE.name, atom] + tokens[i + 1:]
+
+
+def _mutate_nest_brackets(tokens: TokenStrings, rng: Random) -> Optional[TokenStrings]:
+    """Wraps the contents of an existing pair of brackets in another pair of parentheses."""
+    openings = [i for i, t in enumerate(tokens) if t in OPENING_BRACKETS]
+    if not openings:
+        return None
+    i = rng.choice(openings)
+    depth = 0
+    for j in range(i, len(tokens)):
+        if tokens[j] in OPENING_BRACKETS:
+            depth += 1
+        elif tokens[j] in OPENING_BRACKETS.values():
+            depth -= 1
+            if depth == 0:
+                if j == i + 1:
+                    return None
+                return tokens[:i + 1] + [L_PAR] + tokens[i + 1:j] + [R_PAR] + tokens[j:]
+    return None
+
+
+def _mutate_duplicate_statement(tokens: TokenStrings, rng: Random) -> Optional[TokenStrings]:
+    """Duplicates a logical line which does not begin an indented block."""
+    lines: List[Tuple[int, int]] = []
+    start = 0
+    for i, t in enumerate(tokens):
+        if t in (INDENT, DEDENT):
+            start = i + 1
+        elif t == NEWLINE:
+            if i > start and (i + 1 >= len(tokens) or tokens[i + 1] != INDENT):
+                lines.append((start, i + 1))
+            start = i + 1
+    if not lines:
+        return None
+    start, end = rng.choice(lines)
+    return tokens[:end] + tokens[start:end] + tokens[end:]
+
+
+MUTATIONS: Dict[str, Mutation] = {
+    'parenthesize': _mutate_parenthesize,
+    'binop_chain': _mutate_binop_chain,
+    'conditional': _mutate_conditional,
+    'nest_brackets': _mutate_nest_brackets,
+    'duplicate_statement': _mutate_duplicate_statement,
+}
+
+
+class _Evaluator:
+    """
+    Checks the validity of mutants with the oracle parser and measures their cost with the target parser, restarting
+    the servers as needed after a timeout.
+    """
+    def __init__(self, driver: Path, parser: str, repeats: int, timeout: float):
+        self._driver = driver
+        self._parser = parser
+        self._repeats = repeats
+        self._timeout = timeout
+        self._oracle = ParserServer(driver, ORACLE_PARSER, print_ast=False)
+        self._target = ParserServer(driver, parser, print_ast=False)
+
+    def close(self):
+        self._oracle.close()
+        self._target.close()
+
+    def is_valid(self, tokens: TokenStrings) -> bool:
+        try:
+            return self._oracle.parse(tokens, self._timeout).ok
+        except TimeoutExpired:
+            self._oracle.close()
+            self._oracle = ParserServer(self._driver, ORACLE_PARSER, print_ast=False)
+            return False
+
+    def measure(self, tokens: TokenStrings) -> Tuple[bool, Optional[float]]:
+        """
+        Returns whether the target parser accepted the tokens along with the median time it took, which is None if it
+        timed out.
+        """
+        samples = []
+        for _ in range(self._repeats):
+            try:
+                response = self._target.parse(tokens, self._timeout)
+            except TimeoutExpired:
+                self._target.close()
+                self._target = ParserServer(self._driver, self._parser, print_ast=False)
+                return True, None
+            if not response.ok:
+                return False, None
+            samples.append(response.parse_ns / 1_000_000_000)
+        return True, median(samples)
+
+
+def run_perf_fuzz(driver: Path, lex_file_dir: Path, out_dir: Path, parser: str,
+                  iterations: int = DEFAULT_FUZZ_ITERATIONS, seed: int = 0, keep: int = DEFAULT_FUZZ_KEEP,
+                  max_tokens: int = DEFAULT_FUZZ_MAX_TOKENS, seed_files: int = DEFAULT_FUZZ_SEED_FILES,
+                  repeats: int = 3, timeout: float = DEFAULT_FUZZ_TIMEOUT):
+    """
+    Searches for inputs which maximize the time per token taken by the parser. The search starts from the smallest .lex
+    files and repeatedly applies random mutations to the worst inputs found so far. Mutants are only kept if Menhir (and
+    the target parser) accepts them, so they remain valid according to the grammar. The worst inputs found are saved as
+    .lex files, which can be used as a regression corpus.
+
+    Inputs which cause a parse to time out are given an infinite score, so they are always kept.
+    """
+    rng = Random(seed)
+    lex_file_tups = [t for t in get_sorted_files_and_lengths(lex_file_dir, '*.lex') if t[1] <= max_tokens]
+    if not lex_file_tups:
+        raise RuntimeError(f"No .lex files with at most {max_tokens} tokens found in {lex_file_dir}.")
+    out_dir.mkdir(parents=True, exist_ok=True)
+    print(f"Searching for the inputs with the highest time per token for {parser}...")
+    evaluator = _Evaluator(driver, parser, repeats, timeout)
+    try:
+        population: List[Mutant] = []
+        for lex_file, _ in lex_file_tups[:seed_files]:
+            mutant = Mutant(lex_file.read_text().splitlines(), lex_file.name)
+            accepted, mutant.parse_seconds = evaluator.measure(mutant.tokens)
+            if accepted:
+                population.append(mutant)
+        if not population:
+            raise RuntimeError(f"{parser} did not accept any of the seed inputs.")
+        population.sort(key=lambda m: m.score, reverse=True)
+        population = population[:keep]
+        kept = 0
+        for iteration in range(1, iterations + 1):
+            # Inputs which timed out are not mutated further, since their mutants would most likely time out too.
+            parent = rng.choice([m for m in population if m.parse_seconds is not None] or population)
+            tokens = parent.tokens
+            applied = []
+            for _ in range(rng.randint(1, 3)):
+                name = rng.choice(list(MUTATIONS))
+                mutated = MUTATIONS[name](tokens, rng)
+                if mutated is not None:
+                    tokens = mutated
+                    applied.append(name)
+            if not applied or len(tokens) > max_tokens or not evaluator.is_valid(tokens):
+                continue
+            mutant = Mutant(tokens, parent.origin, parent.mutations + applied)
+            accepted, mutant.parse_seconds = evaluator.measure(tokens)
+            if not accepted:
+                continue
+            if len(population) < keep or mutant.score > population[-1].score:
+                population.append(mutant)
+                population.sort(key=lambda m: m.score, reverse=True)
+                population = population[:keep]
+                kept += 1
+            if iteration % 100 == 0:
+                print(f"[{iteration}/{iterations}] {kept} mutants kept | worst: "
+                      f"{_format_score(population[0])} ({len(population[0].tokens)} tok)", flush=True)
+    finally:
+        evaluator.close()
+    _save_population(population, out_dir, parser)
+
+
+def _format_score(mutant: Mutant) -> str:
+    if mutant.parse_seconds is None:
+        return "timed out"
+    return f"{mutant.score:.3e} sec/tok"
+
+
+def _save_population(population: List[Mutant], out_dir: Path, parser: str):
+    res_file = out_dir / f'{parser}-perf-fuzz.csv'
+    with open(res_file, mode='w', newline='') as res_csv:
+        writer = DictWriter(res_csv, FIELDS)
+        writer.writeheader()
+        for rank, mutant in enumerate(population, start=1):
+            out_file = out_dir / f'{parser}-worst-{rank:03d}.lex'
+            out_file.write_text(''.join(f"{token}\n" for token in mutant.tokens))
+            writer.writerow({
+                RANK: rank,
+                FILENAME: out_file.name,
+                TOKENS: len(mutant.tokens),
+                SCORE: 'inf' if mutant.parse_seconds is None else f'{mutant.score:.12f}',
+                PARSE_TIME: 'timeout' if mutant.parse_seconds is None else f'{mutant.parse_seconds:.6f}',
+                ORIGIN: mutant.origin,
+                MUTATIONS_APPLIED: ' '.join(mutant.mutations),
+            })
+    print(f"Saved the {len(population)} worst inputs for {parser} to {out_dir}; a summary is in {res_file}.")
@@ -0,0 +1,191 @@
+from .common import *
+
+from ..tokenize import *
+
+from csv import DictWriter
+from dataclasses import dataclass
+from parso.grammar import PythonGrammar
+from pathlib import Path
+from select import select
+from statistics import median
+from subprocess import PIPE, Popen, TimeoutExpired
+from time import perf_counter
+from typing import Iterable, List, Optional
+
+
+__all__ = ['ServerResponse', 'ParserServer', 'run_pipeline']
+
+
+LATENCY = 'Latency'
+PARSE_TIME = 'Parse'
+TPS = 'Tok/Sec'
+
+FIELDS = [FILENAME, TOKENS, LATENCY, PARSE_TIME, TPS]
+
+
+@dataclass
+class ServerResponse:
+    ok: bool
+    parse_ns: Optional[int] = None
+    ast: Optional[bytes] = None
+    error: Optional[str] = None
+
+
+class ParserServer:
+    """
+    Manages a long-running `pwz_serve` process for a single parser. Token streams are written to the process over a pipe
+    and the resulting ASTs (or just the time taken, if `print_ast` is false) are read back.
+    """
+    def __init__(self, driver: Path, parser: str, print_ast: bool = True):
+        self.parser = parser
+        self.print_ast = print_ast
+        args = [str(driver), parser]
+        if not print_ast:
+            args.append('-no-ast')
+        self._proc = Popen(args, stdin=PIPE, stdout=PIPE)
+        # Wait for the server to finish starting up, so that its startup cost is not attributed to the first request.
+        ready = self._proc.stdout.readline()
+        if ready != b'READY\n':
+            self.kill()
+            raise RuntimeError(f"Parser server for {parser} failed to start: {ready.decode('utf-8', 'replace').strip()}")
+
+    def __enter__(self) -> 'ParserServer':
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
+
+    def send(self, token_strings: Iterable[str]) -> int:
+        """
+        Streams the tokens to the server as a single request, returning the number of tokens sent. The tokens are written
+        as they are produced, so a token generator can be passed directly.
+        """
+        stdin = self._proc.stdin
+        count = 0
+        for token_string in token_strings:
+            stdin.write(f"{token_string}\n".encode('utf-8'))
+            count += 1
+        stdin.write(b"\n")
+        stdin.flush()
+        return count
+
+    def receive(self, timeout: Optional[float] = None) -> ServerResponse:
+        """
+        Reads the response to the last request. If the response does not begin to arrive within `timeout` seconds, the
+        server is killed and TimeoutExpired is raised.
+        """
+        if timeout is not None:
+            readable, _, _ = select([self._proc.stdout], [], [], timeout)
+            if not readable:
+                self.kill()
+                raise TimeoutExpired(self._proc.args, timeout)
+        status = self._proc.stdout.readline()
+        if not status:
+            raise RuntimeError(f"Parser server for {self.parser} exited unexpectedly with code {self._proc.wait()}.")
+        status = status.decode('utf-8').rstrip('\n')
+        kind, _, rest = status.partition(' ')
+        if kind == 'OK':
+            ast = self._proc.stdout.readline().rstrip(b'\n') if self.print_ast else None
+            return ServerResponse(True, parse_ns=int(rest), ast=ast)
+        elif kind == 'ERROR':
+            return ServerResponse(False, error=rest)
+        else:
+            raise RuntimeError(f"Unexpected response from parser server for {self.parser}: {status}")
+
+    def parse(self, token_strings: Iterable[str], timeout: Optional[float] = None) -> ServerResponse:
+        self.send(token_strings)
+        return self.receive(timeout)
+
+    def close(self):
+        """
+        Asks the server to exit by closing its input, and waits for it to do so.
+        """
+        if self._proc.poll() is None:
+            self._proc.stdin.close()
+            self._proc.wait()
+        self._close_pipes()
+
+    def kill(self):
+        """
+        Kills the server without waiting for it to finish its current request.
+        """
+        if self._proc.poll() is None:
+            self._proc.kill()
+            self._proc.wait()
+        self._close_pipes()
+
+    def _close_pipes(self):
+        # A server is replaced after each timeout, so its pipes are closed here rather than left to the garbage
+        # collector to keep long runs from leaking file descriptors.
+        for pipe in (self._proc.stdin, self._proc.stdout):
+            try:
+                pipe.close()
+            except BrokenPipeError:
+                pass
+
+
+def run_pipeline(driver: Path, base_dir: Path, py_file_dir: Path, out_dir: Path, parsers: List[str],
+                 grammar: PythonGrammar, save_asts: bool = False):
+    print(f"Streaming all .py files in {py_file_dir} through the lexer and parser servers...")
+    py_file_tups = get_sorted_files_and_lengths(py_file_dir, '*.py')
+    max_filename_length = find_longest_filename_length(map(lambda t: t[0], py_file_tups))
+    out_dir.mkdir(parents=True, exist_ok=True)
+    for parser in parsers:
+        res_file = out_dir / f'{parser}-pipeline-results.csv'
+        err_file = out_dir / f'{parser}-pipeline-errors.txt'
+        ast_dir = out_dir / parser
+        if save_asts:
+            ast_dir.mkdir(parents=True, exist_ok=True)
+        err_file.write_text('')
+        print(f"Saving {parser} pipeline results for each input to {res_file}...")
+        print(f"Names of error-producing files will be recorded in {err_file}...")
+        total_tokens = 0
+        total_seconds = 0.0
+        latencies: List[float] = []
+        with open(res_file, mode='w', newline='') as res_csv, ParserServer(driver, parser) as server:
+            res_writer = DictWriter(res_csv, FIELDS)
+            res_writer.writeheader()
+            for py_file, _ in py_file_tups:
+                short_file = py_file.relative_to(base_dir)
+                print(f"Streaming {py_file.name:{max_filename_length}} -> {parser} ", end='', flush=True)
+                # The latency covers the whole path: tokenizing the source, sending the tokens, parsing them, and reading
+                # the resulting AST back.
+                t_0 = perf_counter()
+                try:
+                    tokens = server.send(map(str, tokenize_file(py_file, grammar)))
+                except RuntimeError as e:
+                    # Tokenization failed partway through, so terminate the request and discard its response.
+                    server.send([])
+                    server.receive()
+                    with open(err_file, 'a') as ef:
+                        ef.write(f"{short_file} -> {e}\n")
+                    print(RED_X)
+                    continue
+                response = server.receive()
+                d_t = perf_counter() - t_0
+                if not response.ok:
+                    with open(err_file, 'a') as ef:
+                        ef.write(f"{short_file} -> {response.error}\n")
+                    print(RED_X)
+                    continue
+                if save_asts:
+                    (ast_dir / py_file.with_suffix('.py.lex.ast').name).write_bytes(response.ast + b'\n')
+                parse_seconds = response.parse_ns / 1_000_000_000
+                total_tokens += tokens
+                total_seconds += d_t
+                latencies.append(d_t)
+                res_writer.writerow({
+                    FILENAME: short_file,
+                    TOKENS: tokens,
+                    LATENCY: f'{d_t:.6f}',
+                    PARSE_TIME: f'{parse_seconds:.6f}',
+                    TPS: f'{tokens / d_t:.1f}',
+                })
+                print(f"{GREEN_CHECK} ({tokens} tok | {d_t:.4f} sec total | {parse_seconds:.4f} sec parsing | "
+                      f"{tokens / d_t:.1f} tok/sec)")
+        if latencies:
+            print(f"Pipeline with {parser} complete: {total_tokens} tokens in {total_seconds:.4f} sec "
+                  f"({total_tokens / total_seconds:.1f} tok/sec overall | median latency {median(latencies):.4f} sec).")
+        else:
+            print(f"Pipeline with {parser} complete, but no inputs were parsed successfully.")
+    print(f"Pipeline done.")
@@ -0,0 +1,273 @@
+from .common import *
+
+from csv import DictReader
+from dataclasses import dataclass, field
+from datetime import datetime, timedelta
+from enum import Enum, unique
+from json import dump as dump_json
+from math import exp, log as ln
+from os import replace as replace_file
+from pathlib import Path
+from time import time
+from typing import Dict, List, Optional, Set, Tuple
+
+
+__all__ = ['AttemptOutcome', 'BenchmarkProgress', 'DEFAULT_STATUS_FILENAME', 'DEFAULT_REPORT_INTERVAL']
+
+
+# Default name of the machine-readable status file, placed in the benchmark output directory.
+DEFAULT_STATUS_FILENAME = 'bench-status.json'
+# Minimum number of seconds between progress summaries printed to the console.
+DEFAULT_REPORT_INTERVAL = 60.0
+
+PENDING = 'pending'
+RUNNING = 'running'
+DONE = 'done'
+
+
+@unique
+class AttemptOutcome(Enum):
+    COMPLETE = 'complete'       # The benchmark produced results.
+    INCOMPLETE = 'incomplete'   # The quota was insufficient or the attempt timed out; it will be requeued.
+    ERROR = 'error'             # The benchmark failed outright.
+    ABANDONED = 'abandoned'     # The quota grew beyond the maximum allowed.
+
+
+@dataclass
+class CostModel:
+    """
+    A per-parser model of the wall-clock cost of benchmarking a single input, fitted on the executions that have already
+    completed. Both the seconds spent and the number of attempts made are fitted against the number of tokens in the
+    input. Seconds are fitted as a power law (i.e., a line in log-log space), since the parsers' costs grow polynomially
+    in the input size. Attempts are fitted linearly against the logarithm of the input size, because the quota grows
+    geometrically with each retry.
+    """
+    samples: List[Tuple[int, float, int]] = field(default_factory=list)
+    # The fitted (intercept, slope) pairs are cached until the next sample is added.
+    _seconds_fit: Optional[Tuple[float, float]] = field(default=None, init=False, repr=False)
+    _attempts_fit: Optional[Tuple[float, float]] = field(default=None, init=False, repr=False)
+
+    def add_sample(self, tokens: int, seconds: float, attempts: int):
+        self.samples.append((max(tokens, 1), max(seconds, 1e-3), max(attempts, 1)))
+        self._seconds_fit = None
+        self._attempts_fit = None
+
+    def __bool__(self) -> bool:
+        return bool(self.samples)
+
+    def predict_seconds(self, tokens: int) -> float:
+        if self._seconds_fit is None:
+            self._seconds_fit = _fit_line([ln(t) for t, _, _ in self.samples], [ln(s) for _, s, _ in self.samples])
+        intercept, slope = self._seconds_fit
+        return exp(intercept + slope * ln(max(tokens, 1)))
+
+    def predict_attempts(self, tokens: int) -> float:
+        if self._attempts_fit is None:
+            self._attempts_fit = _fit_line([ln(t) for t, _, _ in self.samples], [float(a) for _, _, a in self.samples])
+        intercept, slope = self._attempts_fit
+        return max(1.0, intercept + slope * ln(max(tokens, 1)))
+
+
+def _fit_line(xs: List[float], ys: List[float]) -> Tuple[float, float]:
+    """
+    Computes an ordinary least-squares fit of the points, returning the pair (intercept, slope). When there are too few
+    distinct x values to determine a slope, the mean of the y values is used as a constant fit instead.
+    """
+    n = len(xs)
+    mean_x = sum(xs) / n
+    mean_y = sum(ys) / n
+    var_x = sum((x - mean_x) ** 2 for x in xs)
+    if var_x == 0:
+        return mean_y, 0.0
+    cov_xy = sum((x - mean_x) * (y - mean_y) for x, y in zip(xs, ys))
+    slope = cov_xy / var_x
+    return mean_y - slope * mean_x, slope
+
+
+@dataclass
+class ParserProgress:
+    name: str
+    total: int
+    state: str = PENDING
+    finished: Set[Path] = field(default_factory=set)
+    completed: int = 0
+    errors: int = 0
+    abandoned: int = 0
+    attempts: int = 0
+    retries: int = 0
+    seconds: float = 0.0
+    model: CostModel = field(default_factory=CostModel)
+    # Attempts and seconds spent on each input that has not yet finished.
+    pending_attempts: Dict[Path, int] = field(default_factory=dict)
+    pending_seconds: Dict[Path, float] = field(default_factory=dict)
+
+
+class BenchmarkProgress:
+    """
+    Tracks the progress of a benchmarking run across all of the parsers, estimating the remaining time from cost models
+    fitted on the executions completed so far. A summary is periodically printed, and a JSON status file is rewritten
+    after every attempt so that an external watcher can poll it.
+    """
+    def __init__(self, parsers: List[str], lex_file_lengths: Dict[Path, int], status_file: Optional[Path],
+                 report_interval: float = DEFAULT_REPORT_INTERVAL):
+        self._lex_file_lengths = lex_file_lengths
+        self._status_file = status_file
+        self._report_interval = report_interval
+        self._started = time()
+        self._last_report = self._started
+        self._current: Optional[str] = None
+        self._parsers: Dict[str, ParserProgress] = {parser: ParserProgress(parser, len(lex_file_lengths))
+                                                    for parser in parsers}
+
+    def load_previous_results(self, parser: str, res_file: Path, lex_file_dir: Path):
+        """
+        Seeds the progress of a resumed run from the results already recorded. The wall-clock time of those executions
+        was not recorded, so their quota is used as a (lower-bound) estimate of the time they took.
+        """
+        progress = self._parsers[parser]
+        with open(res_file, mode='r', newline='') as res_csv:
+            for row in DictReader(res_csv):
+                lex_file = lex_file_dir / Path(row[FILENAME]).with_suffix('.lex').name
+                if lex_file in progress.finished or lex_file not in self._lex_file_lengths:
+                    continue
+                progress.finished.add(lex_file)
+                if row[TPR]:
+                    progress.completed += 1
+                    progress.model.add_sample(self._lex_file_lengths[lex_file], float(row[QUOTA]), 1)
+                else:
+                    progress.abandoned += 1
+
+    def start_parser(self, parser: str):
+        self._current = parser
+        self._parsers[parser].state = RUNNING
+        self.write_status()
+
+    def finish_parser(self, parser: str):
+        self._parsers[parser].state = DONE
+        self._current = None
+        self.write_status()
+        print(self.summary(parser), flush=True)
+
+    def record_attempt(self, parser: str, lex_file: Path, seconds: float, outcome: AttemptOutcome):
+        progress = self._parsers[parser]
+        progress.attempts += 1
+        progress.seconds += seconds
+        attempts = progress.pending_attempts.pop(lex_file, 0) + 1
+        spent = progress.pending_seconds.pop(lex_file, 0.0) + seconds
+        if outcome is AttemptOutcome.INCOMPLETE:
+            progress.retries += 1
+            progress.pending_attempts[lex_file] = attempts
+            progress.pending_seconds[lex_file] = spent
+        else:
+            progress.finished.add(lex_file)
+            if outcome is AttemptOutcome.COMPLETE:
+                progress.completed += 1
+                progress.model.add_sample(self._lex_file_lengths[lex_file], spent, attempts)
+            elif outcome is AttemptOutcome.ERROR:
+                progress.errors += 1
+            elif outcome is AttemptOutcome.ABANDONED:
+                progress.abandoned += 1
+            else:
+                raise ValueError(f"Unknown outcome of benchmark attempt: {outcome}.")
+        self.write_status()
+        now = time()
+        if now - self._last_report >= self._report_interval:
+            self._last_report = now
+            print(self.summary(parser), flush=True)
+
+    def _model_for(self, parser: str) -> Optional[CostModel]:
+        """
+        Finds the cost model to use for a parser. Parsers which have not completed any executions yet borrow the model of
+        the most recently run parser, which is better than no estimate at all.
+        """
+        model = self._parsers[parser].model
+        if model:
+            return model
+        fallbacks = [p.model for p in self._parsers.values() if p.model]
+        return fallbacks[-1] if fallbacks else None
+
+    def estimate(self, parser: str) -> Tuple[Optional[float], Optional[float]]:
+        """
+        Estimates the remaining seconds and the expected number of further retries for a parser. Either value is None if
+        there is not yet any data to estimate from.
+        """
+        progress = self._parsers[parser]
+        remaining = [lex_file for lex_file in self._lex_file_lengths if lex_file not in progress.finished]
+        if not remaining:
+            return 0.0, 0.0
+        model = self._model_for(parser)
+        if model is None:
+            return None, None
+        seconds = 0.0
+        retries = 0.0
+        for lex_file in remaining:
+            tokens = self._lex_file_lengths[lex_file]
+            # Inputs which have already been attempted have spent part of their expected cost.
+            seconds += max(0.0, model.predict_seconds(tokens) - progress.pending_seconds.get(lex_file, 0.0))
+            retries += max(0.0, model.predict_attempts(tokens) - 1 - progress.pending_attempts.get(lex_file, 0))
+        return seconds, retries
+
+    def status(self) -> Dict:
+        now = time()
+        parsers = {}
+        total_eta: Optional[float] = 0.0
+        for name, progress in self._parsers.items():
+            eta, expected_retries = self.estimate(name)
+            if eta is None or total_eta is None:
+                total_eta = None
+            else:
+                total_eta += eta
+            parsers[name] = {
+                'state': progress.state,
+                'total': progress.total,
+                'finished': len(progress.finished),
+                'completed': progress.completed,
+                'errors': progress.errors,
+                'abandoned': progress.abandoned,
+                'remaining': progress.total - len(progress.finished),
+                'attempts': progress.attempts,
+                'retries': progress.retries,
+                'expected_retries': None if expected_retries is None else round(expected_retries, 1),
+                'elapsed_seconds': round(progress.seconds, 3),
+                'eta_seconds': None if eta is None else round(eta, 1),
+            }
+        return {
+            'started': datetime.fromtimestamp(self._started).isoformat(timespec='seconds'),
+            'updated': datetime.fromtimestamp(now).isoformat(timespec='seconds'),
+            'elapsed_seconds': round(now - self._started, 1),
+            'current_parser': self._current,
+            'eta_seconds': None if total_eta is None else round(total_eta, 1),
+            'estimated_finish': (None if total_eta is None
+                                 else datetime.fromtimestamp(now + total_eta).isoformat(timespec='seconds')),
+            'parsers': parsers,
+        }
+
+    def write_status(self):
+        if self._status_file is None:
+            return
+        # Write to a temporary file and then move it into place so a watcher never reads a partially written file.
+        temp_file = self._status_file.with_name(self._status_file.name + '.tmp')
+        with open(temp_file, 'w') as f:
+            dump_json(self.status(), f, indent=2)
+        replace_file(temp_file, self._status_file)
+
+    def summary(self, parser: str) -> str:
+        progress = self._parsers[parser]
+        eta, expected_retries = self.estimate(parser)
+        total_eta = self.status()['eta_seconds']
+        return (f"[{parser}: {len(progress.finished)}/{progress.total} done, "
+                f"{progress.total - len(progress.finished)} remaining | "
+                f"retries: {progress.retries} so far, ~{_format_count(expected_retries)} expected | "
+                f"ETA: {_format_duration(eta)} | all parsers: {_format_duration(total_eta)}]")
+
+
+def _format_duration(seconds: Optional[float]) -> str:
+    if seconds is None:
+        return 'unknown'
+    return str(timedelta(seconds=round(seconds)))
+
+
+def _format_count(count: Optional[float]) -> str:
+    if count is None:
+        return '?'
+    return f'{count:.0f}'
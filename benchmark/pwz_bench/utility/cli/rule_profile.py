@@ -0,0 +1,113 @@
+from .common import *
+
+from ..parse import original_rule_name
+
+from csv import DictWriter
+from pathlib import Path
+from subprocess import run
+from tempfile import TemporaryDirectory
+from typing import Dict, List, Set
+
+import re
+
+
+__all__ = ['LABELLED_PARSERS', 'count_label_work', 'rule_of_label', 'profile_rules']
+
+
+# The parsers whose sequences carry the label of the production they were generated from. The optimized derivative
+# parsers discard the labels when their grammars are built, so their work cannot be attributed to rules.
+LABELLED_PARSERS = ['pwz_nary', 'pwz_nary_list', 'pwz_nary_look', 'pwz_binary', 'pwd_binary', 'pwd_nary']
+# The number of most expensive rules to list when a profile is made.
+TOP_RULES = 20
+# These constants are for titling the columns in the output CSV.
+RULE = 'Rule'
+DERIVE = 'Derive'
+REBUILD = 'Rebuild'
+TOTAL = 'Total'
+SHARE = 'Share'
+PRODUCTIONS = 'Productions'
+
+# The binary parsers split each production of more than two components into a chain of labelled sequences.
+_BINARY_LABEL_PREFIX = re.compile(r'^BINRED-\d+-')
+# Every production but the first of a rule has its number appended to the name of the rule.
+_PRODUCTION_NUMBER_SUFFIX = re.compile(r'-\d+$')
+
+
+def count_label_work(driver: Path, lex_file: Path, parser: str) -> Dict[str, List[int]]:
+    """
+    Runs the parsing executable in label counting mode, returning the number of derive and rebuild steps taken for
+    each production label while parsing the .lex file.
+    """
+    with TemporaryDirectory() as temp_dir:
+        labels_file = Path(temp_dir) / 'labels.txt'
+        result = run([driver, parser, lex_file, '-labels', labels_file], capture_output=True)
+        if result.returncode != 0:
+            raise RuntimeError(f"Counting the work of parsing {lex_file} with {parser} failed: "
+                               f"{result.stderr.decode(errors='replace').strip()}")
+        counts: Dict[str, List[int]] = {}
+        with open(labels_file) as f:
+            for entry in f:
+                label, derives, rebuilds = entry.split()
+                counts[label] = [int(derives), int(rebuilds)]
+        return counts
+
+
+def rule_of_label(label: str) -> str:
+    """
+    Finds the rule of the original grammar that a production label was generated from, undoing the naming of both the
+    parser generators and the grammar transformation.
+    """
+    label = _BINARY_LABEL_PREFIX.sub('', label)
+    label = _PRODUCTION_NUMBER_SUFFIX.sub('', label)
+    return original_rule_name(label)
+
+
+def profile_rules(driver: Path, lex_files: List[Path], parser: str, out_file: Path):
+    """
+    Counts the work done by a parser for each production label over the .lex files, and aggregates the counts up to
+    the rules of the original grammar. The rules are written to the output CSV from most to least work.
+    """
+    if parser not in LABELLED_PARSERS:
+        raise RuntimeError(f"The {parser} parser does not keep production labels, so its work cannot be profiled.")
+    print(f"Profiling the work of {parser} by grammar rule over {len(lex_files)} files...")
+    rule_counts: Dict[str, List[int]] = {}
+    rule_labels: Dict[str, Set[str]] = {}
+    max_filename_length = find_longest_filename_length(lex_files)
+    for lex_file in lex_files:
+        print(f"  {lex_file.name:{max_filename_length}} ", end='', flush=True)
+        try:
+            label_counts = count_label_work(driver, lex_file, parser)
+        except RuntimeError as e:
+            print(f"{RED_X} {e}")
+            continue
+        for label, (derives, rebuilds) in label_counts.items():
+            # Labels in angle brackets belong to the parser's own scaffolding rather than to the grammar.
+            if label.startswith('<'):
+                continue
+            rule = rule_of_label(label)
+            counts = rule_counts.setdefault(rule, [0, 0])
+            counts[0] += derives
+            counts[1] += rebuilds
+            rule_labels.setdefault(rule, set()).add(label)
+        print(GREEN_CHECK)
+    total = sum(sum(counts) for counts in rule_counts.values())
+    ranked = sorted(rule_counts.items(), key=lambda item: sum(item[1]), reverse=True)
+    out_file.parent.mkdir(parents=True, exist_ok=True)
+    with open(out_file, mode='w', newline='') as out_csv:
+        out_writer = DictWriter(out_csv, [RULE, DERIVE, REBUILD, TOTAL, SHARE, PRODUCTIONS])
+        out_writer.writeheader()
+        for rule, (derives, rebuilds) in ranked:
+            out_writer.writerow({
+                RULE: rule,
+                DERIVE: derives,
+                REBUILD: rebuilds,
+                TOTAL: derives + rebuilds,
+                SHARE: f'{(derives + rebuilds) / total if total else 0.0:.6f}',
+                PRODUCTIONS: len(rule_labels[rule]),
+            })
+    print(f"The rules {parser} spends the most work in are:")
+    max_rule_length = max((len(rule) for rule, _ in ranked[:TOP_RULES]), default=0)
+    for rule, counts in ranked[:TOP_RULES]:
+        share = 100 * sum(counts) / total if total else 0.0
+        print(f"  {rule:{max_rule_length}}  {share:>6.2f}%  ({counts[0]} derive, {counts[1]} rebuild)")
+    print(f"{GREEN_CHECK} Rule profile written to {out_file}.")
@@ -0,0 +1,97 @@
+from .common import *
+
+from dataclasses import dataclass
+from pathlib import Path
+from subprocess import DEVNULL, PIPE, run
+from tempfile import TemporaryDirectory
+from time import perf_counter
+from typing import List, Optional, Set
+
+import re
+import sys
+
+
+__all__ = ['DEFAULT_STARTUP_CHECK_RUNS', 'DEFAULT_MAX_STARTUP_SECONDS', 'check_startup_time']
+
+
+# Default number of times each command is run, of which the fastest is kept.
+DEFAULT_STARTUP_CHECK_RUNS = 5
+# Default number of seconds within which each command must finish.
+DEFAULT_MAX_STARTUP_SECONDS = 0.3
+
+# Matches a line of the report written by `python -X importtime`, capturing the name of the module imported.
+IMPORT_TIME_RE = re.compile(r'^import time:\s+\d+ \|\s+\d+ \| *(\S+)$', re.MULTILINE)
+
+
+@dataclass
+class StartupCase:
+    args: List[str]
+    # Whether the command tokenizes anything. Those which do not must not import parso.
+    uses_parso: bool
+
+
+# The commands are run in a directory holding only an empty file, empty.py.
+STARTUP_CASES = [
+    StartupCase(['--help'], False),
+    StartupCase(['collate', '--help'], False),
+    StartupCase(['calculate', '--help'], False),
+    StartupCase(['lex', 'empty.py'], True),
+]
+
+
+def _run_command(script: Path, args: List[str], work_dir: Path, python_options: Optional[List[str]] = None) -> str:
+    result = run([sys.executable, *(python_options or []), str(script), *args], cwd=work_dir, stdout=DEVNULL,
+                 stderr=PIPE, universal_newlines=True)
+    if result.returncode != 0:
+        raise RuntimeError(f"Command `{' '.join(args)}` failed with exit code {result.returncode}:\n{result.stderr}")
+    return result.stderr
+
+
+def _imported_packages(script: Path, args: List[str], work_dir: Path) -> Set[str]:
+    report = _run_command(script, args, work_dir, ['-X', 'importtime'])
+    return {m.group(1).split('.')[0] for m in IMPORT_TIME_RE.finditer(report)}
+
+
+def _startup_seconds(script: Path, args: List[str], work_dir: Path, runs: int) -> float:
+    best_seconds = None
+    for _ in range(runs):
+        t_0 = perf_counter()
+        _run_command(script, args, work_dir)
+        d_t = perf_counter() - t_0
+        best_seconds = d_t if best_seconds is None else min(best_seconds, d_t)
+    return best_seconds or 0.0
+
+
+def check_startup_time(script: Path, runs: int = DEFAULT_STARTUP_CHECK_RUNS,
+                       max_seconds: float = DEFAULT_MAX_STARTUP_SECONDS) -> bool:
+    """
+    Measures how long a few quick commands of the script take to run from start to finish, each in a new interpreter,
+    keeping the fastest of `runs` runs of each. The commands mostly measure the time taken to start up: importing what
+    each command needs and, for `lex`, loading the grammar. Checks that each command finishes within `max_seconds` and
+    that those which do not tokenize anything do not import parso. Returns whether every command passed.
+    """
+    print(f"Measuring the startup time of {script.name}, keeping the fastest of {runs} runs...")
+    failures = 0
+    max_label_length = max(len(' '.join(case.args)) for case in STARTUP_CASES)
+    with TemporaryDirectory() as temp_dir:
+        work_dir = Path(temp_dir)
+        (work_dir / 'empty.py').touch()
+        for case in STARTUP_CASES:
+            label = ' '.join(case.args)
+            print(f"  {label:{max_label_length}} ", end='', flush=True)
+            seconds = _startup_seconds(script, case.args, work_dir, runs)
+            problems = []
+            if seconds > max_seconds:
+                problems.append(f"more than {max_seconds:.3f} sec")
+            if not case.uses_parso and 'parso' in _imported_packages(script, case.args, work_dir):
+                problems.append("imports parso")
+            if problems:
+                failures += 1
+                print(f"{RED_X} {seconds:.3f} sec; {', '.join(problems)}")
+            else:
+                print(f"{GREEN_CHECK} {seconds:.3f} sec")
+    if failures:
+        print(f"{RED_X} {failures} of {len(STARTUP_CASES)} commands failed the check.")
+    else:
+        print(f"{GREEN_CHECK} Every command started within {max_seconds:.3f} sec.")
+    return failures == 0
@@ -0,0 +1,226 @@
+from .benchmark import run_benchmarks
+from .collate_benchmark_results import collate_benchmarking_results
+from .common import *
+
+from ..tokenize import ParameterizedToken, TokenEnum
+
+from csv import DictReader, DictWriter
+from dataclasses import dataclass
+from math import isnan as is_nan, log as ln
+from pathlib import Path
+from random import Random
+from typing import Callable, Dict, List, Optional, Tuple
+
+
+__all__ = ['StressGrammar', 'STRESS_GRAMMARS', 'STRESS_GRAMMAR_DIR', 'DEFAULT_STRESS_SIZES', 'write_stress_inputs',
+           'run_stress']
+
+
+# The directory containing the stress grammars shipped with the benchmark.
+STRESS_GRAMMAR_DIR = Path(__file__).parent.parent / 'stress-grammars'
+# The default input sizes (in tokens), doubling from 8 to 1024. The worst cases of some of the grammars are exponential
+# in the size of the input for some parsers, so these are kept much smaller than the real inputs.
+DEFAULT_STRESS_SIZES = [2 ** i for i in range(3, 11)]
+# The name of the file summarizing the growth of each parser on each grammar, placed in the stress directory.
+STRESS_RESULTS_FILENAME = 'stress-results.csv'
+# These constants are for titling the columns in the output CSV.
+GRAMMAR = 'Grammar'
+PARSER = 'Parser'
+EXPONENT = 'Exponent'
+LARGEST = 'Largest'
+INPUTS = 'Inputs'
+
+A = 'A'
+B = 'B'
+L_PAR = TokenEnum.L_PAR.name
+R_PAR = TokenEnum.R_PAR.name
+ENDMARKER = TokenEnum.ENDMARKER.name
+MAX_EXPRESSION_DEPTH = 32
+
+# A function which produces the lines of a .lex file of roughly the given number of tokens, excluding the ENDMARKER.
+InputFunction = Callable[[int, Random], List[str]]
+# A function which generates the code for all parsers in a directory from a grammar file and its start symbol.
+GenerateFunction = Callable[[Path, Path, str], None]
+
+
+@dataclass
+class StressGrammar:
+    filename: str
+    start_symbol: str
+    make_input: InputFunction
+
+    @property
+    def path(self) -> Path:
+        return STRESS_GRAMMAR_DIR / self.filename
+
+
+def _repeat_a(size: int, _rng: Random) -> List[str]:
+    return [A] * size
+
+
+def _nested(size: int, _rng: Random) -> List[str]:
+    depth = max(0, (size - 1) // 2)
+    return [L_PAR] * depth + [A] + [R_PAR] * depth
+
+
+def _epsilon_chain(size: int, rng: Random) -> List[str]:
+    tokens = [A]
+    while len(tokens) < size:
+        # The chain of nullable rules between each pair of tokens only sometimes produces a token of its own.
+        if rng.random() < 0.5 and len(tokens) + 2 <= size:
+            tokens.append(B)
+        tokens.append(A)
+    return tokens
+
+
+def _make_expression(operators: List[TokenEnum]) -> InputFunction:
+    operator_names = [operator.name for operator in operators]
+
+    def make_expression(size: int, rng: Random) -> List[str]:
+        tokens: List[str] = []
+        depth = 0
+        while True:
+            # Open some parentheses, leaving room to close them all and finish the expression.
+            while depth < MAX_EXPRESSION_DEPTH and len(tokens) + 2 * depth + 4 <= size and rng.random() < 0.25:
+                tokens.append(L_PAR)
+                depth += 1
+            tokens.append(str(ParameterizedToken(TokenEnum.NUMBER, str(rng.randrange(100)))))
+            while depth > 0 and rng.random() < 0.25:
+                tokens.append(R_PAR)
+                depth -= 1
+            if len(tokens) + depth + 2 > size:
+                break
+            tokens.append(rng.choice(operator_names))
+        tokens.extend([R_PAR] * depth)
+        return tokens
+
+    return make_expression
+
+
+STRESS_GRAMMARS: Dict[str, StressGrammar] = {
+    'ambiguous': StressGrammar('ambiguous.grammar', 'start', _repeat_a),
+    'left-recursion': StressGrammar('left-recursion.grammar', 'start', _repeat_a),
+    'right-recursion': StressGrammar('right-recursion.grammar', 'start', _repeat_a),
+    'nested': StressGrammar('nested.grammar', 'start', _nested),
+    'epsilon-chain': StressGrammar('epsilon-chain.grammar', 'start', _epsilon_chain),
+    'expression': StressGrammar('expression.grammar', 'start',
+                                _make_expression([TokenEnum.PLUS, TokenEnum.DASH, TokenEnum.STAR, TokenEnum.SLASH])),
+    'ambiguous-expression': StressGrammar('ambiguous-expression.grammar', 'start',
+                                          _make_expression([TokenEnum.PLUS, TokenEnum.STAR])),
+}
+
+
+def write_stress_inputs(name: str, grammar: StressGrammar, lex_file_dir: Path, sizes: List[int], seed: int = 0):
+    """
+    Writes one .lex file of each size for the stress grammar. The inputs are the same for a given seed.
+    """
+    lex_file_dir.mkdir(parents=True, exist_ok=True)
+    width = len(str(max(sizes)))
+    for size in sizes:
+        tokens = grammar.make_input(size, Random(f'{seed}:{size}'))
+        with open(lex_file_dir / f'{name}-{size:0{width}}.lex', 'w') as f:
+            for token in tokens:
+                f.write(f"{token}\n")
+            f.write(f"{ENDMARKER}\n")
+
+
+def run_stress(generate: GenerateFunction, base_dir: Path, stress_dir: Path, parsers: List[str], names: List[str],
+               sizes: List[int], seed: int = 0, quota_factor: int = 3, max_quota: Optional[int] = None):
+    """
+    Benchmarks each parser on each of the named stress grammars. For each grammar, the parsers are generated and built
+    in their own subdirectory of the stress directory, inputs of each size are generated, and then the inputs are
+    benchmarked. Work which has already been done is not repeated, so an interrupted run can be resumed by running it
+    again.
+
+    The results are summarized by the empirical growth exponent of each parser on each grammar: the slope of the
+    logarithm of the time per parse against the logarithm of the number of tokens. A parser whose time is linear in the
+    size of the input has an exponent of 1, a quadratic one has an exponent of 2, and so on. Since small inputs are
+    dominated by constant overheads, only the larger half of the inputs a parser completed are used in the fit.
+    """
+    for name in names:
+        if name not in STRESS_GRAMMARS:
+            raise RuntimeError(f"Unknown stress grammar: {name}.")
+    print(f"Running {len(parsers)} parsers over {len(names)} stress grammars in {stress_dir}...")
+    collated_files: Dict[str, Path] = {}
+    for name in names:
+        grammar = STRESS_GRAMMARS[name]
+        grammar_dir = stress_dir / name
+        gen_dir = grammar_dir / 'gen'
+        lex_file_dir = grammar_dir / 'lexes'
+        bench_dir = grammar_dir / 'bench'
+        driver = gen_dir / 'pwz_bench'
+        print(f"Grammar {name}:")
+        if not driver.is_file():
+            print(f"Generating and building parsers for {grammar.path} in {gen_dir}...")
+            gen_dir.mkdir(parents=True, exist_ok=True)
+            try:
+                generate(gen_dir, grammar.path, grammar.start_symbol)
+            except Exception as e:
+                # A grammar which cannot be generated is skipped, so that the rest of the grammars are still run.
+                print(f"{RED_X} Generation failed for grammar {name}: {e.__class__.__name__}: {e}")
+                continue
+            if not build_generated_parsers(gen_dir, grammar_dir / 'build-log.txt'):
+                continue
+            print(f"{GREEN_CHECK} Built parsers for grammar {name}.")
+        write_stress_inputs(name, grammar, lex_file_dir, sizes, seed)
+        bench_dir.mkdir(parents=True, exist_ok=True)
+        run_benchmarks(driver, base_dir, lex_file_dir, bench_dir, parsers, should_resume=True,
+                       quota_factor=quota_factor, max_quota=max_quota)
+        collated_file = grammar_dir / 'collated-results.csv'
+        collate_benchmarking_results(bench_dir, parsers, overwrite=True, out_file=collated_file)
+        collated_files[name] = collated_file
+    _write_summary(collated_files, parsers, stress_dir / STRESS_RESULTS_FILENAME)
+
+
+def _read_times(collated_file: Path, parsers: List[str]) -> Dict[str, List[Tuple[int, float]]]:
+    times: Dict[str, List[Tuple[int, float]]] = {parser: [] for parser in parsers}
+    with open(collated_file, mode='r', newline='') as res_csv:
+        for row in DictReader(res_csv):
+            tokens = int(row[TOKENS])
+            for parser in parsers:
+                spt = float(row.get(f'{parser} {SPT}') or 'nan')
+                if not is_nan(spt):
+                    times[parser].append((tokens, spt * tokens))
+    return times
+
+
+def _growth_exponent(points: List[Tuple[int, float]]) -> Optional[float]:
+    """
+    Computes the least-squares slope of log(time) against log(size) over the larger half of the (size, time) points.
+    Returns None if there are not enough distinct sizes to fit a line.
+    """
+    points = sorted(points)
+    points = points[len(points) // 2:] if len(points) >= 4 else points
+    xs = [ln(size) for size, _ in points]
+    ys = [ln(time) for _, time in points]
+    if len(set(xs)) < 2:
+        return None
+    mean_x = sum(xs) / len(xs)
+    mean_y = sum(ys) / len(ys)
+    cov_xy = sum((x - mean_x) * (y - mean_y) for x, y in zip(xs, ys))
+    var_x = sum((x - mean_x) ** 2 for x in xs)
+    return cov_xy / var_x
+
+
+def _write_summary(collated_files: Dict[str, Path], parsers: List[str], out_file: Path):
+    with open(out_file, mode='w', newline='') as out_csv:
+        out_writer = DictWriter(out_csv, [GRAMMAR, PARSER, EXPONENT, LARGEST, INPUTS])
+        out_writer.writeheader()
+        max_name_length = max((len(name) for name in collated_files), default=0)
+        print(f"{'':{max_name_length}} " + ' '.join(f'{parser:>14}' for parser in parsers))
+        for name, collated_file in collated_files.items():
+            times = _read_times(collated_file, parsers)
+            cells = []
+            for parser in parsers:
+                exponent = _growth_exponent(times[parser])
+                row = {
+                    GRAMMAR: name,
+                    PARSER: parser,
+                    EXPONENT: 'nan' if exponent is None else f'{exponent:.2f}',
+                    LARGEST: max((size for size, _ in times[parser]), default=0),
+                    INPUTS: len(times[parser]),
+                }
+                out_writer.writerow(row)
+                cells.append(f'{row[EXPONENT]:>14}')
+            print(f"{name:{max_name_length}} " + ' '.join(cells))
+    print(f"Stress tests complete. The growth exponents are in {out_file}.")
@@ -0,0 +1,110 @@
+from .benchmark import run_benchmarks
+from .collate_benchmark_results import collate_benchmarking_results
+from .common import *
+
+from ..parse import TransformOptions
+
+from csv import DictReader, DictWriter
+from math import exp, isnan as is_nan, log as ln
+from pathlib import Path
+from typing import Callable, Dict, List, Optional, Set
+
+
+__all__ = ['DEFAULT_SWEEP_VARIANTS', 'run_sweep']
+
+
+# The transformation variants used by default: each option on its own, compared against the default transformation.
+DEFAULT_SWEEP_VARIANTS = ['default', 'left', 'no-reduce', 'inline=4']
+# The name of the file containing the final matrix, placed in the sweep directory.
+SWEEP_RESULTS_FILENAME = 'sweep-results.csv'
+# These constants are for titling the columns in the output CSV.
+PARSER = 'Parser'
+BEST = 'Best'
+INPUTS = 'Inputs'
+
+# A function which generates the code for all parsers in a directory using the given transformation options.
+GenerateFunction = Callable[[Path, TransformOptions], None]
+
+
+def run_sweep(generate: GenerateFunction, base_dir: Path, lex_file_dir: Path, sweep_dir: Path, parsers: List[str],
+              variants: List[TransformOptions], quota_factor: int = 3, max_quota: Optional[int] = None):
+    """
+    Benchmarks each parser under each grammar transformation variant. For each variant, the parsers are generated and
+    built in their own subdirectory of the sweep directory, and then benchmarked over the .lex files. Work which has
+    already been done is not repeated, so an interrupted sweep can be resumed by running it again.
+
+    The results are summarized in a matrix of parsers by variants. Each cell is the geometric mean time per token of the
+    parser under the variant, taken over only those inputs for which the parser completed under every variant, so that
+    the cells in a row are directly comparable.
+    """
+    print(f"Sweeping {len(parsers)} parsers over {len(variants)} grammar transformation variants in {sweep_dir}...")
+    collated_files: Dict[str, Path] = {}
+    for options in variants:
+        variant_dir = sweep_dir / options.spec
+        gen_dir = variant_dir / 'gen'
+        bench_dir = variant_dir / 'bench'
+        driver = gen_dir / 'pwz_bench'
+        print(f"Variant {options.spec}:")
+        if not driver.is_file():
+            if not _build_variant(generate, options, gen_dir, variant_dir / 'build-log.txt'):
+                continue
+        bench_dir.mkdir(parents=True, exist_ok=True)
+        run_benchmarks(driver, base_dir, lex_file_dir, bench_dir, parsers, should_resume=True,
+                       quota_factor=quota_factor, max_quota=max_quota)
+        collated_file = variant_dir / 'collated-results.csv'
+        collate_benchmarking_results(bench_dir, parsers, overwrite=True, out_file=collated_file)
+        collated_files[options.spec] = collated_file
+    _write_matrix(collated_files, parsers, sweep_dir / SWEEP_RESULTS_FILENAME)
+
+
+def _build_variant(generate: GenerateFunction, options: TransformOptions, gen_dir: Path, log_file: Path) -> bool:
+    print(f"Generating and building parsers for variant {options.spec} in {gen_dir}...")
+    gen_dir.mkdir(parents=True, exist_ok=True)
+    try:
+        generate(gen_dir, options)
+    except RuntimeError as e:
+        print(f"{RED_X} Generation failed for variant {options.spec}: {e}")
+        return False
+    if not build_generated_parsers(gen_dir, log_file):
+        return False
+    print(f"{GREEN_CHECK} Built variant {options.spec}.")
+    return True
+
+
+def _read_collated_results(collated_file: Path, parsers: List[str]) -> Dict[str, Dict[str, float]]:
+    results: Dict[str, Dict[str, float]] = {parser: {} for parser in parsers}
+    with open(collated_file, mode='r', newline='') as res_csv:
+        for row in DictReader(res_csv):
+            for parser in parsers:
+                spt = float(row.get(f'{parser} {SPT}') or 'nan')
+                if not is_nan(spt):
+                    results[parser][row[FILENAME]] = spt
+    return results
+
+
+def _write_matrix(collated_files: Dict[str, Path], parsers: List[str], out_file: Path):
+    variants = list(collated_files)
+    results = {variant: _read_collated_results(collated_file, parsers)
+               for variant, collated_file in collated_files.items()}
+    with open(out_file, mode='w', newline='') as out_csv:
+        out_writer = DictWriter(out_csv, [PARSER, *variants, BEST, INPUTS])
+        out_writer.writeheader()
+        print(f"{'':16} " + ' '.join(f'{variant:>16}' for variant in variants))
+        for parser in parsers:
+            common: Optional[Set[str]] = None
+            for variant in variants:
+                filenames = set(results[variant][parser])
+                common = filenames if common is None else common & filenames
+            row = {PARSER: parser, INPUTS: len(common or ())}
+            means: Dict[str, float] = {}
+            for variant in variants:
+                if common:
+                    means[variant] = exp(sum(ln(results[variant][parser][f]) for f in common) / len(common))
+                    row[variant] = f'{means[variant]:.12f}'
+                else:
+                    row[variant] = 'nan'
+            row[BEST] = min(means, key=means.get) if means else ''
+            out_writer.writerow(row)
+            cells = (f'{means[variant]:>16.4e}' if variant in means else f'{"nan":>16}' for variant in variants)
+            print(f"{parser:16} " + ' '.join(cells) + f"  (best: {row[BEST] or 'none'})")
+    print(f"Sweep complete. The matrix of results is in {out_file}.")
@@ -1,42 +1,138 @@
+from .ast_diff import compare_ast_files, describe_comparison
+from .ast_table import is_binary_ast_file
 from .common import *
 
 from pwz_bench.generate.names import ParserEnum
 
+from concurrent.futures import ThreadPoolExecutor
+from hashlib import blake2b
+from json import dump as dump_json, load as load_json
 from pathlib import Path
-from subprocess import run
-from typing import List
+from threading import Lock
+from typing import Dict, List, Optional
 
 
-__all__ = ['verify_parses']
+__all__ = ['DEFAULT_DIGESTS_FILENAME', 'DigestManifest', 'verify_parses']
 
 
-def verify_parses(base_dir: Path, ast_file_dir: Path, parsers: List[str]):
+# The name of the manifest of AST digests, placed in the AST directory.
+DEFAULT_DIGESTS_FILENAME = 'ast-digests.json'
+# The number of bytes read from an AST file at a time while hashing it.
+CHUNK_SIZE = 1 << 20
+
+
+class DigestManifest:
+    """
+    A cache of the digests of the .ast files in a directory. Each digest is stored along with the size and modification
+    time of the file it was computed from, and is only reused while these are unchanged, so a file is only read again
+    after it has been written again. The manifest may be used from many threads at once.
+    """
+    def __init__(self, ast_file_dir: Path, manifest_file: Optional[Path] = None):
+        self.ast_file_dir = ast_file_dir
+        self.manifest_file = manifest_file if manifest_file is not None else ast_file_dir / DEFAULT_DIGESTS_FILENAME
+        self.entries: Dict[str, Dict[str, object]] = {}
+        self.lock = Lock()
+        if self.manifest_file.is_file():
+            with open(self.manifest_file) as f:
+                self.entries = load_json(f)
+
+    def digest(self, ast_file: Path) -> str:
+        key = str(ast_file.relative_to(self.ast_file_dir))
+        stat = ast_file.stat()
+        with self.lock:
+            entry = self.entries.get(key)
+        if entry is not None and entry['size'] == stat.st_size and entry['mtime_ns'] == stat.st_mtime_ns:
+            return entry['digest']
+        digest = _hash_file(ast_file)
+        with self.lock:
+            self.entries[key] = {'size': stat.st_size, 'mtime_ns': stat.st_mtime_ns, 'digest': digest}
+        return digest
+
+    def save(self):
+        with self.lock:
+            # Entries for files which no longer exist are dropped.
+            entries = {key: entry for key, entry in sorted(self.entries.items())
+                       if (self.ast_file_dir / key).is_file()}
+        with open(self.manifest_file, 'w') as f:
+            dump_json(entries, f, indent=2)
+
+
+def _hash_file(file: Path) -> str:
+    h = blake2b(digest_size=16)
+    with open(file, 'rb') as f:
+        for chunk in iter(lambda: f.read(CHUNK_SIZE), b''):
+            h.update(chunk)
+    return h.hexdigest()
+
+
+def _verify_file(manifest: DigestManifest, menhir_file: Path, parse_file: Path) -> Optional[List[str]]:
+    """
+    Returns None if the files are identical, or else lines describing how they differ.
+    """
+    if manifest.digest(menhir_file) == manifest.digest(parse_file):
+        return None
+    # The digests only say that the files differ, so they are compared structurally to find where.
+    try:
+        comparison = compare_ast_files(menhir_file, parse_file)
+    except RuntimeError as e:
+        return [str(e)]
+    if comparison.equal:
+        if is_binary_ast_file(menhir_file) != is_binary_ast_file(parse_file):
+            # The files are in different formats, so only their trees can be the same.
+            return None
+        # The files hold the same trees, but are not printed identically.
+        return ["The trees are identical, but the files differ."]
+    return describe_comparison(comparison)
+
+
+def verify_parses(base_dir: Path, ast_file_dir: Path, parsers: List[str], jobs: int = 1):
+    """
+    Compares each parser's .ast files against Menhir's. The files are compared by their digests, which are cached in a
+    manifest in the AST directory so that files which have not changed since the last verification are not read again.
+    Only files whose digests differ are compared structurally, to record where their trees first diverge. Up to `jobs`
+    files are verified at once, but the results are reported in order.
+    """
     menhir_dir = ast_file_dir / ParserEnum.MENHIR.value
     if not menhir_dir.is_dir():
         raise RuntimeError(f"Must produce Menhir parses prior to verification.")
     print(f"Verifying parses, using Menhir's results as ground truth...")
-    for parser in parsers:
-        parse_dir = ast_file_dir / parser
-        parse_file_tups = get_sorted_files_and_lengths(parse_dir, '*.ast')
-        max_filename_length = find_longest_filename_length(map(lambda t: t[0], parse_file_tups))
-        print(f"Verifying parses by {parser} in {parse_dir}...")
-        err_file = ast_file_dir / f'{parser}-verify-errors.txt'
-        err_file.write_text('')
-        print(f"Names of error-producing verifications will be recorded in {err_file}...")
-        for parse_file, _ in parse_file_tups:
-            short_file = parse_file.relative_to(base_dir)
-            relative_base_length = len(str(short_file.parent))
-            max_short_length = relative_base_length + 1 + max_filename_length + 3
-            menhir_file = menhir_dir / parse_file.name
-            if not menhir_file.is_file():
-                raise RuntimeError(f"Missing Menhir parse: {menhir_file}.")
-            print(f"Verifying {str(short_file) + '...':{max_short_length}} ", end='', flush=True)
-            result = run(['diff', menhir_file, parse_file], capture_output=True)
-            if result.returncode == 0:
-                print(GREEN_CHECK)
-            else:
-                with open(err_file, 'a') as ef:
-                    ef.write(f"{short_file}\n")
-                print(RED_X)
-        print(f"Verification with {parser} complete.")
+    manifest = DigestManifest(ast_file_dir)
+    try:
+        with ThreadPoolExecutor(max_workers=jobs) as executor:
+            for parser in parsers:
+                parse_dir = ast_file_dir / parser
+                # Each AST is a single line, so ordering by length (which runs `wc` on every file) is the same as
+                # ordering by name.
+                parse_files = sorted(parse_dir.glob('*.ast'))
+                max_filename_length = find_longest_filename_length(parse_files)
+                print(f"Verifying parses by {parser} in {parse_dir}...")
+                err_file = ast_file_dir / f'{parser}-verify-errors.txt'
+                err_file.write_text('')
+                print(f"Names of error-producing verifications will be recorded in {err_file}...")
+                differences_file = ast_file_dir / f'{parser}-verify-differences.txt'
+                differences_file.write_text('')
+                print(f"Descriptions of the differences will be recorded in {differences_file}...")
+                for parse_file in parse_files:
+                    menhir_file = menhir_dir / parse_file.name
+                    if not menhir_file.is_file():
+                        raise RuntimeError(f"Missing Menhir parse: {menhir_file}.")
+                results = executor.map(lambda f: _verify_file(manifest, menhir_dir / f.name, f), parse_files)
+                for parse_file, description in zip(parse_files, results):
+                    short_file = parse_file.relative_to(base_dir)
+                    relative_base_length = len(str(short_file.parent))
+                    max_short_length = relative_base_length + 1 + max_filename_length + 3
+                    print(f"Verifying {str(short_file) + '...':{max_short_length}} ", end='')
+                    if description is None:
+                        print(GREEN_CHECK)
+                    else:
+                        with open(err_file, 'a') as ef:
+                            ef.write(f"{short_file}\n")
+                        with open(differences_file, 'a') as df:
+                            df.write(f"{short_file}:\n")
+                            for line in description:
+                                df.write(f"  {line}\n")
+                        print(RED_X)
+                print(f"Verification with {parser} complete.")
+    finally:
+        manifest.save()
     print(f"Verification done.")
@@ -4,15 +4,20 @@ from abc import ABC
 from dataclasses import dataclass
 from os import makedirs
 from pathlib import Path
+from re import compile as re_compile
 from shutil import copyfile
 from typing import Callable, List
 
 
-__all__ = ['GeneratorFunc', 'FileGenerator', 'DynamicFileGenerator', 'StaticFileGenerator']
+__all__ = ['GeneratorFunc', 'FileGenerator', 'DynamicFileGenerator', 'StaticFileGenerator', 'INSTRUMENTATION_HOOK_RE']
 
 
 GeneratorFunc = Callable[[GrammarDescription], List[str]]
 
+# The instrumentation hooks of the static OCaml sources are written as comments of the form `(*INSTRUMENT code *)`, so
+# that they are compiled only into an instrumented build, whose sources have the code uncommented.
+INSTRUMENTATION_HOOK_RE = re_compile(r'\(\*INSTRUMENT (.*?) \*\)')
+
 
 @dataclass
 class FileGenerator(ABC):
@@ -36,10 +41,13 @@ class DynamicFileGenerator(FileGenerator):
 class StaticFileGenerator(FileGenerator):
     filename: str
 
-    def generate(self, from_dir: Path, to_dir: Path):
+    def generate(self, from_dir: Path, to_dir: Path, instrumented: bool = False):
         origin_file = from_dir / self.filename
         destination_file = to_dir / self.filename
         self.make_destination_dir_for_file(destination_file)
+        if instrumented:
+            destination_file.write_text(INSTRUMENTATION_HOOK_RE.sub(r'\1', origin_file.read_text()))
+            return
         # PyCharm doesn't like that I'm putting Paths here instead of PathLikes... which is silly.
         # noinspection PyTypeChecker
         copyfile(origin_file, destination_file)
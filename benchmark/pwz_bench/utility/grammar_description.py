@@ -2,11 +2,12 @@ from .parse import *
 from .tokenize import *
 
 from dataclasses import dataclass, field
+from itertools import chain
 from re import compile as re_compile
-from typing import Dict, List, NamedTuple, Tuple
+from typing import Dict, List, NamedTuple, Optional, Tuple
 
 
-__all__ = ['TokenCollection', 'GrammarDescription']
+__all__ = ['TokenCollection', 'GrammarDescription', 'ENTRY_POINT', 'DEFAULT_ENTRY_SYMBOL']
 
 
 TokenCollection = NamedTuple('TokenCollection', [('named',      List[str]),
@@ -16,15 +17,26 @@ TokenCollection = NamedTuple('TokenCollection', [('named',      List[str]),
 
 TOKEN_NAME_RE = re_compile(r'[a-zA-Z][a-zA-Z0-9_]*')
 
+# The name given to the start symbol that the parser interfaces parse from. Each generated parser defines it as an alias
+# of the entry symbol, so the interfaces do not need to know which grammar they were generated from.
+ENTRY_POINT = 'entry_point'
+# The entry symbol used if none is given and the grammar has a start symbol of this name (as the Python grammar does).
+DEFAULT_ENTRY_SYMBOL = 'file_input'
+# Tokens which are not Python tokens are numbered from here, after the tags of the Python tokens.
+FIRST_GRAMMAR_TAG = max(token.tag for token in TokenEnum) + 1
+
 
 @dataclass
 class GrammarDescription:
     base_grammar: Grammar
     start_symbols: List[str]
+    entry_symbol: Optional[str] = None
     terminal_names: Dict[Terminal, str] = field(init=False, default_factory=dict)
     tokens: TokenCollection = field(init=False)
+    token_tags: Dict[str, int] = field(init=False, default_factory=dict)
 
     def __post_init__(self):
+        self._find_entry_symbol()
         named: List[str] = []
         nameless: List[str] = []
         typed: List[Tuple[str, str]] = []
@@ -59,3 +71,36 @@ class GrammarDescription:
         named.sort()
         typed.sort()
         self.tokens = TokenCollection(named, nameless, typed)
+        self._assign_token_tags()
+
+    def _assign_token_tags(self):
+        """
+        Gives each token of the grammar the integer tag which the generated parsers compare tokens by. Python tokens
+        keep the tags the tokenizer writes into .blex files, so the parsers generated from the Python grammar read them
+        directly. The grammar's other tokens, such as the literals of a grammar which is not Python, are numbered in
+        order after the Python tokens.
+        """
+        next_tag = FIRST_GRAMMAR_TAG
+        for name in chain(self.tokens.named, self.tokens.nameless, (name for name, _ in self.tokens.typed)):
+            token = TokenEnum.__members__.get(name)
+            if token is None:
+                self.token_tags[name] = next_tag
+                next_tag += 1
+            else:
+                self.token_tags[name] = token.tag
+
+    def _find_entry_symbol(self):
+        if not self.start_symbols:
+            raise RuntimeError("At least one start symbol must be given.")
+        rule_names = {rule.name for rule in self.base_grammar.rules}
+        if ENTRY_POINT in rule_names:
+            raise RuntimeError(f"The grammar cannot have a rule named {ENTRY_POINT}, which is reserved.")
+        if self.entry_symbol is None:
+            if DEFAULT_ENTRY_SYMBOL in self.start_symbols:
+                self.entry_symbol = DEFAULT_ENTRY_SYMBOL
+            else:
+                self.entry_symbol = self.start_symbols[0]
+        if self.entry_symbol not in rule_names:
+            raise RuntimeError(f"Entry symbol {self.entry_symbol} is not a rule of the grammar.")
+        if self.entry_symbol not in self.start_symbols:
+            self.start_symbols = self.start_symbols + [self.entry_symbol]
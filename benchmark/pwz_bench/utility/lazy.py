@@ -0,0 +1,49 @@
+from importlib import import_module
+from typing import Any, Callable, List
+
+import sys
+
+
+__all__ = ['lazy_star_imports']
+
+
+def lazy_star_imports(package: str, submodules: List[str]) -> Callable[[str], Any]:
+    """
+    Defers a package's star imports of its submodules until they are needed. A package's `__init__` assigns the result
+    to its module-level `__getattr__` (PEP 562) in place of a `from .submodule import *` for each of the submodules.
+
+    The first time a name is looked up on the package but not found (including `__all__`, which a star import of the
+    package looks up), every submodule is imported in order and its public names are copied into the package, exactly
+    as the star imports would have done. Importing a single submodule directly, as each command of pwz_bench.py does,
+    then imports only that submodule and what it depends on, rather than every module (and parso) along with it.
+    """
+    module = sys.modules[package]
+    loading = False
+    loaded = False
+
+    def load():
+        nonlocal loading, loaded
+        loading = True
+        # If an import fails, the next lookup tries again, so that it raises the same error rather than AttributeError.
+        try:
+            for submodule_name in submodules:
+                submodule = import_module(submodule_name, package)
+                names = getattr(submodule, '__all__', None)
+                if names is None:
+                    names = [name for name in vars(submodule) if not name.startswith('_')]
+                for name in names:
+                    setattr(module, name, getattr(submodule, name))
+            module.__all__ = [name for name in vars(module) if not name.startswith('_')]
+            loaded = True
+        finally:
+            loading = False
+
+    def __getattr__(name: str) -> Any:
+        # A name looked up while the submodules are being imported (as by a circular import) is not there yet.
+        if not loading and not loaded:
+            load()
+            if name in vars(module):
+                return vars(module)[name]
+        raise AttributeError(f"module {package!r} has no attribute {name!r}")
+
+    return __getattr__
@@ -1,6 +1,6 @@
 from .parse import *
 from .rule_components import *
-from .transform import parse_and_transform_grammar_file
+from .transform import DEFAULT_TRANSFORM_OPTIONS, TransformOptions, parse_and_transform_grammar_file
 
 from typing import Dict, List, Optional, Set, Union
 
@@ -13,8 +13,8 @@ GrammarDict = Dict[str, Rule]
 
 class Grammar:
     @staticmethod
-    def build_from_file(filename: str) -> 'Grammar':
-        gd = parse_and_transform_grammar_file(filename)
+    def build_from_file(filename: str, options: TransformOptions = DEFAULT_TRANSFORM_OPTIONS) -> 'Grammar':
+        gd = parse_and_transform_grammar_file(filename, options=options)
         return Grammar(gd)
 
     @staticmethod
@@ -2,16 +2,79 @@ from .parse import *
 from .rule_components import *
 
 from collections import deque
-from dataclasses import replace
+from dataclasses import dataclass, replace
+from itertools import product
 from typing import Dict, Generic, List, Optional, Tuple, TypeVar, Union
 
+import re
 
-__all__ = ['parse_and_transform_grammar_file', 'transform_grammar']
+
+__all__ = ['TransformOptions', 'DEFAULT_TRANSFORM_OPTIONS', 'parse_and_transform_grammar_file', 'transform_grammar',
+           'original_rule_name']
 
 
 Grammar = Dict[str, Rule]
 
 
+@dataclass(frozen=True)
+class TransformOptions:
+    """
+    Options controlling how a grammar is lowered into the form used by the parser generators.
+
+      * left_recursive_lists: lower repetitions (`x*` and `x+`) into left-recursive rules instead of right-recursive
+        ones.
+      * reduce_aliases: remove rules which are merely aliases of a single terminal or non-terminal.
+      * inline_threshold: inline each non-recursive synthesized rule (i.e., one created for a group or repetition)
+        whose productions contain at most this many symbols in total into the rules which reference it. A value of 0
+        disables inlining.
+    """
+    left_recursive_lists: bool = False
+    reduce_aliases: bool = True
+    inline_threshold: int = 0
+
+    @staticmethod
+    def from_spec(spec: str) -> 'TransformOptions':
+        """
+        Builds options from a comma-separated specification, such as `left,no-reduce,inline=4`. The specification
+        `default` gives the default options.
+        """
+        left_recursive_lists = False
+        reduce_aliases = True
+        inline_threshold = 0
+        for part in filter(None, (part.strip() for part in spec.split(','))):
+            if part == 'default' or part == 'right':
+                continue
+            elif part == 'left':
+                left_recursive_lists = True
+            elif part == 'no-reduce':
+                reduce_aliases = False
+            elif part.startswith('inline='):
+                try:
+                    inline_threshold = int(part[len('inline='):])
+                except ValueError:
+                    raise RuntimeError(f"Invalid inlining threshold in transformation specification: {part}.")
+            else:
+                raise RuntimeError(f"Unknown option in transformation specification: {part}.")
+        return TransformOptions(left_recursive_lists, reduce_aliases, inline_threshold)
+
+    @property
+    def spec(self) -> str:
+        """
+        The canonical specification of these options, which is also suitable for use as a directory name.
+        """
+        parts = []
+        if self.left_recursive_lists:
+            parts.append('left')
+        if not self.reduce_aliases:
+            parts.append('no-reduce')
+        if self.inline_threshold > 0:
+            parts.append(f'inline={self.inline_threshold}')
+        return ','.join(parts) if parts else 'default'
+
+
+DEFAULT_TRANSFORM_OPTIONS = TransformOptions()
+
+
 _KT = TypeVar('_KT')
 _VT = TypeVar('_VT')
 
@@ -40,26 +103,89 @@ class QueueDict(Generic[_KT, _VT]):
         return bool(self._deque)
 
 
-def parse_and_transform_grammar_file(filename: str, return_original: bool = False) -> Union[Grammar,
-                                                                                            Tuple[Grammar, Grammar]]:
+def parse_and_transform_grammar_file(filename: str, return_original: bool = False,
+                                     options: TransformOptions = DEFAULT_TRANSFORM_OPTIONS) -> Union[Grammar,
+                                                                                                     Tuple[Grammar, Grammar]]:
     original_grammar = parse_grammar_file(filename)
-    new_grammar = transform_grammar(original_grammar)
+    new_grammar = transform_grammar(original_grammar, options)
     if return_original:
         return original_grammar, new_grammar
     else:
         return new_grammar
 
 
-def transform_grammar(old_grammar: Dict[str, Rule]) -> Dict[str, Rule]:
+def transform_grammar(old_grammar: Dict[str, Rule],
+                      options: TransformOptions = DEFAULT_TRANSFORM_OPTIONS) -> Dict[str, Rule]:
     new_grammar: Dict[str, Rule] = {}
     for name, rule in old_grammar.items():
-        new_rules = transform_rule(rule)
+        new_rules = transform_rule(rule, options)
         for new_rule in new_rules:
             new_grammar[new_rule.name] = new_rule
-    _reduce_grammar(new_grammar)
+    if options.inline_threshold > 0:
+        _inline_grammar(new_grammar, options.inline_threshold)
+    if options.reduce_aliases:
+        _reduce_grammar(new_grammar)
     return new_grammar
 
 
+def _inline_grammar(grammar: Dict[str, Rule], threshold: int):
+    """
+    Inlines small synthesized rules into the rules which reference them. A reference to an inlined rule is replaced by
+    each of the rule's productions in turn, so a production referencing a rule with `n` productions becomes `n`
+    productions. Only rules which were synthesized by the transformation (whose names contain `__`) are inlined, so the
+    rules named in the original grammar are all kept. Recursive rules (such as those for repetitions) cannot be inlined.
+
+    Note that this is an in-place operation over the existing grammar definition.
+
+    :param grammar: the grammar within which to inline rules
+    :param threshold: the maximum number of symbols (counting each empty production as one) in an inlined rule
+    """
+    changed = True
+    while changed:
+        changed = False
+        for name, rule in list(grammar.items()):
+            if name not in grammar or '__' not in name or not _is_inlinable(rule, threshold):
+                continue
+            alternatives = [production.components for production in rule.groups[0].productions]
+            for other in grammar.values():
+                if other is rule:
+                    continue
+                for group in other.groups:
+                    new_productions: List[Production] = []
+                    for production in group.productions:
+                        new_productions.extend(_inline_production(production, name, alternatives))
+                    group.productions = new_productions
+            del(grammar[name])
+            changed = True
+
+
+def _is_inlinable(rule: Rule, threshold: int) -> bool:
+    if len(rule.groups) != 1:
+        return False
+    size = 0
+    for production in rule.groups[0].productions:
+        size += max(1, len(production.components))
+        for component in production.components:
+            if isinstance(component, NonTerminal) and component.name == rule.name:
+                return False
+    return size <= threshold
+
+
+def _inline_production(production: Production, rule_name: str,
+                       alternatives: List[List[Component]]) -> List[Production]:
+    if not any(isinstance(component, NonTerminal) and component.name == rule_name
+               for component in production.components):
+        return [production]
+    choices: List[List[List[Component]]] = []
+    for component in production.components:
+        if isinstance(component, NonTerminal) and component.name == rule_name:
+            choices.append(alternatives)
+        else:
+            choices.append([[component]])
+    return [Production([replace(component) for part in combination for component in part])
+            for combination in product(*choices)]
+
+
 def _reduce_grammar(grammar: Dict[str, Rule]):
     """
     In the declaration of a grammar, we may end up with simple alias definitions of the form:
@@ -147,29 +273,36 @@ def _replace_references(rule_name: str, replacement: Union[Terminal, NonTerminal
     del(grammar[rule_name])
 
 
-def transform_rule(old_rule: Rule) -> List[Rule]:
+def transform_rule(old_rule: Rule, options: TransformOptions = DEFAULT_TRANSFORM_OPTIONS) -> List[Rule]:
     new_rule = Rule(old_rule.name)
     # All rules should have a single top-level group.
     if len(old_rule.groups) != 1:
         raise RuntimeError(f"Rule {old_rule.name} has {len(old_rule.groups)} top-level groups instead of exactly 1.")
-    new_group, new_rules = transform_group(old_rule.groups[0], old_rule.name)
+    new_group, new_rules = transform_group(old_rule.groups[0], old_rule.name, options)
     new_rule.add_group(new_group)
     # Include the base new rule in the list of rules.
     new_rules.insert(0, new_rule)
     return new_rules
 
 
-def transform_group(old_group: ProductionGroup, rule_name: str) -> Tuple[ProductionGroup, List[Rule]]:
-    new_group = ProductionGroup(optional=old_group.optional, implicit=old_group.implicit)
+def transform_group(old_group: ProductionGroup, rule_name: str,
+                    options: TransformOptions = DEFAULT_TRANSFORM_OPTIONS) -> Tuple[ProductionGroup, List[Rule]]:
+    new_group = ProductionGroup(implicit=old_group.implicit)
     new_rules: List[Rule] = []
+    if old_group.optional:
+        """
+        rule: [ x ]     ==> rule: e | x     (where 'e' represents the empty production)
+        """
+        new_group.add_production(Production())
     for snt_cnt, old_production in enumerate(old_group.productions, start=1):
-        new_production, rules = transform_production(old_production, rule_name, snt_cnt)
+        new_production, rules = transform_production(old_production, rule_name, snt_cnt, options)
         new_group.add_production(new_production)
         new_rules.extend(rules)
     return new_group, new_rules
 
 
-def transform_production(old_production: Production, rule_name: str, snt_cnt: int = 1) -> Tuple[Production, List[Rule]]:
+def transform_production(old_production: Production, rule_name: str, snt_cnt: int = 1,
+                         options: TransformOptions = DEFAULT_TRANSFORM_OPTIONS) -> Tuple[Production, List[Rule]]:
     new_production = Production()
     new_rules: List[Rule] = []
     for old_component in old_production.components:
@@ -178,7 +311,7 @@ def transform_production(old_production: Production, rule_name: str, snt_cnt: in
                 new_component = replace(old_component)
                 new_production.add_component(new_component)
             elif isinstance(old_component, ProductionGroup):
-                rules = create_rule_from_group(old_component, rule_name, snt_cnt)
+                rules = create_rule_from_group(old_component, rule_name, snt_cnt, options)
                 snt_cnt += 1
                 snt = NonTerminal(rules[0].name)
                 new_production.add_component(snt)
@@ -186,7 +319,7 @@ def transform_production(old_production: Production, rule_name: str, snt_cnt: in
             else:
                 raise RuntimeError(f"Cannot transform component of type {old_component.__class__.__name__}.")
         else:
-            rules = create_rule_from_list(old_component, rule_name, snt_cnt)
+            rules = create_rule_from_list(old_component, rule_name, snt_cnt, options)
             snt_cnt += 1
             snt = NonTerminal(rules[0].name)
             new_production.add_component(snt)
@@ -202,7 +335,21 @@ def _create_snt_rule_name(rule_name: str, modifier: str, snt_cnt: int) -> str:
     return name
 
 
-def create_rule_from_list(old_component: Component, rule_name: str, snt_cnt: int) -> List[Rule]:
+_SNT_RULE_NAME_SUFFIX = re.compile(r'__(?:lst|grp|opt_grp)_\d+__\d+$')
+def original_rule_name(rule_name: str) -> str:
+    """
+    Recovers the name of the rule in the original grammar from which a rule created by `_create_snt_rule_name` (possibly
+    many times over, for nested groups and lists) was derived.
+    """
+    while True:
+        stripped = _SNT_RULE_NAME_SUFFIX.sub('', rule_name)
+        if stripped == rule_name:
+            return rule_name
+        rule_name = stripped
+
+
+def create_rule_from_list(old_component: Component, rule_name: str, snt_cnt: int,
+                          options: TransformOptions = DEFAULT_TRANSFORM_OPTIONS) -> List[Rule]:
     nonempty = old_component.repeat is Repeat.ne_list
     rule = Rule(_create_snt_rule_name(rule_name, 'lst', snt_cnt))
     new_rules: List[Rule] = [rule]
@@ -210,13 +357,17 @@ def create_rule_from_list(old_component: Component, rule_name: str, snt_cnt: int
         """
         rule: x*    ==> rule: snt
                         snt: e | x snt      (where 'e' represents the empty production)
+
+        or, with left-recursive lists:
+
+                        snt: e | snt x
         """
         new_component = replace(old_component)
         if nonempty:
             lhs = Production([new_component])
         else:
             lhs = Production()
-        rhs = Production([new_component, NonTerminal(rule.name)])
+        rhs = _make_list_production(replace(new_component), NonTerminal(rule.name), options)
         group = ProductionGroup(implicit=True, productions=[lhs, rhs])
         rule.add_group(group)
     elif isinstance(old_component, ProductionGroup):
@@ -225,13 +376,13 @@ def create_rule_from_list(old_component: Component, rule_name: str, snt_cnt: int
                                     snt_1: e | snt_2 snt_1      (where 'e' represents the empty production)
                                     snt_2: x2 | x3
         """
-        rules = create_rule_from_group(old_component, rule.name, 1)
+        rules = create_rule_from_group(old_component, rule.name, 1, options)
         snt = NonTerminal(rules[0].name)
         if nonempty:
             lhs = Production([snt])
         else:
             lhs = Production()
-        rhs = Production([snt, NonTerminal(rule.name)])
+        rhs = _make_list_production(NonTerminal(snt.name), NonTerminal(rule.name), options)
         group = ProductionGroup(implicit=True, productions=[lhs, rhs])
         rule.add_group(group)
         new_rules.extend(rules)
@@ -240,7 +391,14 @@ def create_rule_from_list(old_component: Component, rule_name: str, snt_cnt: int
     return new_rules
 
 
-def create_rule_from_group(old_group: ProductionGroup, rule_name: str, snt_cnt: int) -> List[Rule]:
+def _make_list_production(element: Component, recursion: NonTerminal, options: TransformOptions) -> Production:
+    if options.left_recursive_lists:
+        return Production([recursion, element])
+    return Production([element, recursion])
+
+
+def create_rule_from_group(old_group: ProductionGroup, rule_name: str, snt_cnt: int,
+                           options: TransformOptions = DEFAULT_TRANSFORM_OPTIONS) -> List[Rule]:
     rule = Rule(_create_snt_rule_name(rule_name, 'opt_grp' if old_group.optional else 'grp', snt_cnt))
     new_group = ProductionGroup(implicit=True)
     rule.add_group(new_group)
@@ -257,7 +415,7 @@ def create_rule_from_group(old_group: ProductionGroup, rule_name: str, snt_cnt:
         rule: x1 ( x2 | x3 )    ==> rule: x1 snt
                                     snt: x2 | x3
         """
-        new_production, rules = transform_production(old_production, rule.name)
+        new_production, rules = transform_production(old_production, rule.name, options=options)
         new_group.add_production(new_production)
         new_rules.extend(rules)
     return new_rules
@@ -1,2 +1,5 @@
+from .blex import *
+from .features import *
+from .incremental import *
 from .tokenize import *
 from .tokens import *
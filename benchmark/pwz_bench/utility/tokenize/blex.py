@@ -0,0 +1,126 @@
+from .tokens import *
+
+from pathlib import Path
+from shutil import copyfileobj
+from struct import Struct
+from tempfile import TemporaryFile
+from typing import Dict, Iterable, List
+
+
+__all__ = ['BLEX_MAGIC', 'BLEX_SUFFIX', 'NO_PARAMETER', 'BlexWriter', 'write_blex', 'read_blex']
+
+
+# A .blex file holds the same tokens as a .lex file in a binary form which the parsers can load without matching any
+# text. All integers are unsigned 32-bit little-endian values.
+#
+#     magic                   8 bytes: "PWZLEX" 0x00 0x01
+#     string count            u32
+#     token count             u32
+#     strings                 for each string, in order of id: its length in bytes (u32) and then its UTF-8 bytes
+#     padding                 zero bytes up to a multiple of 4 bytes
+#     tokens                  for each token: its tag (`TokenEnum.tag`) and the id of its parameter, or NO_PARAMETER
+#
+# The parameters of NAME, NUMBER, and STRING tokens are interned in order of first appearance, so each distinct
+# identifier or literal is stored (and allocated by the parsers) only once. The reader is generated into pytokens.ml.
+BLEX_MAGIC = b'PWZLEX\x00\x01'
+BLEX_SUFFIX = '.blex'
+NO_PARAMETER = 0xFFFFFFFF
+
+_U32 = Struct('<I')
+_HEADER = Struct('<8sII')
+_TOKEN = Struct('<II')
+
+_TOKENS_BY_TAG: Dict[int, TokenEnum] = {token.tag: token for token in TokenEnum}
+
+
+class BlexWriter:
+    """
+    Writes a .blex file one token at a time. The header and the strings come before the tokens in the file, but are
+    only known once every token has been seen, so the token records are spooled to a temporary file (in batches of
+    `BATCH_SIZE`) and copied after the strings when the writer is closed. Only the distinct parameters are kept in
+    memory, so files of any number of tokens can be written.
+    """
+    # The number of token records buffered before they are written to the spool.
+    BATCH_SIZE = 1 << 12
+
+    def __init__(self, blex_file: Path):
+        self.blex_file = blex_file
+        self.token_count = 0
+        self._ids: Dict[str, int] = {}
+        self._strings: List[bytes] = []
+        self._records: List[bytes] = []
+        self._spool = TemporaryFile(dir=blex_file.parent)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        if exc_type is None:
+            self.close()
+        else:
+            self._spool.close()
+
+    def write(self, tok: Token):
+        param = NO_PARAMETER
+        if isinstance(tok, ParameterizedToken):
+            param = self._ids.get(tok.param)
+            if param is None:
+                param = self._ids[tok.param] = len(self._strings)
+                self._strings.append(tok.param.encode())
+        self._records.append(_TOKEN.pack(tok.tag, param))
+        self.token_count += 1
+        if len(self._records) >= self.BATCH_SIZE:
+            self._flush_records()
+
+    def _flush_records(self):
+        self._spool.write(b''.join(self._records))
+        self._records.clear()
+
+    def close(self):
+        self._flush_records()
+        self._spool.seek(0)
+        with open(self.blex_file, 'wb') as f:
+            f.write(_HEADER.pack(BLEX_MAGIC, len(self._strings), self.token_count))
+            length = _HEADER.size
+            for s in self._strings:
+                f.write(_U32.pack(len(s)))
+                f.write(s)
+                length += _U32.size + len(s)
+            f.write(bytes(-length % _U32.size))
+            copyfileobj(self._spool, f)
+        self._spool.close()
+
+
+def write_blex(tokens: Iterable[Token], blex_file: Path):
+    with BlexWriter(blex_file) as writer:
+        for tok in tokens:
+            writer.write(tok)
+
+
+def read_blex(blex_file: Path) -> List[Token]:
+    data = blex_file.read_bytes()
+    if len(data) < _HEADER.size:
+        raise RuntimeError(f"Not a binary lex file: {blex_file}.")
+    magic, string_count, token_count = _HEADER.unpack_from(data, 0)
+    if magic != BLEX_MAGIC:
+        raise RuntimeError(f"Not a binary lex file: {blex_file}.")
+    offset = _HEADER.size
+    strings: List[str] = []
+    for _ in range(string_count):
+        length, = _U32.unpack_from(data, offset)
+        offset += _U32.size
+        strings.append(data[offset:offset + length].decode())
+        offset += length
+    offset += -offset % _U32.size
+    if len(data) != offset + _TOKEN.size * token_count:
+        raise RuntimeError(f"Binary lex file {blex_file} has the wrong length for {token_count} tokens.")
+    tokens: List[Token] = []
+    for tag, param in _TOKEN.iter_unpack(data[offset:]):
+        token = _TOKENS_BY_TAG.get(tag)
+        if token is None:
+            raise RuntimeError(f"Unknown token tag {tag} in {blex_file}.")
+        if param == NO_PARAMETER:
+            tokens.append(interned_token(token))
+        else:
+            tokens.append(ParameterizedToken(token, strings[param]))
+    return tokens
@@ -0,0 +1,118 @@
+from .tokens import *
+
+from collections import Counter
+from dataclasses import dataclass, field
+from typing import Dict, Iterable
+
+
+__all__ = ['FileFeatures', 'FeatureCollector', 'features_of_tokens']
+
+
+# The tokens are told apart by their tags, since `TokenEnum` hashes and compares its members in Python, which is slow
+# enough to matter when it is done for every token.
+OPENING_BRACKETS = {TokenEnum.L_PAR.tag, TokenEnum.L_SQR.tag, TokenEnum.L_BRC.tag}
+CLOSING_BRACKETS = {TokenEnum.R_PAR.tag, TokenEnum.R_SQR.tag, TokenEnum.R_BRC.tag}
+# Tokens which end a logical line.
+LINE_ENDS = {TokenEnum.NEWLINE.tag, TokenEnum.INDENT.tag, TokenEnum.DEDENT.tag, TokenEnum.ENDMARKER.tag}
+NEWLINE_TAG = TokenEnum.NEWLINE.tag
+INDENT_TAG = TokenEnum.INDENT.tag
+DEDENT_TAG = TokenEnum.DEDENT.tag
+SEMICOLON_TAG = TokenEnum.SEMICOLON.tag
+
+_TOKENS_BY_TAG: Dict[int, TokenEnum] = {token.tag: token for token in TokenEnum}
+
+
+@dataclass
+class FileFeatures:
+    """
+    Structural features of a single token stream, used to look for properties of the input (beyond its size) which
+    affect parsing performance.
+    """
+    tokens: int = 0
+    # The deepest nesting of parentheses, square brackets, and braces.
+    max_bracket_depth: int = 0
+    # The deepest nesting of indented blocks.
+    max_indent_depth: int = 0
+    # The most tokens in a single logical line, i.e., the longest run of tokens between NEWLINE/INDENT/DEDENT tokens.
+    # Expressions cannot span logical lines, so this bounds the length of the longest expression.
+    longest_line: int = 0
+    # The number of simple statements and compound statement headers.
+    statements: int = 0
+    # The number of occurrences of each kind of token.
+    histogram: Dict[str, int] = field(default_factory=dict)
+
+    @property
+    def distinct_tokens(self) -> int:
+        return len(self.histogram)
+
+    @property
+    def tokens_per_statement(self) -> float:
+        return self.tokens / self.statements if self.statements else float(self.tokens)
+
+
+class FeatureCollector:
+    """
+    Computes the features of a token stream a token (or a batch of tokens) at a time, so that it can be used while the
+    tokens are written out.
+    """
+    def __init__(self):
+        self._features = FileFeatures()
+        # Counted by tag, which is only turned into the token's name once for each kind when the features are taken.
+        self._histogram: Counter = Counter()
+        self._bracket_depth = 0
+        self._indent_depth = 0
+        self._line_length = 0
+
+    def add(self, token: Token):
+        self.add_all((token,))
+
+    def add_all(self, tokens: Iterable[Token]):
+        # The state is kept in local variables for the length of the batch, since this runs for every token lexed.
+        f = self._features
+        histogram = self._histogram
+        bracket_depth, indent_depth, line_length = self._bracket_depth, self._indent_depth, self._line_length
+        max_bracket_depth, max_indent_depth, longest_line = f.max_bracket_depth, f.max_indent_depth, f.longest_line
+        statements = f.statements
+        for token in tokens:
+            tag = token.tag
+            histogram[tag] += 1
+            if tag in LINE_ENDS:
+                if tag == NEWLINE_TAG:
+                    if line_length > 0:
+                        statements += 1
+                elif tag == INDENT_TAG:
+                    indent_depth += 1
+                    if indent_depth > max_indent_depth:
+                        max_indent_depth = indent_depth
+                elif tag == DEDENT_TAG:
+                    indent_depth -= 1
+                if line_length > longest_line:
+                    longest_line = line_length
+                line_length = 0
+                continue
+            line_length += 1
+            if tag in OPENING_BRACKETS:
+                bracket_depth += 1
+                if bracket_depth > max_bracket_depth:
+                    max_bracket_depth = bracket_depth
+            elif tag in CLOSING_BRACKETS:
+                bracket_depth -= 1
+            elif tag == SEMICOLON_TAG:
+                statements += 1
+        self._bracket_depth, self._indent_depth, self._line_length = bracket_depth, indent_depth, line_length
+        f.max_bracket_depth, f.max_indent_depth, f.longest_line = max_bracket_depth, max_indent_depth, longest_line
+        f.statements = statements
+
+    def features(self) -> FileFeatures:
+        f = self._features
+        # A stream cut off before its ENDMARKER may end partway through a line.
+        f.longest_line = max(f.longest_line, self._line_length)
+        f.tokens = sum(self._histogram.values())
+        f.histogram = dict(sorted((_TOKENS_BY_TAG[tag].name, count) for tag, count in self._histogram.items()))
+        return f
+
+
+def features_of_tokens(tokens: Iterable[Token]) -> FileFeatures:
+    collector = FeatureCollector()
+    collector.add_all(tokens)
+    return collector.features()
@@ -0,0 +1,291 @@
+from .tokenize import *
+from .tokens import *
+
+from bisect import bisect_left
+from dataclasses import dataclass
+from itertools import chain, islice
+from parso.grammar import PythonGrammar
+from parso.python.token import PythonTokenTypes
+from typing import Iterable, List, Optional, Tuple
+
+
+__all__ = ['TextEdit', 'TokenStreamChange', 'IncrementalLexer']
+
+
+# A line which opens a block, used to put parso's tokenizer into a known indentation state before it reaches the first
+# line to be re-tokenized.
+BLOCK_OPENER = 'if 1:\n'
+# A line which goes in the innermost block opened, so that its indent is on the stack even if the first line to be
+# re-tokenized does not produce one (as a line which starts with an error token does not).
+BLOCK_FILLER = 'pass\n'
+
+# The tokens without parameters are shared, so tokens can be told apart by identity.
+_NEWLINE = interned_token(TokenEnum.NEWLINE)
+_INDENT = interned_token(TokenEnum.INDENT)
+_DEDENT = interned_token(TokenEnum.DEDENT)
+
+
+@dataclass
+class TextEdit:
+    """
+    A replacement of the text between two positions (in the same form as the positions of tokens: lines numbered from 1
+    and columns from 0) with new text. The end position is exclusive, so an insertion has equal start and end positions.
+    """
+    start: Position
+    end: Position
+    text: str
+
+
+@dataclass
+class TokenStreamChange:
+    """
+    The tokens changed by an edit: tokens [start, old_end) of the old stream were replaced by tokens [start, new_end) of
+    the new stream. The tokens after the change are the same as before, but their lines are shifted by `line_delta`.
+    """
+    start: int
+    old_end: int
+    new_end: int
+    line_delta: int
+    # The number of lines which were tokenized again to find the change.
+    relexed_lines: int
+
+
+def _split_lines(text: str) -> List[str]:
+    """
+    Splits text into lines, keeping their newlines. Only "\\n" ends a line, as when a file is read in text mode.
+    """
+    lines = text.split('\n')
+    last = lines.pop()
+    lines = [line + '\n' for line in lines]
+    if last:
+        lines.append(last)
+    return lines
+
+
+def _same_token(a: Token, b: Token) -> bool:
+    # Tokens compare equal by their kind alone, so the parameters must be compared separately.
+    return a is b or (a == b and getattr(a, 'param', None) == getattr(b, 'param', None))
+
+
+class IncrementalLexer:
+    """
+    Keeps the tokens of a source text, with their positions, up to date as the text is edited.
+
+    After an edit, tokenizing starts again from the nearest line before the edit which begins a logical line (so that
+    the bracket depth is zero and no string is open), with the indentation stack at that line rebuilt from the indents
+    which are still open there. Tokenizing stops as soon as the new stream reaches a line after the edit at which the old
+    stream began a logical line with the same token and the same indentation stack, since the rest of the old stream
+    must then be unchanged. Only the lines between the two are tokenized again.
+
+    The streams are the same as `tokenize_file_with_positions` would give for the edited text. When error tokens are
+    suppressed, a dedent to a column which is not on the indentation stack leaves parso's indentation state in a form
+    which the indents do not show (and which differs between versions of parso), so the positions of these error dedents
+    are kept alongside the tokens. The streams are never resynchronized after an error dedent: the rest of the text is
+    tokenized again instead. Tokens are always produced by parso here, since only a few lines are tokenized at a time.
+
+    `pwz_bench.py check-incremental` checks that random edits give the same streams as tokenizing the edited text anew.
+    """
+    def __init__(self, text: str, grammar: Optional[PythonGrammar] = None, suppress_error_tokens: bool = False):
+        if grammar is None:
+            grammar = load_grammar()
+        self.grammar = grammar
+        self.suppress_error_tokens = suppress_error_tokens
+        self.lines = _split_lines(text)
+        self.tokens: List[Token] = []
+        self.positions: List[Position] = []
+        # The positions of suppressed error dedents.
+        self.error_dedents: List[Position] = []
+        for tok, pos in self._tokenize(self.lines, (1, 0), self.error_dedents):
+            self.tokens.append(tok)
+            self.positions.append(pos)
+
+    @classmethod
+    def from_file(cls, filename: str, grammar: Optional[PythonGrammar] = None,
+                  suppress_error_tokens: bool = False) -> 'IncrementalLexer':
+        with open(filename) as f:
+            return cls(f.read(), grammar, suppress_error_tokens)
+
+    @property
+    def text(self) -> str:
+        return ''.join(self.lines)
+
+    def _tokenize(self, lines: Iterable[str], start_pos: Position,
+                  error_dedents: List[Position]) -> PositionedTokenGenerator:
+        """
+        Tokenizes lines, recording the position of each error dedent (which is suppressed, if at all, before the token
+        at the same position is produced).
+        """
+        for py_token in self.grammar._tokenize_lines(lines, start_pos):
+            if py_token.type is PythonTokenTypes.ERROR_DEDENT:
+                error_dedents.append(py_token.start_pos)
+            tok = token_from_py_token(py_token, self.suppress_error_tokens)
+            if tok is not None:
+                yield tok, py_token.start_pos
+
+    def _indent_stack(self, index: int) -> Tuple[List[int], int]:
+        """
+        Finds the indentation stack at a token from the indents which are still open there: walking back to the nearest
+        token which begins a logical line at column 0 (where the stack is just [0]), each indent which is not matched by
+        a later dedent pushed the column of its line. The index at which the walk stopped is also returned.
+        """
+        if self.positions[index][1] == 0:
+            return [0], index
+        stack: List[int] = []
+        dedents = 0
+        j = index - 1
+        while j >= 0:
+            tok = self.tokens[j]
+            if tok is _DEDENT:
+                dedents += 1
+            elif tok is _INDENT:
+                if dedents:
+                    dedents -= 1
+                else:
+                    stack.append(self.positions[j][1])
+            elif self.positions[j][1] == 0 and self._begins_logical_line(j):
+                break
+            j -= 1
+        stack.append(0)
+        stack.reverse()
+        return stack, max(j, 0)
+
+    def _begins_logical_line(self, index: int) -> bool:
+        """
+        Whether the token at the index begins a logical line, possibly after indents or dedents.
+        """
+        j = index - 1
+        while j >= 0 and (self.tokens[j] is _INDENT or self.tokens[j] is _DEDENT):
+            j -= 1
+        return j < 0 or self.tokens[j] is _NEWLINE
+
+    def _restart_index(self, line: int) -> int:
+        """
+        Finds the last token before the line which begins a logical line, or 0 if there is none.
+        """
+        index = bisect_left(self.positions, (line, 0)) - 1
+        while index > 0:
+            tok = self.tokens[index]
+            if tok is not _INDENT and tok is not _DEDENT and self._begins_logical_line(index):
+                return index
+            index -= 1
+        return 0
+
+    def _line(self, line: int) -> str:
+        if line == len(self.lines) + 1:
+            return ''
+        if not 1 <= line <= len(self.lines):
+            raise RuntimeError(f"Line {line} is not in the text, which has {len(self.lines)} lines.")
+        return self.lines[line - 1]
+
+    def _check_position(self, position: Position):
+        line, column = position
+        text = self._line(line)
+        if not 0 <= column <= len(text) - text.endswith('\n'):
+            raise RuntimeError(f"Column {column} is not in line {line}, which has {len(text)} characters.")
+
+    def apply_edit(self, edit: TextEdit) -> TokenStreamChange:
+        """
+        Applies an edit to the text and updates its tokens, returning the range of tokens which changed. If the new
+        text cannot be tokenized, a RuntimeError is raised and the text and tokens are left as they were.
+        """
+        self._check_position(edit.start)
+        self._check_position(edit.end)
+        if edit.end < edit.start:
+            raise RuntimeError(f"The edit ends at {edit.end}, before it starts at {edit.start}.")
+        start_line, start_column = edit.start
+        end_line, end_column = edit.end
+        new_region = _split_lines(self._line(start_line)[:start_column] + edit.text
+                                  + self._line(end_line)[end_column:])
+        old_count = len(self.lines[start_line - 1:end_line])
+        line_delta = len(new_region) - old_count
+        new_lines = self.lines[:start_line - 1] + new_region + self.lines[start_line - 1 + old_count:]
+        # The last line of the edited region in the new text, after which the streams may resynchronize.
+        last_edited_line = start_line + len(new_region) - 1
+
+        restart = self._restart_index(start_line)
+        stack = [0]
+        if restart > 0:
+            stack, outer = self._indent_stack(restart)
+            # An error dedent between the enclosing line at column 0 and the restart may have changed the stack in a way
+            # the columns do not show, so tokenizing starts from the enclosing line instead, where the stack is just [0].
+            # (The dedents before it are unaffected by the edit, since it comes before the edited line.)
+            i = bisect_left(self.error_dedents, self.positions[outer])
+            if i < len(self.error_dedents) and self.error_dedents[i] <= self.positions[restart]:
+                restart, stack = outer, [0]
+        restart_line = self.positions[restart][0] if restart > 0 else 1
+        openers = [' ' * column + BLOCK_OPENER for column in stack[:-1]]
+        if openers:
+            openers.append(' ' * stack[-1] + BLOCK_FILLER)
+        lines = chain(openers, islice(new_lines, restart_line - 1, None))
+        region_error_dedents: List[Position] = []
+        py_tokens = self._tokenize(lines, (restart_line - len(openers), 0), region_error_dedents)
+
+        region_tokens: List[Token] = []
+        region_positions: List[Position] = []
+        new_stack = list(stack)
+        old_stack = list(stack)
+        old_index = restart
+        old_error_start = bisect_left(self.error_dedents, self.positions[restart]) if restart > 0 else 0
+        # The stacks are only compared while neither stream has had an error dedent since the restart.
+        old_has_error_dedents = old_error_start < len(self.error_dedents)
+        resync: Optional[int] = None
+        # Whether the next token begins a logical line.
+        at_line_start = False
+        for tok, pos in py_tokens:
+            if pos[0] < restart_line:
+                continue
+            if tok is _INDENT:
+                new_stack.append(pos[1])
+            elif tok is _DEDENT:
+                new_stack.pop()
+            elif (at_line_start and pos[0] > last_edited_line and not old_has_error_dedents
+                  and not region_error_dedents):
+                # This token begins a logical line after the edit, so see whether the old stream began one here too.
+                old_pos = (pos[0] - line_delta, pos[1])
+                while old_index < len(self.tokens) and (self.positions[old_index] < old_pos or (
+                        self.positions[old_index] == old_pos
+                        and (self.tokens[old_index] is _INDENT or self.tokens[old_index] is _DEDENT))):
+                    old_tok = self.tokens[old_index]
+                    if old_tok is _INDENT:
+                        old_stack.append(self.positions[old_index][1])
+                    elif old_tok is _DEDENT:
+                        old_stack.pop()
+                    old_index += 1
+                if (old_index < len(self.tokens) and self.positions[old_index] == old_pos
+                        and self._begins_logical_line(old_index) and old_stack == new_stack
+                        and _same_token(self.tokens[old_index], tok)):
+                    resync = old_index
+                    break
+            if tok is _NEWLINE:
+                at_line_start = True
+            elif tok is not _INDENT and tok is not _DEDENT:
+                at_line_start = False
+            region_tokens.append(tok)
+            region_positions.append(pos)
+        old_end = len(self.tokens) if resync is None else resync
+        relexed_lines = (region_positions[-1][0] if region_positions else restart_line) - restart_line + 1
+
+        # Trim the tokens which are the same at the start and end of the region from the reported change.
+        prefix = 0
+        while (prefix < len(region_tokens) and restart + prefix < old_end
+               and region_positions[prefix] == self.positions[restart + prefix]
+               and _same_token(region_tokens[prefix], self.tokens[restart + prefix])):
+            prefix += 1
+        suffix = 0
+        while (suffix < len(region_tokens) - prefix and suffix < old_end - restart - prefix
+               and region_positions[-1 - suffix][0] - line_delta == self.positions[old_end - 1 - suffix][0]
+               and region_positions[-1 - suffix][1] == self.positions[old_end - 1 - suffix][1]
+               and _same_token(region_tokens[-1 - suffix], self.tokens[old_end - 1 - suffix])):
+            suffix += 1
+
+        # The streams only resynchronize if the old stream has no error dedents after the restart, so those in the
+        # region are all there are from the restart on.
+        tail_positions = self.positions[old_end:]
+        if line_delta:
+            tail_positions = [(line + line_delta, column) for line, column in tail_positions]
+        self.error_dedents[old_error_start:] = region_error_dedents
+        self.tokens[restart:] = region_tokens + self.tokens[old_end:]
+        self.positions[restart:] = region_positions + tail_positions
+        self.lines = new_lines
+        return TokenStreamChange(restart + prefix, old_end - suffix, restart + len(region_tokens) - suffix, line_delta,
+                                 relexed_lines)
@@ -1,38 +1,276 @@
 from .tokens import *
 
+from enum import Enum
+from hashlib import blake2b
+from importlib import import_module
+from itertools import islice
+from os import environ, getpid
 from os.path import abspath, dirname, join
 from parso.grammar import PythonGrammar
-from typing import Optional
+from parso.python.token import PythonTokenTypes, TokenType
+from pathlib import Path
+from tokenize import TokenError, generate_tokens
+from typing import Dict, Optional, TextIO, Tuple
 
 import parso.python.tokenize
+import pickle
+import sys
+import token as std_token
 
 
-__all__ = ['tokenize_file', 'load_grammar']
+__all__ = ['DEFAULT_GRAMMAR_VERSION', 'C_TOKENIZER_VERSION', 'TokenizerBackend', 'stdlib_tokenizer_matches',
+           'stdlib_tokenizer_preferred', 'resolve_tokenizer_backend', 'tokenize_file', 'tokenize_file_with_positions',
+           'USER_CACHE_DIR', 'DEFAULT_GRAMMAR_CACHE_DIR', 'load_grammar']
 
 
 DEFAULT_GRAMMAR_PATH = abspath(join(dirname(__file__), "../python-3.4.grammar"))
+# The version of Python the default grammar file is for. Files are tokenized for this version when the default grammar
+# is used, whatever the version of the running interpreter (which parso 0.4.0 could not tokenize for past Python 3.9).
+DEFAULT_GRAMMAR_VERSION = '3.4'
+
+
+def _user_cache_dir() -> Path:
+    cache_home = environ.get('XDG_CACHE_HOME')
+    base = Path(cache_home) if cache_home else Path.home() / '.cache'
+    return base / 'pwz_bench'
+
+
+# The directory everything cached between runs is kept in.
+USER_CACHE_DIR = _user_cache_dir()
+# The directory loaded grammars are cached in unless another is given.
+DEFAULT_GRAMMAR_CACHE_DIR = USER_CACHE_DIR / 'grammar'
+
+
+# The first version of Python whose `tokenize` module is backed by the interpreter's own tokenizer, written in C. Before
+# this version, the standard library's tokenizer is written in Python and is no faster than parso's.
+C_TOKENIZER_VERSION = (3, 12)
+
+
+class TokenizerBackend(Enum):
+    # Use the standard library's tokenizer when it can tokenize for the grammar and is written in C, and parso's
+    # otherwise.
+    AUTO = 'auto'
+    PARSO = 'parso'
+    STDLIB = 'stdlib'
+
+
+def stdlib_tokenizer_matches(grammar: PythonGrammar) -> bool:
+    """
+    Whether the standard library's `tokenize` module can stand in for parso's tokenizer for the grammar, which is so
+    when the grammar is for the version of the running interpreter or an older one. `token_from_std_token` rejects any
+    token which is tokenized differently by the grammar's version (such as an f-string, a number with underscores, or
+    the `:=` operator), and the file is then tokenized by parso instead.
+    """
+    return tuple(grammar.version_info[:2]) <= tuple(sys.version_info[:2])
+
+
+def stdlib_tokenizer_preferred(grammar: PythonGrammar) -> bool:
+    """
+    Whether the `auto` backend uses the standard library's tokenizer for the grammar.
+    """
+    return stdlib_tokenizer_matches(grammar) and sys.version_info >= C_TOKENIZER_VERSION
+
+
+def resolve_tokenizer_backend(grammar: PythonGrammar, backend: TokenizerBackend) -> TokenizerBackend:
+    """
+    The tokenizer a backend stands for with the grammar: `auto` resolves to the standard library's or parso's (see
+    `stdlib_tokenizer_preferred`), and the others to themselves.
+    """
+    if backend is TokenizerBackend.STDLIB:
+        if not stdlib_tokenizer_matches(grammar):
+            raise RuntimeError(f"The standard library tokenizes Python {sys.version_info[0]}.{sys.version_info[1]}, "
+                               f"but the grammar is for the newer Python "
+                               f"{grammar.version_info[0]}.{grammar.version_info[1]}.")
+    elif backend is TokenizerBackend.AUTO:
+        backend = TokenizerBackend.STDLIB if stdlib_tokenizer_preferred(grammar) else TokenizerBackend.PARSO
+    return backend
+
+
+def _use_stdlib(grammar: PythonGrammar, backend: TokenizerBackend) -> bool:
+    return resolve_tokenizer_backend(grammar, backend) is TokenizerBackend.STDLIB
 
 
 def tokenize_file(filename: str, grammar: Optional[PythonGrammar] = None,
-                  suppress_error_tokens: bool = False) -> TokenGenerator:
+                  suppress_error_tokens: bool = False,
+                  backend: TokenizerBackend = TokenizerBackend.AUTO) -> TokenGenerator:
+    """
+    Tokenizes a file. The file is read a line at a time as the tokens are consumed, so only the current line (or the
+    lines of the current multi-line string) is held in memory, however large the file is.
+
+    By default, the standard library's tokenizer is used whenever it can tokenize for the grammar (see
+    `stdlib_tokenizer_matches`) and is written in C (from Python 3.12), and parso's is used otherwise. The tokens are
+    the same either way; see `tokenize_file_with_positions`.
+    """
+    start_pos = (1, 0)
+
+    if grammar is None:
+        grammar = load_grammar()
+
+    if _use_stdlib(grammar, backend):
+        for tok, _ in _stdlib_tokenize_file_with_positions(filename, grammar, suppress_error_tokens):
+            yield tok
+        return
+
     with open(filename) as f:
-        lines = f.readlines()
+        yield from tokens_from_py_tokens(grammar._tokenize_lines(f, start_pos), suppress_error_tokens)
+
+
+def tokenize_file_with_positions(filename: str, grammar: Optional[PythonGrammar] = None,
+                                 suppress_error_tokens: bool = False,
+                                 backend: TokenizerBackend = TokenizerBackend.AUTO) -> PositionedTokenGenerator:
+    """
+    Like `tokenize_file`, but each token is paired with the position in the file at which it starts.
+
+    The standard library's C tokenizer is faster than parso's, but it does not agree with parso on erroneous input, on
+    f-strings, or on anything introduced after the grammar's version of Python. If it reaches anything of the sort, the
+    file is tokenized again by parso from the start, and the tokens which have already been produced are skipped. The
+    tokens and positions are otherwise the same as parso's; `pwz_bench.py check-tokenizers` compares the two over a
+    corpus.
+    """
     start_pos = (1, 0)
 
     if grammar is None:
         grammar = load_grammar()
 
-    return tokens_from_py_tokens(grammar._tokenize_lines(lines, start_pos), suppress_error_tokens)
+    if _use_stdlib(grammar, backend):
+        yield from _stdlib_tokenize_file_with_positions(filename, grammar, suppress_error_tokens)
+        return
+
+    with open(filename) as f:
+        yield from positioned_tokens_from_py_tokens(grammar._tokenize_lines(f, start_pos), suppress_error_tokens)
 
 
-def load_grammar(path: Optional[str] = None, version: Optional[str] = None) -> PythonGrammar:
-    if path is None:
-        if version is None:
-            return parso.load_grammar(path=DEFAULT_GRAMMAR_PATH)
-        else:
-            return parso.load_grammar(version=version)
-    else:
-        if version is None:
-            return parso.load_grammar(path=path)
+class _LineReader:
+    """
+    Reads the lines of a file for the standard library's tokenizer, keeping track of the end of the last line.
+    """
+    def __init__(self, f: TextIO):
+        self.f = f
+        self.end_pos: Position = (0, 0)
+
+    def readline(self) -> str:
+        line = self.f.readline()
+        if line:
+            self.end_pos = (self.end_pos[0] + 1, len(line))
+        return line
+
+
+def _stdlib_tokenize_file_with_positions(filename: str, grammar: PythonGrammar,
+                                         suppress_error_tokens: bool) -> PositionedTokenGenerator:
+    produced = 0
+    try:
+        with open(filename) as f:
+            reader = _LineReader(f)
+            for std_tok in generate_tokens(reader.readline):
+                tok = token_from_std_token(std_tok)
+                if tok is None:
+                    continue
+                if std_tok.type == std_token.INDENT:
+                    # Parso places an indent at the first token of the line, rather than at its start.
+                    position = std_tok.end
+                elif std_tok.start[0] > reader.end_pos[0]:
+                    # Parso places the dedents and end marker after the last line at the end of the last line.
+                    position = reader.end_pos
+                else:
+                    position = std_tok.start
+                yield tok, position
+                produced += 1
+        return
+    except (RuntimeError, SyntaxError, TokenError):
+        pass
+    with open(filename) as f:
+        py_tokens = grammar._tokenize_lines(f, (1, 0))
+        yield from islice(positioned_tokens_from_py_tokens(py_tokens, suppress_error_tokens), produced, None)
+
+
+# The format of the grammars pickled into the cache, which is part of the key of each entry so that entries written in
+# an older format are never read.
+GRAMMAR_CACHE_FORMAT = 2
+# The grammars loaded by this process, by the path or version they were loaded from.
+_loaded_grammars: Dict[Tuple[Optional[str], Optional[str]], PythonGrammar] = {}
+
+
+class _GrammarPickler(pickle.Pickler):
+    # Parso's token types are only equal to themselves, so they cannot be unpickled by value. Depending on the version
+    # of parso they are either enum members or plain `TokenType` objects held by `PythonTokenTypes`, and either kind is
+    # pickled by name instead.
+    def persistent_id(self, obj):
+        if isinstance(obj, Enum):
+            return 'enum', type(obj).__module__, type(obj).__qualname__, obj.name
+        if isinstance(obj, TokenType):
+            return 'token type', obj.name
+        return None
+
+
+class _GrammarUnpickler(pickle.Unpickler):
+    def persistent_load(self, pid):
+        kind, *rest = pid
+        if kind == 'enum':
+            module_name, class_name, name = rest
+            return getattr(import_module(module_name), class_name)[name]
+        elif kind == 'token type':
+            token_type = getattr(PythonTokenTypes, rest[0])
+            return token_type.value if isinstance(token_type, Enum) else token_type
         else:
-            raise ValueError("Cannot specify both path and version for loading grammar.")
+            raise pickle.UnpicklingError(f"Unknown persistent ID in cached grammar: {pid!r}")
+
+
+def _build_grammar(path: Optional[str], version: Optional[str]) -> PythonGrammar:
+    # Parso takes a path relative to its own directory, so the path is made absolute.
+    return parso.load_grammar(path=abspath(path) if path is not None else None, version=version)
+
+
+def load_grammar(path: Optional[str] = None, version: Optional[str] = None,
+                 cache_dir: Optional[Path] = DEFAULT_GRAMMAR_CACHE_DIR) -> PythonGrammar:
+    """
+    Loads the grammar from a grammar file, or else parso's grammar for a version of Python, defaulting to the grammar
+    file of Python 3.4 (which is tokenized for Python 3.4). A grammar loaded from another file is tokenized for the
+    version of the running interpreter.
+
+    Building a grammar takes parso longer than the rest of a short run, so each grammar is pickled into `cache_dir`
+    (unless it is None) the first time it is built, and later runs unpickle it instead. The cache is keyed by the
+    grammar, the version of parso, and the interpreter, so an entry is never stale. A grammar is only loaded once by
+    each process.
+    """
+    if path is not None and version is not None:
+        raise ValueError("Cannot specify both path and version for loading grammar.")
+    if path is None and version is None:
+        path, version = DEFAULT_GRAMMAR_PATH, DEFAULT_GRAMMAR_VERSION
+    grammar = _loaded_grammars.get((path, version))
+    if grammar is None:
+        grammar = _loaded_grammars[path, version] = _load_grammar(path, version, cache_dir)
+    return grammar
+
+
+def _load_grammar(path: Optional[str], version: Optional[str], cache_dir: Optional[Path]) -> PythonGrammar:
+    if cache_dir is None:
+        return _build_grammar(path, version)
+    h = blake2b(digest_size=16)
+    h.update(f'format {GRAMMAR_CACHE_FORMAT}\nparso {parso.__version__}\n{sys.implementation.cache_tag}\n'.encode())
+    if path is not None:
+        h.update(Path(path).read_bytes())
+    if version is not None:
+        h.update(f'version {version}\n'.encode())
+    cache_file = cache_dir / f'{h.hexdigest()}.pickle'
+    try:
+        with open(cache_file, 'rb') as f:
+            return _GrammarUnpickler(f).load()
+    except Exception:
+        # A missing or unreadable entry is simply built (and written) again.
+        pass
+    grammar = _build_grammar(path, version)
+    # The entry is written under a name unique to the process and renamed into place, so that a partially written entry
+    # is never read and several processes may write the same entry at once.
+    temp_cache_file = cache_file.with_name(f'.{cache_file.name}.{getpid()}.tmp')
+    try:
+        cache_dir.mkdir(parents=True, exist_ok=True)
+        with open(temp_cache_file, 'wb') as f:
+            _GrammarPickler(f, pickle.HIGHEST_PROTOCOL).dump(grammar)
+        temp_cache_file.replace(cache_file)
+    except OSError:
+        # The cache only saves time, so a grammar which cannot be cached is used all the same.
+        pass
+    finally:
+        if temp_cache_file.exists():
+            temp_cache_file.unlink()
+    return grammar
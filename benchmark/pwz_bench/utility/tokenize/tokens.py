@@ -1,9 +1,12 @@
 from dataclasses import dataclass
 from enum import Enum, unique
+from parso.python.token import PythonTokenTypes
 from parso.python.tokenize import PythonToken
-from typing import Any, Dict, Generator, Iterator, List, Optional, Set
+from tokenize import TokenInfo
+from typing import Any, Dict, Generator, Iterator, List, Optional, Set, Tuple
 
 import re
+import token as std_token
 
 
 __all__ = [
@@ -12,8 +15,10 @@ __all__ = [
     'PARAMETERIZED_TOKEN_CLASS_NAMES_TO_OCAML_TYPES',
     'TokenEnum', 'AMORPHOUS_TOKENS', 'PARAMETERIZED_TOKENS', 'SPECIAL_TOKENS', 'SPECIAL_TOKENS_SET',
     'SPECIAL_TOKEN_NAMES_SET', 'OPERATORS_TO_TOKENS', 'KEYWORDS_TO_TOKENS',
-    'Token', 'ParameterizedToken', 'TokenGenerator', 'tokens_from_py_tokens', 'token_from_py_token',
+    'Token', 'ParameterizedToken', 'TokenGenerator', 'Position', 'PositionedTokenGenerator', 'tokens_from_py_tokens',
+    'positioned_tokens_from_py_tokens', 'token_from_py_token', 'token_from_std_token', 'interned_token',
     'make_string_of_token', 'token_pair_of_token', 'make_token_pair_of_token', 'make_string_token_assoc',
+    'make_token_of_tag',
 ]
 
 
@@ -181,6 +186,8 @@ KEYWORDS_TO_TOKENS: Dict[str, TokenEnum] = {token.literal: token
 
 @dataclass
 class Token:
+    __slots__ = ('_token',)
+
     _token: TokenEnum
 
     def __init__(self, token: TokenEnum):
@@ -210,6 +217,10 @@ class Token:
     def string(self) -> str:
         return self._token.name
 
+    @property
+    def name(self) -> str:
+        return self._token.name
+
     @property
     def type(self) -> str:
         return self._token.cls.name
@@ -225,13 +236,13 @@ class Token:
 
 @dataclass
 class ParameterizedToken(Token):
+    __slots__ = ('_param',)
+
     _param: str
-    _param_type: str
 
     def __init__(self, token: TokenEnum, param: str):
-        super().__init__(token)
+        self._token = token
         self._param = param
-        self._param_type = PARAMETERIZED_TOKEN_CLASSES_TO_OCAML_TYPES[token.cls]
 
     __eq__ = Token.__eq__
 
@@ -247,10 +258,13 @@ class ParameterizedToken(Token):
 
     @property
     def param_type(self) -> str:
-        return self._param_type
+        return PARAMETERIZED_TOKEN_CLASSES_TO_OCAML_TYPES[self._token.cls]
 
 
 TokenGenerator = Generator[Token, Any, None]
+# The (line, column) at which a token starts in its source file. Lines are numbered from 1 and columns from 0.
+Position = Tuple[int, int]
+PositionedTokenGenerator = Generator[Tuple[Token, Position], Any, None]
 
 
 def tokens_from_py_tokens(py_tokens: Iterator[PythonToken], suppress_error_tokens: bool = False) -> TokenGenerator:
@@ -261,37 +275,129 @@ def tokens_from_py_tokens(py_tokens: Iterator[PythonToken], suppress_error_token
         yield tok
 
 
+def positioned_tokens_from_py_tokens(py_tokens: Iterator[PythonToken],
+                                     suppress_error_tokens: bool = False) -> PositionedTokenGenerator:
+    for py_token in py_tokens:
+        tok = token_from_py_token(py_token, suppress_error_tokens)
+        if tok is None:
+            continue
+        yield tok, py_token.start_pos
+
+
+# Tokens without parameters are all alike, so a single instance of each is shared by every token stream.
+_INTERNED_TOKENS: Dict[TokenEnum, Token] = {token: Token(token) for token in TokenEnum
+                                            if token not in PARAMETERIZED_TOKENS}
+# These are keyed by parso's token types. Before parso 0.8, `PythonTokenTypes` is an object holding the types rather
+# than an enum of them, so it cannot be used in the annotations.
+_AMORPHOUS_TOKENS_BY_TYPE: Dict[Any, Token] = {
+    PythonTokenTypes.NEWLINE: _INTERNED_TOKENS[TokenEnum.NEWLINE],
+    PythonTokenTypes.INDENT: _INTERNED_TOKENS[TokenEnum.INDENT],
+    PythonTokenTypes.DEDENT: _INTERNED_TOKENS[TokenEnum.DEDENT],
+    PythonTokenTypes.ENDMARKER: _INTERNED_TOKENS[TokenEnum.ENDMARKER],
+}
+_OPERATOR_TOKENS: Dict[str, Token] = {literal: _INTERNED_TOKENS[token] for literal, token in OPERATORS_TO_TOKENS.items()}
+_KEYWORD_TOKENS: Dict[str, Token] = {literal: _INTERNED_TOKENS[token] for literal, token in KEYWORDS_TO_TOKENS.items()}
+_ERROR_TYPES: Set[Any] = {PythonTokenTypes.ERROR_DEDENT, PythonTokenTypes.ERRORTOKEN}
+
+
+def interned_token(token: TokenEnum) -> Token:
+    """
+    Returns the shared instance of a token without a parameter.
+    """
+    return _INTERNED_TOKENS[token]
+
+
 def token_from_py_token(py_token: PythonToken, suppress_error_tokens: bool) -> Optional[Token]:
-    token_type = py_token.type.name
+    token_type = py_token.type
+    tok = _AMORPHOUS_TOKENS_BY_TYPE.get(token_type)
+    if tok is not None:
+        return tok
     token_string = py_token.string
-    if token_type == 'NEWLINE':
-        return Token(TokenEnum.NEWLINE)
-    elif token_type == 'INDENT':
-        return Token(TokenEnum.INDENT)
-    elif token_type == 'DEDENT':
-        return Token(TokenEnum.DEDENT)
-    elif token_type == 'ENDMARKER':
-        return Token(TokenEnum.ENDMARKER)
-    elif token_type == 'OP':
-        tok = OPERATORS_TO_TOKENS.get(token_string)
+    if token_type is PythonTokenTypes.OP:
+        tok = _OPERATOR_TOKENS.get(token_string)
         if tok is None:
             raise RuntimeError(f"Unable to handle operator token with literal form \'{token_string}\'.")
-        return Token(tok)
-    elif token_type == 'NAME' and token_string in KEYWORDS_TO_TOKENS:
-        return Token(KEYWORDS_TO_TOKENS[token_string])
-    elif token_type == 'NAME':
+        return tok
+    elif token_type is PythonTokenTypes.NAME:
+        tok = _KEYWORD_TOKENS.get(token_string)
+        if tok is not None:
+            return tok
         return ParameterizedToken(TokenEnum.NAME, _trim_string(token_string))
-    elif token_type == 'NUMBER':
+    elif token_type is PythonTokenTypes.NUMBER:
         return ParameterizedToken(TokenEnum.NUMBER, _trim_string(token_string))
-    elif token_type == 'STRING':
+    elif token_type is PythonTokenTypes.STRING:
         return ParameterizedToken(TokenEnum.STRING, _trim_string(repr(token_string)[1:-1]))
-    elif token_type in {'ERROR_DEDENT', 'ERRORTOKEN'}:
+    elif token_type in _ERROR_TYPES:
         if suppress_error_tokens:
             return None
         else:
             raise RuntimeError(f"Error in tokenization: {py_token}.")
     else:
-        raise RuntimeError(f"Unexpected PythonToken type: {token_type} from token {py_token}.")
+        raise RuntimeError(f"Unexpected PythonToken type: {token_type.name} from token {py_token}.")
+
+
+# The types of the standard library's tokens which parso leaves in the prefix of the next token instead.
+_STD_SKIPPED_TYPES: Set[int] = {std_token.COMMENT, std_token.NL, std_token.ENCODING}
+_STD_AMORPHOUS_TOKENS_BY_TYPE: Dict[int, Token] = {
+    std_token.INDENT: _INTERNED_TOKENS[TokenEnum.INDENT],
+    std_token.DEDENT: _INTERNED_TOKENS[TokenEnum.DEDENT],
+    std_token.ENDMARKER: _INTERNED_TOKENS[TokenEnum.ENDMARKER],
+}
+# Parso splits `<>` into `<` and `>`, so the standard library's `<>` has no counterpart.
+_STD_OPERATOR_TOKENS: Dict[str, Token] = {literal: tok for literal, tok in _OPERATOR_TOKENS.items() if literal != '<>'}
+# String prefixes are at most two characters long, so an f-string has an "f" in one of its first two characters.
+_FSTRING_PREFIX_RE = re.compile(r'[A-Za-z]?[fF]')
+# A name as parso tokenizes it. The C tokenizer also allows some characters in names which are not matched by \w.
+_NAME_RE = re.compile(r'\w+')
+# A decimal integer with leading zeros, which parso splits after the zeros.
+_LEADING_ZEROS_RE = re.compile(r'0+[1-9][0-9]*')
+
+
+def token_from_std_token(std_tok: TokenInfo) -> Optional[Token]:
+    """
+    Converts a token from the standard library's `tokenize` module into the token `token_from_py_token` gives for the
+    corresponding token from parso, or returns None for a token parso does not produce: comments, non-logical newlines,
+    and the NEWLINE the standard library adds to a last line without one.
+
+    Raises a RuntimeError for any token parso may tokenize differently (error tokens, f-strings, numbers with
+    underscores or leading zeros, `<>`, and anything else introduced by a newer version of Python than the grammar's),
+    in which case the file must be tokenized by parso instead.
+    """
+    token_type = std_tok.type
+    token_string = std_tok.string
+    # The most common types are checked first.
+    if token_type == std_token.OP:
+        tok = _STD_OPERATOR_TOKENS.get(token_string)
+        if tok is None:
+            raise RuntimeError(f"Unable to handle operator token with literal form \'{token_string}\'.")
+        return tok
+    elif token_type == std_token.NAME:
+        tok = _KEYWORD_TOKENS.get(token_string)
+        if tok is not None:
+            return tok
+        if not token_string.isascii() and not _NAME_RE.fullmatch(token_string):
+            raise RuntimeError(f"Parso tokenizes names with characters outside of \\w differently: {std_tok}.")
+        return ParameterizedToken(TokenEnum.NAME, token_string)
+    elif token_type in _STD_SKIPPED_TYPES:
+        return None
+    elif token_type == std_token.NEWLINE:
+        # The standard library gives an empty NEWLINE after a last line which does not end in a newline.
+        return _INTERNED_TOKENS[TokenEnum.NEWLINE] if token_string else None
+    elif token_type == std_token.NUMBER:
+        if '_' in token_string:
+            raise RuntimeError(f"Parso tokenizes numbers with underscores differently before Python 3.6: {std_tok}.")
+        if _LEADING_ZEROS_RE.fullmatch(token_string):
+            raise RuntimeError(f"Parso tokenizes decimal integers with leading zeros differently: {std_tok}.")
+        return ParameterizedToken(TokenEnum.NUMBER, token_string)
+    elif token_type == std_token.STRING:
+        if _FSTRING_PREFIX_RE.match(token_string):
+            raise RuntimeError(f"Parso tokenizes f-strings differently: {std_tok}.")
+        return ParameterizedToken(TokenEnum.STRING, _trim_string(repr(token_string)[1:-1]))
+    tok = _STD_AMORPHOUS_TOKENS_BY_TYPE.get(token_type)
+    if tok is None:
+        raise RuntimeError(f"Unexpected standard library token type: {std_token.tok_name.get(token_type)} from token "
+                           f"{std_tok}.")
+    return tok
 
 
 def _trim_string(s: str) -> str:
@@ -310,20 +416,26 @@ def make_string_of_token(tok: str, parameterized: bool) -> str:
         return f"{tok}_ -> \"{tok}\""
 
 
-def token_pair_of_token(tok: str, parameter: Optional[str] = None) -> str:
-    tag = TokenEnum[tok].tag
+def token_pair_of_token(tok: str, tag: int, parameter: Optional[str] = None) -> str:
     if parameter is not None:
         return f"({tag}, {parameter})"
     else:
         return f"({tag}, \"{tok}\")"
 
 
-def make_token_pair_of_token(tok: str, parameterized: bool) -> str:
+def make_token_pair_of_token(tok: str, tag: int, parameterized: bool) -> str:
     if parameterized:
-        return f"{tok}_ s -> {token_pair_of_token(tok, parameter='s')}"
+        return f"{tok}_ s -> {token_pair_of_token(tok, tag, parameter='s')}"
     else:
-        return f"{tok}_ -> {token_pair_of_token(tok)}"
+        return f"{tok}_ -> {token_pair_of_token(tok, tag)}"
 
 
 def make_string_token_assoc(tok: str) -> str:
     return f"(\"{tok}\", {tok}_)"
+
+
+def make_token_of_tag(tok: str, tag: int, parameterized: bool) -> str:
+    if parameterized:
+        return f"{tag} -> {tok}_ param"
+    else:
+        return f"{tag} -> {tok}_"